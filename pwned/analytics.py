@@ -0,0 +1,231 @@
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import pwned.batch
+import pwned.standings
+import pwned.support
+
+STATISTICS = ('wins', 'draws', 'losses', 'points', 'score_for', 'score_against')
+
+# match results of many leagues in flat columns: one row per signup per league, and per played match the rows of both
+# sides and their scores. statistics for every league come out of one pass over the columns, with numpy when it's
+# installed and a plain loop over the arrays otherwise.
+class LeagueResults:
+    def __init__(self):
+        self.league_ids = []
+        self.scoring_models = []
+        self.signups = []
+
+        # per row
+        self.row_league = array.array('l')
+        self.bonus = array.array('d')
+
+        # per match
+        self.home = array.array('l')
+        self.away = array.array('l')
+        self.score_home = array.array('d')
+        self.score_away = array.array('d')
+
+        self._leagues = {}
+        self._ranges = []
+        self._rows = {}
+
+    def __len__(self):
+        return len(self.home)
+
+    @classmethod
+    def from_leagues(cls, leagues, client=None, concurrency=None):
+        # fetches scoring models, signups and rounds of regular (not championship) leagues, concurrently. leagues
+        # that fail to load are left out; the BatchResult of the loads says which and why.
+        def load(league):
+            league_client = league._get_client(client)
+            scoring_model = pwned.standings.get_scoring_model(league, league_client)
+
+            return scoring_model, league_client.get_signups('league', league.id), league_client.get_rounds('league', league.id)
+
+        results = cls()
+        loaded = pwned.batch.run_batch(load, leagues, concurrency)
+
+        for item in loaded.succeeded:
+            scoring_model, signups, rounds = item.result
+            results.add_league(item.key.id, scoring_model, signups)
+            results.add_matches(item.key.id, (match for round in rounds for stage in round.stages for match in stage.matches))
+
+        return results, loaded
+
+    def add_league(self, league_id, scoring_model, signups):
+        if league_id in self._leagues:
+            raise ValueError('League ' + str(league_id) + ' has already been added')
+
+        index = self._leagues[league_id] = len(self.league_ids)
+        bonus = pwned.support.bonus_points(scoring_model)
+
+        self.league_ids.append(league_id)
+        self.scoring_models.append(scoring_model)
+
+        start = len(self.signups)
+
+        for signup in signups:
+            self._rows[(index, pwned.support.signup_key(signup.id))] = len(self.signups)
+            self.signups.append(signup)
+            self.row_league.append(index)
+            self.bonus.append(bonus.get(pwned.support.signup_key(signup.id), 0))
+
+        # a league's rows are next to each other
+        self._ranges.append((start, len(self.signups)))
+
+    def add_match(self, league_id, signup_id, opponent_id, score, score_opponent):
+        # unplayed matches and matches against teams that aren't signed up don't count, same as in the API's table
+        if score is None or score_opponent is None:
+            return
+
+        index = self._leagues[league_id]
+        home = self._rows.get((index, pwned.support.signup_key(signup_id)))
+        away = self._rows.get((index, pwned.support.signup_key(opponent_id)))
+
+        if home is None or away is None:
+            return
+
+        self.home.append(home)
+        self.away.append(away)
+        self.score_home.append(float(score))
+        self.score_away.append(float(score_opponent))
+
+    def add_matches(self, league_id, matches):
+        for match in matches:
+            if match.signup is not None and match.signup_opponent is not None:
+                self.add_match(league_id, match.signup.id, match.signup_opponent.id, match.score, match.score_opponent)
+
+    def compute(self, backend=None):
+        # backend is 'numpy' or 'python'; numpy when it's installed by default
+        if backend is None:
+            backend = 'numpy' if numpy is not None else 'python'
+
+        if backend == 'numpy':
+            columns = self._compute_numpy()
+        elif backend == 'python':
+            columns = self._compute_python()
+        else:
+            raise ValueError('Unknown backend: ' + str(backend))
+
+        return LeagueStatistics(self, columns)
+
+    def _points(self):
+        # per row: what a win, a draw and a loss is worth in its league
+        points = [tuple(pwned.support.number(points or 0) for points in (model.points_win, model.points_draw, model.points_loss)) for model in self.scoring_models]
+
+        return [points[index] for index in self.row_league]
+
+    def _compute_numpy(self):
+        if numpy is None:
+            raise ImportError('numpy is not installed')
+
+        def column(values):
+            # a view of the array's buffer, not a copy
+            return numpy.frombuffer(values, dtype=values.typecode) if len(values) else numpy.zeros(0, dtype=values.typecode)
+
+        rows = len(self.signups)
+        home, away = column(self.home), column(self.away)
+        score_home, score_away = column(self.score_home), column(self.score_away)
+
+        def count(weights_home, weights_away):
+            return numpy.bincount(home, weights=weights_home, minlength=rows) + numpy.bincount(away, weights=weights_away, minlength=rows)
+
+        home_won = score_home > score_away
+        drawn = score_home == score_away
+        away_won = score_home < score_away
+
+        wins = count(home_won, away_won)
+        draws = count(drawn, drawn)
+        losses = count(away_won, home_won)
+        points = numpy.array(self._points(), dtype=numpy.float64).reshape(rows, 3)
+
+        return {
+            'wins': wins.astype(numpy.int64),
+            'draws': draws.astype(numpy.int64),
+            'losses': losses.astype(numpy.int64),
+            'points': wins * points[:, 0] + draws * points[:, 1] + losses * points[:, 2] + column(self.bonus),
+            'score_for': count(score_home, score_away),
+            'score_against': count(score_away, score_home),
+        }
+
+    def _compute_python(self):
+        rows = len(self.signups)
+        wins = [0] * rows
+        draws = [0] * rows
+        losses = [0] * rows
+        score_for = [0.0] * rows
+        score_against = [0.0] * rows
+
+        for home, away, score_home, score_away in zip(self.home, self.away, self.score_home, self.score_away):
+            if score_home > score_away:
+                wins[home] += 1
+                losses[away] += 1
+            elif score_home < score_away:
+                wins[away] += 1
+                losses[home] += 1
+            else:
+                draws[home] += 1
+                draws[away] += 1
+
+            score_for[home] += score_home
+            score_against[home] += score_away
+            score_for[away] += score_away
+            score_against[away] += score_home
+
+        points = [
+            win * points_win + draw * points_draw + loss * points_loss + bonus
+            for win, draw, loss, (points_win, points_draw, points_loss), bonus in zip(wins, draws, losses, self._points(), self.bonus)
+        ]
+
+        return {
+            'wins': array.array('l', wins),
+            'draws': array.array('l', draws),
+            'losses': array.array('l', losses),
+            'points': array.array('d', points),
+            'score_for': array.array('d', score_for),
+            'score_against': array.array('d', score_against),
+        }
+
+# computed statistics, one column per name in STATISTICS with a value per row of the LeagueResults
+class LeagueStatistics:
+    def __init__(self, results, columns):
+        self.results = results
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def rows(self):
+        # (league id, signup, wins, draws, losses, points, score_for, score_against) per row, for reports
+        results = self.results
+        columns = [self.columns[name] for name in STATISTICS]
+
+        for row, values in enumerate(zip(*columns)):
+            yield (results.league_ids[results.row_league[row]], results.signups[row]) + tuple(pwned.support.number(value) for value in values)
+
+    def table(self, league_id):
+        # LeagueTablePosition rows, ordered the same way as League.get_table()
+        results = self.results
+        start, end = results._ranges[results._leagues[league_id]]
+        table = []
+
+        for row in range(start, end):
+            wins, draws, losses, points, score_for, score_against = (pwned.support.number(self.columns[name][row]) for name in STATISTICS)
+            table.append(pwned.support.LeagueTablePosition(
+                signup=results.signups[row], position=None, wins=wins, draws=draws, losses=losses, points=points,
+                score=pwned.support.number(score_for - score_against), score_for=score_for, score_against=score_against))
+
+        table.sort(key=lambda position: (-position.points, -position.score, -position.score_for))
+
+        for position, row in enumerate(table, 1):
+            row.position = position
+
+        return table
+
+    def tables(self):
+        return {league_id: self.table(league_id) for league_id in self.results.league_ids}
@@ -0,0 +1,364 @@
+import asyncio
+import time
+
+import pwned.client
+import pwned.competitions
+import pwned.support
+import pwned.pool
+import pwned.batch
+import pwned.profiling
+import pwned.compression
+import pwned.streaming
+
+class AsyncPwned(pwned.client.Pwned):
+    def __init__(self, base_url, public_key, private_key, pool=None, cache=None, store=None, lazy=False, identities=None, limiter=None, metrics=None, codec=None, compression=True, compress_requests=None):
+        if pool is None:
+            pool = pwned.pool.AsyncConnectionPool()
+
+        super().__init__(base_url, public_key, private_key, pool=pool, cache=cache, store=store, lazy=lazy, identities=identities, limiter=limiter, metrics=metrics, codec=codec, compression=compression, compress_requests=compress_requests)
+
+    async def close(self):
+        await self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def create_tournament(self, tournament):
+        response = await self._request('tournaments', 'POST', tournament.get_api_dict())
+        
+        if response:
+            return pwned.competitions.Tournament.from_api_call(response, client=self)
+    
+    async def create_league(self, league):
+        response = await self._request('leagues', 'POST', league.get_api_dict())
+        
+        if response:
+            return pwned.competitions.League.from_api_call(response, client=self)
+
+    async def get(self, type, id):
+        if hasattr(self, 'get_' + str(type)):
+            return await getattr(self, 'get_' + str(type))(id)
+
+        raise pwned.client.PwnedAPIException('Unknown type for get: ' + str(type))
+
+    async def get_many(self, type, ids, concurrency=None):
+        return await pwned.batch.run_batch_async(lambda id: self.get(type, id), ids, concurrency)
+    
+    async def get_league(self, id):
+        response = await self._get_competition('league', id)
+        
+        if response:
+            return pwned.competitions.League.from_api_call(response, client=self)
+    
+    async def get_tournament(self, id):
+        response = await self._get_competition('tournament', id)
+        
+        if response:
+            return pwned.competitions.Tournament.from_api_call(response, client=self)
+
+    async def get_tournament_templates(self):
+        response = await self._request('tournaments/templates')
+        
+        if not response is None:
+            templates = []
+            
+            for template in response:
+                templates.append(pwned.support.TournamentTemplate.from_api_call(template))
+        
+            return templates
+            
+    async def update(self, type, id, competition):
+        return await self._request(type + 's/' + str(id), 'POST', competition.get_api_dict())
+
+    async def start(self, type, id):
+        return await self._request(type + 's/' + str(id), 'POST', {'status': 'live'})
+    
+    async def add_signups(self, type, competition_id, signups):
+        data = []
+        
+        for signup in signups:
+            data.append(signup.get_api_dict())
+    
+        return await self._request(type + 's/' + str(competition_id) + '/signups', 'POST', data)
+    
+    async def import_signups(self, type, competition_id, signups, chunk_size=None, concurrency=None, retries=2):
+        async def add(chunk):
+            return self._decode_signups(await self.add_signups(type, competition_id, chunk))
+        
+        return await pwned.batch.run_chunked_async(add, signups, chunk_size, concurrency, retries, retry_errors=pwned.batch.UNSENT_ERRORS)
+    
+    async def get_signups(self, type, competition_id):
+        response = await self._request(type + 's/' + str(competition_id) + '/signups')
+        
+        if not response is None:
+            signups = []
+            
+            for el in response:
+                signups.append(pwned.support.Signup.from_api_call(el, identities=self.identities))
+        
+            return signups
+            
+    async def remove_signup(self, type, competition_id, signup_id):
+        return await self._request(type + 's/' + str(competition_id) + '/signups/' + str(signup_id), 'DELETE')
+
+    async def get_round(self, type, competition_id, round_index):
+        response = await self._request(type + 's/' + str(competition_id) + '/rounds/' + str(round_index))
+        
+        if not response is None:
+            return pwned.support.Round.from_api_call(response, lazy=self.lazy, identities=self.identities)
+
+    async def get_rounds(self, type, competition_id):
+        response = await self._request(type + 's/' + str(competition_id) + '/rounds')
+        
+        if not response is None:
+            rounds = []
+            
+            for el in response:
+                rounds.append(pwned.support.Round.from_api_call(el, lazy=self.lazy, identities=self.identities))
+        
+            return rounds
+
+    async def get_rounds_by_index(self, type, competition_id, round_indexes, concurrency=None):
+        return await pwned.batch.run_batch_async(lambda round_index: self.get_round(type, competition_id, round_index), round_indexes, concurrency)
+
+    async def iter_rounds(self, type, competition_id):
+        async for el in self._stream(type + 's/' + str(competition_id) + '/rounds', ('*', )):
+            yield pwned.support.Round.from_api_call(el, lazy=self.lazy, identities=self.identities)
+
+    async def iter_matches(self, type, competition_id):
+        async for el in self._stream(type + 's/' + str(competition_id) + '/rounds', ('*', 'stages', '*', 'matches', '*')):
+            yield pwned.support.Match.from_api_call(el, lazy=self.lazy, identities=self.identities)
+
+    async def get_match(self, type, competition_id, match_id):
+        response = await self._request(type + 's/' + str(competition_id) + '/matches/' + str(match_id))
+        
+        if not response is None:
+            return pwned.support.Match.from_api_call(response, lazy=self.lazy, identities=self.identities)
+
+    async def get_matches(self, type, competition_id, match_ids, concurrency=None):
+        return await pwned.batch.run_batch_async(lambda match_id: self.get_match(type, competition_id, match_id), match_ids, concurrency)
+            
+    async def update_match(self, type, competition_id, match):
+        return await self._request(type + 's/' + str(competition_id) + '/matches/' + str(match.id), 'POST', match.get_api_dict())
+        
+    async def update_round(self, type, competition_id, round):
+        return await self._request(type + 's/' + str(competition_id) + '/rounds/' + str(round.round_number), 'POST', round.get_api_dict())
+
+    async def update_matches(self, type, competition_id, matches, concurrency=None):
+        return await pwned.batch.run_batch_async(lambda match: self.update_match(type, competition_id, match), matches, concurrency)
+
+    async def update_rounds(self, type, competition_id, rounds, concurrency=None):
+        return await pwned.batch.run_batch_async(lambda round: self.update_round(type, competition_id, round), rounds, concurrency)
+
+    async def get_league_table(self, league_id):
+        response = await self._request('leagues/' + str(league_id) + '/table')
+        
+        if not response is None:
+            table = []
+            
+            for position in response:
+                table.append(pwned.support.LeagueTablePosition.from_api_call(position, lazy=self.lazy, identities=self.identities))
+    
+            return table
+
+    async def get_league_scoring_models(self, type=None):
+        if type:
+            response = await self._request('leagues/scoringmodels/' + type)
+        else:
+            response = await self._request('leagues/scoringmodels', 'GET')
+        
+        if not response is None:
+            scoring_models = []
+            
+            for scoring_model in response:
+                scoring_models.append(pwned.support.LeagueScoringModel.from_api_call(scoring_model))
+            
+            return scoring_models
+
+    async def get_league_scoring_model(self, id):
+        response = await self._request('leagues/scoringmodels/' + str(id), 'GET')
+        
+        if not response is None:
+            return pwned.support.LeagueScoringModel.from_api_call(response)
+
+    async def create_league_scoring_model(self, scoring_model):
+        response = await self._request('leagues/scoringmodels/', 'POST', scoring_model.get_api_dict())
+        
+        if not response is None:
+            return pwned.support.LeagueScoringModel.from_api_call(response)
+        
+    async def update_league_scoring_model(self, scoring_model):
+        return await self._request('leagues/scoringmodels/' + str(scoring_model.id), 'POST', scoring_model.get_api_dict())
+        
+    async def delete_league_scoring_model(self, scoring_model_id):
+        return await self._request('leagues/scoringmodels/' + str(scoring_model_id), 'DELETE')
+            
+    async def league_set_championship_round_results(self, league_id, round_number, results):
+        data = []
+        
+        for result in results:
+            val = result.get_api_dict()
+            val['signupId'] = val['signup']['id']
+            data.append(val)
+            
+        return await self._request('leagues/' + str(league_id) + '/rounds/' + str(round_number) + '/results', 'POST', data)
+
+    async def get_games(self):
+        response = await self._request('games')
+        
+        if not response is None:
+            games = []
+            
+            for game in response:
+                games.append(pwned.support.Game.from_api_call(game))
+            
+            return games
+    
+    async def get_countries(self):
+        response = await self._request('countries')
+        
+        if not response is None:
+            countries = []
+            
+            for country in response:
+                countries.append(pwned.support.Country.from_api_call(country))
+                
+            return countries
+    
+    async def _get_competition(self, type, id):
+        return await self._request(type + 's/' + str(id))
+    
+    async def send(self, prepared):
+        cached = self._cache_lookup(prepared.resource, prepared.method)
+        
+        if cached is not None:
+            return self._decode_response(cached)
+        
+        return await self._send(prepared)
+    
+    async def _request(self, resource, request_method = 'GET', data = None):
+        cached = self._cache_lookup(resource, request_method)
+        
+        if cached is not None:
+            return self._decode_response(cached)
+        
+        return await self._send(self.prepare(resource, request_method, data))
+    
+    async def _stream(self, resource, path):
+        # the same as Pwned._stream. the response is fed to JsonStream as it arrives, so parsing stays on the event loop
+        prepared = self.prepare(resource)
+        call = pwned.profiling.begin(prepared.method, prepared.resource)
+        
+        if self.limiter is not None:
+            await self.limiter.acquire_async()
+        
+        started = time.perf_counter()
+        received = decoded = 0
+        
+        try:
+            async with self.pool.stream('GET', prepared.url, body=prepared.body, headers=prepared.headers) as response:
+                # for streams, the latency is the time until the response headers arrived
+                elapsed = time.perf_counter() - started
+                
+                if self.limiter is not None:
+                    self.limiter.update(response.status, response.headers)
+                
+                encoding = response.getheader('Content-Encoding')
+                decoder = None
+                
+                if encoding and encoding != 'identity':
+                    decoder = pwned.compression.Decompressor(encoding)
+                
+                stream = pwned.streaming.JsonStream()
+                
+                try:
+                    for el in stream.parse(path):
+                        if el is not pwned.streaming.NEED_DATA:
+                            # the caller hydrates the item (and may make other calls) before asking for the next one
+                            pwned.profiling.suspend(call)
+                            yield el
+                            pwned.profiling.resume(call)
+                            continue
+                        
+                        while stream.needs_data():
+                            # a compressed chunk is inflated only as far as the parser asks for
+                            if decoder is not None and decoder.pending:
+                                data = decoder.decompress(b'', stream.chunk_size)
+                            else:
+                                with pwned.profiling.phase('body'):
+                                    chunk = await asyncio.wait_for(response.read(stream.chunk_size), self.pool.timeout)
+                                
+                                received += len(chunk)
+                                
+                                if not chunk:
+                                    data = decoder.flush() if decoder is not None else b''
+                                    decoded += len(data)
+                                    stream.feed(data)
+                                    stream.feed_eof()
+                                    break
+                                
+                                data = decoder.decompress(chunk, stream.chunk_size) if decoder is not None else chunk
+                            
+                            decoded += len(data)
+                            stream.feed(data)
+                except (ValueError, pwned.compression.zlib.error):
+                    self._record(prepared, response, elapsed, 0, 'api', decoded, received)
+                    raise pwned.client.PwnedAPIException('Invalid JSON returned from server.')
+        finally:
+            pwned.profiling.end(call)
+        
+        if stream.envelope.get('error'):
+            self._record(prepared, response, elapsed, 0, 'api', decoded, received)
+            raise pwned.client.PwnedAPIException(stream.envelope['error']['reason'])
+        
+        self._record(prepared, response, elapsed, 0, None, decoded, received)
+    
+    async def _send(self, prepared):
+        call = pwned.profiling.begin(prepared.method, prepared.resource)
+        
+        try:
+            return await self._send_profiled(prepared)
+        finally:
+            pwned.profiling.end(call)
+    
+    async def _send_profiled(self, prepared):
+        headers = prepared.headers
+        
+        # the prepared headers are shared, conditional request headers go on a copy
+        if self.store is not None:
+            headers = dict(headers)
+        
+        stored = self._store_lookup(prepared.resource, prepared.method, headers)
+        stored_body = None
+        attempt = 0
+        started = time.perf_counter()
+        
+        try:
+            while True:
+                if self.limiter is not None:
+                    await self.limiter.acquire_async()
+                
+                response = await self.pool.request(prepared.method, prepared.url, body=prepared.body, headers=headers)
+                
+                if self._should_retry(response, attempt):
+                    attempt += 1
+                    continue
+                
+                if stored is None or response.status != 304:
+                    break
+                
+                stored_body = self._read_stored(prepared.resource, stored, headers)
+                
+                if stored_body is not None:
+                    break
+                
+                # the stored body is gone, the request is sent again without the conditions
+                stored = None
+        except Exception:
+            self._record(prepared, None, time.perf_counter() - started, attempt, 'connection')
+            raise
+        
+        return self._handle_measured_response(prepared, response, stored_body, started, attempt)
@@ -0,0 +1,210 @@
+import concurrent.futures
+import contextvars
+import itertools
+import asyncio
+import socket
+import time
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CHUNK_SIZE = 500
+
+# errors worth trying a chunk again for: the connection failed or timed out. API errors would only fail again
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError)
+
+# errors where the request can't have reached the server, the only ones safe to retry for writes that aren't
+# idempotent. after a timeout or a dropped connection the chunk may have been stored
+UNSENT_ERRORS = (ConnectionRefusedError, socket.gaierror)
+
+class BatchItem:
+    def __init__(self, key, result=None, error=None):
+        self.key = key
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return 'BatchItem(' + repr(self.key) + ', result=' + repr(self.result) + ')'
+
+        return 'BatchItem(' + repr(self.key) + ', error=' + repr(self.error) + ')'
+
+class BatchResult:
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    @property
+    def results(self):
+        return [item.result for item in self.items]
+
+    @property
+    def succeeded(self):
+        return [item for item in self.items if item.ok]
+
+    @property
+    def failed(self):
+        return [item for item in self.items if not item.ok]
+
+def run_batch(function, keys, concurrency=None):
+    keys = list(keys)
+
+    if concurrency is None:
+        concurrency = DEFAULT_CONCURRENCY
+
+    def call(key):
+        try:
+            return BatchItem(key, result=function(key))
+        except Exception as e:
+            return BatchItem(key, error=e)
+
+    if concurrency <= 1 or len(keys) <= 1:
+        return BatchResult([call(key) for key in keys])
+
+    # workers see the caller's context variables, e.g. the rate limiter lane
+    context = contextvars.copy_context()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(concurrency, len(keys))) as executor:
+        return BatchResult(list(executor.map(lambda key: context.copy().run(call, key), keys)))
+
+async def run_batch_async(function, keys, concurrency=None):
+    if concurrency is None:
+        concurrency = DEFAULT_CONCURRENCY
+
+    limit = asyncio.Semaphore(max(concurrency, 1))
+
+    async def call(key):
+        async with limit:
+            try:
+                return BatchItem(key, result=await function(key))
+            except Exception as e:
+                return BatchItem(key, error=e)
+
+    return BatchResult(list(await asyncio.gather(*(call(key) for key in keys))))
+
+def chunked(items, chunk_size):
+    # lists of up to chunk_size items, without reading items further ahead than that
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+    iterator = iter(items)
+
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+def _chunk_items(chunk, results, error):
+    # one item per input; results, when the function returned any, line up with the chunk
+    if error is None and results is not None and len(results) != len(chunk):
+        error = ValueError('Got ' + str(len(results)) + ' results for a chunk of ' + str(len(chunk)) + ' items')
+
+    if error is not None:
+        return [BatchItem(key, error=error) for key in chunk]
+
+    if results is None:
+        return [BatchItem(key) for key in chunk]
+
+    return [BatchItem(key, result=result) for key, result in zip(chunk, results)]
+
+def run_chunked(function, items, chunk_size=None, concurrency=None, retries=2, retry_delay=0.5, retry_errors=TRANSIENT_ERRORS):
+    # calls function(chunk) for chunks of items, concurrency chunks at a time. items may be any iterable, it's only read
+    # as chunks are sent. a chunk that fails with one of retry_errors is tried again up to retries times, backing off
+    # exponentially; if it still fails (or fails otherwise), every item in it gets the error. so does every item of a
+    # chunk whose results don't line up with it. returns one BatchItem per item, in order.
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+
+    if concurrency is None:
+        concurrency = DEFAULT_CONCURRENCY
+
+    def call(chunk):
+        for attempt in range(retries + 1):
+            try:
+                return _chunk_items(chunk, function(chunk), None)
+            except retry_errors as e:
+                error = e
+            except Exception as e:
+                return _chunk_items(chunk, None, e)
+
+            if attempt < retries:
+                time.sleep(retry_delay * 2 ** attempt)
+
+        return _chunk_items(chunk, None, error)
+
+    chunks = chunked(items, chunk_size)
+    done = {}
+
+    if concurrency <= 1:
+        return BatchResult([item for chunk in chunks for item in call(chunk)])
+
+    context = contextvars.copy_context()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+
+        for index, chunk in enumerate(chunks):
+            if len(pending) >= concurrency:
+                finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in finished:
+                    done[pending.pop(future)] = future.result()
+
+            pending[executor.submit(context.copy().run, call, chunk)] = index
+
+        for future in pending:
+            done[pending[future]] = future.result()
+
+    return BatchResult([item for index in sorted(done) for item in done[index]])
+
+async def run_chunked_async(function, items, chunk_size=None, concurrency=None, retries=2, retry_delay=0.5, retry_errors=TRANSIENT_ERRORS):
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+
+    if concurrency is None:
+        concurrency = DEFAULT_CONCURRENCY
+
+    limit = asyncio.Semaphore(max(concurrency, 1))
+
+    async def call(chunk):
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    return _chunk_items(chunk, await function(chunk), None)
+                except retry_errors as e:
+                    error = e
+                except Exception as e:
+                    return _chunk_items(chunk, None, e)
+
+                if attempt < retries:
+                    await asyncio.sleep(retry_delay * 2 ** attempt)
+
+            return _chunk_items(chunk, None, error)
+        finally:
+            limit.release()
+
+    tasks = []
+
+    # the next chunk is only taken from items once there's room for it
+    for chunk in chunked(items, chunk_size):
+        await limit.acquire()
+        tasks.append(asyncio.ensure_future(call(chunk)))
+
+    return BatchResult([item for items in await asyncio.gather(*tasks) for item in items])
@@ -0,0 +1,571 @@
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+import urllib.parse
+
+import pwned.analytics
+import pwned.batch
+import pwned.client
+import pwned.codec
+import pwned.columnar
+import pwned.compression
+import pwned.competitions
+import pwned.fakeserver
+import pwned.identity
+import pwned.metrics
+import pwned.pool
+import pwned.ratelimit
+import pwned.simulation
+import pwned.snapshot
+import pwned.standings
+import pwned.support
+import pwned.sync
+
+# run with `python -m pwned.benchmarks [name ...]`; everything runs against pwned.fakeserver
+BENCHMARKS = collections.OrderedDict()
+
+def benchmark(function):
+    BENCHMARKS[function.__name__] = function
+    return function
+
+def measure(function, repeat=5, number=1):
+    return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+def report(name, seconds, count=1, unit='call'):
+    print('  {:<56} {:>10.3f} ms/{}'.format(name, seconds * 1000 / count, unit))
+
+def rounds_payload(match_count, rounds=10):
+    signups = [{
+        'id': i, 'name': 'Team ' + str(i), 'hasServer': True, 'isAccepted': True, 'onWaitingList': False,
+        'contact': 'Contact ' + str(i), 'seeding': i, 'clanId': 1000 + i, 'remoteId': str(i),
+    } for i in range(64)]
+    payload = []
+    match_id = 0
+
+    for round_number in range(1, rounds + 1):
+        matches = []
+
+        for i in range(match_count // rounds):
+            match_id += 1
+            matches.append({
+                'id': match_id, 'signup': signups[i % 64], 'signupOpponent': signups[(i + 1) % 64], 'score': i % 16,
+                'scoreOpponent': (i + 3) % 16, 'seeding': i, 'seedingOpponent': i + 1, 'isWalkover': False,
+                'time': '2026-10-18 20:00:00', 'mapName': 'de_dust2',
+            })
+
+        payload.append({
+            'roundNumber': round_number, 'identifier': 'round-' + str(round_number), 'name': 'Round ' + str(round_number),
+            'description': None, 'time': None, 'startedAt': None, 'groups': [],
+            'stages': [{'mapName': None, 'description': None, 'time': None, 'matches': matches}],
+        })
+
+    return payload
+
+@benchmark
+def decode():
+    payload = rounds_payload(10000)
+
+    generic = measure(lambda: [pwned.support.from_api_call_generic(pwned.support.Round, el) for el in payload])
+    compiled = measure(lambda: [pwned.support.Round.from_api_call(el) for el in payload])
+    lazy = measure(lambda: [(round.round_number, round.time) for round in (pwned.support.Round.from_api_call(el, lazy=True) for el in payload)])
+    lazy_all = measure(lambda: [round.stages[0].matches[-1].signup.name for round in (pwned.support.Round.from_api_call(el, lazy=True) for el in payload)])
+
+    report('get_rounds payload, 10k matches, generic loop', generic)
+    report('get_rounds payload, 10k matches, compiled decoders', compiled)
+    print('  speedup: {:.1f}x'.format(generic / compiled))
+    report('lazy, reading round_number and time only', lazy)
+    report('lazy, then decoding the last match of every round', lazy_all)
+
+@benchmark
+def codec():
+    body = json.dumps({'result': rounds_payload(10000)}).encode('utf-8')
+    signups = [pwned.support.Signup(name='Team ' + str(i), contact='Contact ' + str(i), seeding=i).get_api_dict() for i in range(5000)]
+    print('  {:.1f} MB of rounds, {} signups'.format(len(body) / 1024 / 1024, len(signups)))
+
+    report('decode rounds, json.loads(body.decode())', measure(lambda: json.loads(body.decode('utf-8'))))
+
+    for name in pwned.codec.available_codecs():
+        json_codec = pwned.codec.get_codec(name)
+        report('decode rounds, ' + name + ' from bytes', measure(lambda: json_codec.decode(body)))
+
+    for name in pwned.codec.available_codecs():
+        json_codec = pwned.codec.get_codec(name)
+        report('encode signups, ' + name, measure(lambda: json_codec.encode(signups)))
+
+@benchmark
+def compression():
+    body = json.dumps({'result': rounds_payload(10000)}).encode('utf-8')
+    compressed = pwned.compression.compress(body)
+    print('  rounds for 10k matches: {:.2f} MB, {:.2f} MB gzipped (ratio {:.3f})'.format(len(body) / 1024 / 1024, len(compressed) / 1024 / 1024, len(compressed) / len(body)))
+
+    report('gzip rounds', measure(lambda: pwned.compression.compress(body)))
+    report('gunzip rounds', measure(lambda: pwned.compression.decompress(compressed, 'gzip')))
+
+    # over loopback the network is free, so this shows what compressing costs rather than what it saves
+    with pwned.fakeserver.FakeServer(compression=True) as server:
+        pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123')
+        league = create_league(pwned_client, 64)
+        pwned_client.close()
+
+        for compressed_responses in (False, True):
+            client_metrics = pwned.metrics.ClientMetrics()
+            pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123', metrics=client_metrics, compression=compressed_responses)
+            elapsed = measure(lambda: pwned_client.get_rounds('league', league.id))
+            endpoint = client_metrics.snapshot()['GET leagues/{id}/rounds']
+
+            report('get_rounds, 64 team league, ' + ('gzip' if compressed_responses else 'uncompressed'), elapsed)
+            print('  {:<56} {:>10.0f} bytes/call received'.format('', endpoint['response_wire_bytes'] / endpoint['requests']))
+            pwned_client.close()
+
+def footprint(match_count=10000, shared=False):
+    body = json.dumps(rounds_payload(match_count)).encode('utf-8')
+    identities = pwned.identity.IdentityMap() if shared else None
+
+    # what's left after decoding a response body, once the parsed JSON is gone
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rounds = [pwned.support.Round.from_api_call(el, identities=identities) for el in json.loads(body)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # without an identity map, every match holds two signups and its strings of its own
+    return {'compact': pwned.support.COMPACT_MODELS, 'per_match': (after - before) / match_count, 'total': after - before}
+
+@benchmark
+def memory():
+    for shared in (False, True):
+        code = 'import json, pwned.benchmarks; print(json.dumps(pwned.benchmarks.footprint(shared=' + str(shared) + ')))'
+
+        for compact in ('0', '1'):
+            environment = dict(os.environ, PWNED_COMPACT_MODELS=compact)
+            result = json.loads(subprocess.run([sys.executable, '-c', code], env=environment, check=True, capture_output=True).stdout)
+            label = ('compact (__slots__)' if result['compact'] else 'regular (__dict__)') + (', identity map' if shared else '')
+
+            print('  {:<56} {:>10.0f} bytes/match, {:.1f} MB for 10k matches'.format(label, result['per_match'], result['total'] / 1024 / 1024))
+
+@contextlib.contextmanager
+def separate_server(*args):
+    # a server in its own process, so it doesn't show up in this process' memory or CPU numbers
+    process = subprocess.Popen([sys.executable, '-m', 'pwned.fakeserver'] + list(args), stdout=subprocess.PIPE, text=True)
+
+    try:
+        yield process.stdout.readline().strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+def create_league(pwned_client, teams):
+    league = pwned_client.create_league(pwned.competitions.League(name='Benchmark', game_id=3, league_type='league', team_count=teams))
+    league.add_signups([pwned.support.Signup(name='Team ' + str(i), contact='Contact ' + str(i), seeding=i + 1) for i in range(teams)])
+    league.start()
+
+    return league
+
+def peak_memory(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = function()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return first, elapsed, peak
+
+@benchmark
+def streaming():
+    with separate_server() as base_url:
+        pwned_client = pwned.client.Pwned(base_url, 'abc', '123')
+        league = create_league(pwned_client, 200)
+
+        def first_of(iterable):
+            started = time.perf_counter()
+
+            for count, el in enumerate(iterable(), 1):
+                if count == 1:
+                    first = time.perf_counter() - started
+
+            return first, count
+
+        for label, function in (('get_rounds', lambda: first_of(lambda: (match for round in league.get_rounds() for stage in round.stages for match in stage.matches))),
+                                ('iter_matches', lambda: first_of(league.iter_matches))):
+            (first, count), elapsed, peak = peak_memory(function)
+            print('  {:<20} {} matches, first after {:.1f} ms, done after {:.1f} ms, peak {:.1f} MB'.format(label, count, first * 1000, elapsed * 1000, peak / 1024 / 1024))
+
+        pwned_client.close()
+
+@benchmark
+def requests():
+    count = 200
+
+    with pwned.fakeserver.FakeServer(latency=0.001) as server:
+        pooled = pwned.client.Pwned(server.base_url, 'abc', '123')
+        unpooled = pwned.client.Pwned(server.base_url, 'abc', '123', pool=pwned.pool.ConnectionPool(max_size=0))
+        ids = [pooled.create_tournament(pwned.competitions.Tournament(name='Benchmark', template='singleelim4')).id for i in range(count)]
+
+        report('get_games, new connection per request', measure(lambda: [unpooled.get_games() for i in range(count)], repeat=3), count)
+        report('get_games, pooled connections', measure(lambda: [pooled.get_games() for i in range(count)], repeat=3), count)
+        report('get_tournament, sequential', measure(lambda: [pooled.get_tournament(id) for id in ids], repeat=3), count)
+        report('get_many tournament, concurrency=8', measure(lambda: pooled.get_many('tournament', ids, concurrency=8), repeat=3), count)
+
+        pooled.close()
+        unpooled.close()
+
+def legacy_build_request(client, resource, request_method, data):
+    # _build_request as it was before prepare(): a new HMAC, urlencode and User-Agent for every request
+    data = json.dumps(data) if data else ''
+    signature = hmac.new(client.private_key.encode('ascii'), bytes((client.public_key + '|' + request_method + '|' + resource + '|' + data).encode('utf-8')), hashlib.sha256).hexdigest()
+    url = client.base_url + resource + '?' + urllib.parse.urlencode({'publicKey': client.public_key, 'signature': signature})
+    headers = {'Content-Type': 'application/json', 'User-Agent': 'python-pwned-api/0/' + '.'.join(str(x) for x in sys.version_info[0:3]), }
+
+    return url, bytes(data.encode('utf-8')) if data else None, headers
+
+@benchmark
+def prepare():
+    client = pwned.client.Pwned('https://api.pwned.no/', 'abc', '123')
+    match = pwned.support.Match(id=12, score=2, score_opponent=1, is_walkover=False).get_api_dict()
+    count = 10000
+
+    for label, method, data in (('GET', 'GET', None), ('POST match', 'POST', match)):
+        legacy = measure(lambda: [legacy_build_request(client, 'tournaments/1/matches/12', method, data) for i in range(count)])
+        prepared = measure(lambda: [client.prepare('tournaments/1/matches/12', method, data) for i in range(count)])
+
+        print('  {:<56} {:>10.2f} µs/request'.format(label + ', new HMAC per request', legacy * 1000000 / count))
+        print('  {:<56} {:>10.2f} µs/request'.format(label + ', prepare() with cached HMAC state', prepared * 1000000 / count))
+
+@benchmark
+def metrics():
+    count = 1000
+
+    with separate_server() as base_url:
+        client_metrics = pwned.metrics.ClientMetrics()
+        disabled = pwned.client.Pwned(base_url, 'abc', '123')
+        enabled = pwned.client.Pwned(base_url, 'abc', '123', metrics=client_metrics)
+        timings = {disabled: [], enabled: []}
+
+        # interleaved, so both see the same warm-up and background noise
+        for i in range(5):
+            for pwned_client in timings:
+                timings[pwned_client].append(measure(lambda: [pwned_client.get_games() for i in range(count)], repeat=1))
+
+        report('get_games, metrics disabled', min(timings[disabled]), count)
+        report('get_games, metrics enabled', min(timings[enabled]), count)
+        disabled.close()
+        enabled.close()
+
+        latency = client_metrics.snapshot()['GET games']['latency']
+        print('  p50 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms'.format(latency['p50'] * 1000, latency['p99'] * 1000, latency['max'] * 1000))
+
+@benchmark
+def standings():
+    # a result comes in for a 64 team league; how long until the table reflects it
+    with pwned.fakeserver.FakeServer() as server:
+        pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123')
+        league = create_league(pwned_client, 64)
+        rounds = league.get_rounds()
+        matches = [match for round in rounds for stage in round.stages for match in stage.matches]
+
+        for i, match in enumerate(matches):
+            match.score, match.score_opponent = i % 4, i % 3
+
+        league.update_matches(matches)
+        league_standings = league.get_standings()
+        match = matches[0]
+
+        def apply():
+            match.score += 1
+            league_standings.apply_match(match)
+            league_standings.table()
+
+        def rebuild():
+            rebuilt = pwned.standings.LeagueStandings(league_standings.scoring_model, [row.signup for row in league_standings.table()])
+            rebuilt.apply_matches(matches)
+            rebuilt.table()
+
+        print('  {} matches'.format(len(matches)))
+        report('get_table from the API', measure(lambda: league.get_table(), repeat=20))
+        report('rebuild the table from every match', measure(rebuild, repeat=20))
+        report('apply_match, then read the table', measure(apply, repeat=20, number=100))
+
+        pwned_client.close()
+
+@benchmark
+def analytics():
+    # a season of 1000 leagues with 64 teams and 1000 played matches each
+    rng = random.Random(1)
+    results = pwned.analytics.LeagueResults()
+    scoring_model = pwned.support.LeagueScoringModel(points_win=3, points_draw=1, points_loss=0, points_bonus=None)
+    signups = [pwned.support.Signup(id=i, name='Team ' + str(i)) for i in range(64)]
+    started = time.perf_counter()
+
+    for league_id in range(1000):
+        results.add_league(league_id, scoring_model, signups)
+
+        for i in range(1000):
+            results.add_match(league_id, rng.randrange(64), rng.randrange(64), rng.randrange(5), rng.randrange(5))
+
+    print('  {} matches in {} leagues, loaded in {:.2f} s'.format(len(results), len(results.league_ids), time.perf_counter() - started))
+
+    backends = ['python'] + (['numpy'] if pwned.analytics.numpy is not None else [])
+
+    for backend in backends:
+        report('compute, ' + backend, measure(lambda: results.compute(backend=backend), repeat=3))
+
+    statistics = results.compute()
+    report('LeagueTablePosition tables for every league', measure(statistics.tables, repeat=3))
+
+@benchmark
+def sync():
+    # a mirror of 200 leagues, 5 of which see a result between cycles
+    with pwned.fakeserver.FakeServer() as server:
+        pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123')
+        leagues = [create_league(pwned_client, 8) for i in range(200)]
+        engine = pwned.sync.SyncEngine(pwned_client)
+
+        for league in leagues:
+            engine.track('league', league.id)
+
+        engine.sync()
+        rng = random.Random(1)
+
+        def activity():
+            for league in rng.sample(leagues, 5):
+                match = league.get_round(1).stages[0].matches[0]
+                match.score, match.score_opponent = rng.randint(0, 5), rng.randint(0, 5)
+                league.update_match(match)
+
+        def refetch():
+            pwned.batch.run_batch(lambda league: (pwned_client.get_league(league.id), league.get_signups(), league.get_rounds()), leagues)
+
+        def incremental():
+            activity()
+            started = time.perf_counter()
+            report = engine.sync()
+            elapsed[0] += time.perf_counter() - started
+            requests[0] += report.requests
+
+        elapsed, requests = [0.0], [0]
+        report('re-fetching every league, signups and rounds, 600 requests', measure(refetch, repeat=3), unit='cycle')
+
+        for i in range(3):
+            incremental()
+
+        report('SyncEngine.sync, {:.0f} requests'.format(requests[0] / 3), elapsed[0] / 3, unit='cycle')
+        pwned_client.close()
+
+@benchmark
+def snapshot():
+    # every match a team played in a season of 50 leagues, from the API and from a local snapshot
+    with pwned.fakeserver.FakeServer() as server, tempfile.TemporaryDirectory() as directory:
+        pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123')
+        leagues = []
+
+        for i in range(50):
+            league = pwned_client.create_league(pwned.competitions.League(name='Season ' + str(i), game_id=3, team_count=16))
+            league.add_signups([pwned.support.Signup(name='Team ' + str(j), remote_id='team-' + str(j), clan_id=j) for j in range(16)])
+            league.start()
+            leagues.append(league)
+
+        store = pwned.snapshot.SnapshotStore(os.path.join(directory, 'snapshot.db'))
+        started = time.perf_counter()
+
+        for league in leagues:
+            store.snapshot(league)
+
+        print('  snapshot of 50 leagues, {} matches, in {:.2f} s'.format(len(store.find_matches()), time.perf_counter() - started))
+
+        def from_api():
+            result = pwned.batch.run_batch(lambda league: league.get_rounds(), leagues)
+
+            return [match for rounds in result.results for round in rounds for stage in round.stages for match in stage.matches
+                    if (match.signup and match.signup.remote_id == 'team-7') or (match.signup_opponent and match.signup_opponent.remote_id == 'team-7')]
+
+        report('matches of one team, get_rounds of every league', measure(from_api, repeat=3))
+        report('matches of one team, find_matches(remote_id=...)', measure(lambda: store.find_matches(remote_id='team-7'), repeat=10))
+
+        store.close()
+        pwned_client.close()
+
+@benchmark
+def columnar():
+    # a season of 200 leagues with 20 teams each (38,000 matches): the matches of one league and of one team, from a
+    # columnar archive and from a pickle of every league's rounds
+    signups = [pwned.support.Signup(id=i, name='Team ' + str(i), remote_id='team-' + str(i)) for i in range(20)]
+    history = {}
+
+    for league_id in range(1, 201):
+        rounds = []
+
+        for round_number in range(1, 20):
+            matches = [pwned.support.Match(
+                id=league_id * 1000 + round_number * 10 + i, signup=signups[i], signup_opponent=signups[(i + round_number) % 20],
+                score=random.randint(0, 3), score_opponent=random.randint(0, 3), is_walkover=False, time=1700000000, map_name='de_dust2')
+                for i in range(10)]
+            rounds.append(pwned.support.Round(round_number=round_number, name='Round ' + str(round_number), stages=[pwned.support.RoundStage(matches=matches)]))
+
+        history[league_id] = rounds
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'archive')
+        started = time.perf_counter()
+
+        with pwned.columnar.ColumnarWriter(path) as writer:
+            for league_id, rounds in history.items():
+                writer.append_signups('league', league_id, signups)
+                writer.append_rounds('league', league_id, rounds)
+
+        print('  archived {} matches in {:.2f} s, {} KiB'.format(
+            200 * 19 * 10, time.perf_counter() - started, sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) // 1024))
+
+        pickled = os.path.join(directory, 'history.pickle')
+
+        with open(pickled, 'wb') as f:
+            pickle.dump(history, f)
+
+        def from_pickle(select):
+            with open(pickled, 'rb') as f:
+                loaded = pickle.load(f)
+
+            return [match for league_id, rounds in loaded.items() for round in rounds for stage in round.stages for match in stage.matches if select(league_id, match)]
+
+        def from_archive(**filters):
+            with pwned.columnar.ColumnarReader(path) as reader:
+                return list(reader.matches(**filters))
+
+        report('one league, pickle.load', measure(lambda: from_pickle(lambda league_id, match: league_id == 150), repeat=3))
+        report('one league, ColumnarReader.matches', measure(lambda: from_archive(type='league', competition_id=150), repeat=10))
+        report('one team, pickle.load', measure(lambda: from_pickle(lambda league_id, match: match.signup.id == 7 or match.signup_opponent.id == 7), repeat=3))
+        report('one team, ColumnarReader.matches', measure(lambda: from_archive(signup_id=7), repeat=3))
+
+        with pwned.columnar.ColumnarReader(path) as reader:
+            report('one team, ColumnarReader.match_rows', measure(lambda: reader.match_rows(signup_id=7), repeat=10))
+
+@benchmark
+def simulation():
+    # odds for 64 team brackets with the first round played, in one process and spread over every core
+    workers = os.cpu_count()
+
+    with pwned.fakeserver.FakeServer() as server, concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123')
+
+        for template in ('singleelim64', 'doubleelim64'):
+            tournament = pwned_client.create_tournament(pwned.competitions.Tournament(name='Cup', template=template))
+            tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(64)])
+            tournament.start()
+
+            ratings = {signup.id: random.gauss(1500, 200) for signup in tournament.get_signups()}
+            matches = tournament.get_round(1).stages[0].matches
+
+            for match in matches[1:]:
+                match.score, match.score_opponent = random.choice(((2, 0), (0, 2)))
+                tournament.update_match(match)
+
+            simulation = pwned.simulation.TournamentSimulation.from_tournament(tournament, ratings)
+            backend = 'numpy' if pwned.simulation.numpy is not None else 'python'
+            simulation.run(workers * 1000, executor=executor, batch_size=1000)
+
+            report(template + ', 1,000,000 runs in one process (' + backend + ')', measure(lambda: simulation.run(1000000, seed=1, workers=1), repeat=1))
+            report(template + ', 1,000,000 runs, pool of ' + str(workers), measure(lambda: simulation.run(1000000, seed=1, executor=executor), repeat=1))
+
+            def refresh():
+                matches[0].score, matches[0].score_opponent = 2, 1
+                tournament.update_match(matches[0])
+                simulation.apply_match(matches[0])
+                simulation.run(100000, seed=1, executor=executor)
+
+            report(template + ', update_match and 100,000 runs', measure(refresh, repeat=3))
+
+        pwned_client.close()
+
+@benchmark
+def writes():
+    # 64 teams play 32 matches per round; the latency stands in for the round trip to the real API
+    with pwned.fakeserver.FakeServer(latency=0.02) as server:
+        pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123')
+        league = create_league(pwned_client, 64)
+        rounds = league.get_rounds_by_index([1, 2]).results
+
+        def results(round):
+            matches = round.stages[0].matches
+
+            for match in matches:
+                match.score, match.score_opponent = 2, 1
+
+            return matches
+
+        sequential = measure(lambda: [league.update_match(match) for match in results(rounds[0])], repeat=1)
+        batched = measure(lambda: league.update_matches(results(rounds[1])), repeat=1)
+
+        report('update_match, 32 matches one after the other', sequential, unit='round')
+        report('update_matches, 32 matches, concurrency=8', batched, unit='round')
+
+        pwned_client.close()
+
+@benchmark
+def ratelimit():
+    # a bulk job and an interactive caller share one client against an API allowing 100 requests per second
+    with pwned.fakeserver.FakeServer(rate_limit=100) as server:
+        for limiter in (None, pwned.ratelimit.RateLimiter(rate=50)):
+            pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123', pool=pwned.pool.ConnectionPool(max_size=16), limiter=limiter)
+            lane = limiter.lane('bulk') if limiter else contextlib.nullcontext()
+            interactive = []
+            attempts = 0
+            bulk = {}
+            time.sleep(1)
+
+            def background():
+                with lane:
+                    bulk['result'] = pwned.batch.run_batch(lambda i: pwned_client.get_games(), range(400), concurrency=8)
+
+            thread = threading.Thread(target=background)
+            started = time.perf_counter()
+            thread.start()
+
+            while thread.is_alive():
+                call_started = time.perf_counter()
+                attempts += 1
+
+                try:
+                    pwned_client.get_games()
+                    interactive.append(time.perf_counter() - call_started)
+                except pwned.client.PwnedAPIException:
+                    pass
+
+                time.sleep(0.05)
+
+            elapsed = time.perf_counter() - started
+            failed = len(bulk['result'].failed)
+            label = 'adaptive limiter' if limiter else 'no limiter'
+
+            print('  {:<20} 400 bulk requests in {:.2f} s, {} failed, interactive calls {}/{} ok, mean {:.1f} ms'.format(
+                label, elapsed, failed, len(interactive), attempts, 1000 * sum(interactive) / max(len(interactive), 1)))
+
+            if limiter:
+                print('  {:<20} {}'.format('', {k: v for k, v in limiter.stats().items() if k != 'lanes'}))
+
+            pwned_client.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for the pwned client, run against an in-process fake API.')
+    parser.add_argument('names', nargs='*', choices=[[]] + list(BENCHMARKS), help='benchmarks to run (default: all)')
+    args = parser.parse_args(argv)
+
+    for name in args.names or BENCHMARKS:
+        print(name)
+        BENCHMARKS[name]()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import collections
+import functools
+import re
+
+TEMPLATE = re.compile(r'(singleelim|doubleelim)(\d+)$')
+
+# where a match's winner or loser goes on to: a match of a later round, and which side of it (0 for signup, 1 for
+# signup_opponent)
+Slot = collections.namedtuple('Slot', ('round_index', 'match_index', 'side'))
+
+# the layout of an elimination template: the name and match count of every round, and for each match, as a
+# (round index, match index) pair, the slots its winner and its loser go on to.
+#
+# single elimination: the winners of matches 2i and 2i+1 meet in match i of the next round.
+#
+# double elimination: the upper bracket is laid out the same way, and its rounds come first. then come the lower
+# bracket's rounds, and last a grand final between the winners of both brackets (without a reset). the losers of the
+# upper bracket's first round meet in pairs. after that, the lower bracket's rounds alternate between taking in the
+# losers of the next upper round (in reverse order, so teams don't meet again straight away) and halving the field.
+#
+# the API's rounds don't have to be the bracket's. a round of the API has one stage per bracket round played in it,
+# and schedule lists the API's rounds as (name, indexes of the bracket rounds in its stages, in stage order). single
+# elimination has a round per bracket round. in double elimination, the API's round n has the upper bracket's round n
+# (while there is one) and the lower bracket's round n - 1 as its stages; the grand final is a round of its own.
+# layout maps every bracket round to its (round index, stage index) in the API's rounds.
+class Bracket:
+    def __init__(self, template, teams):
+        self.template = template
+        self.teams = teams
+        self.rounds = []
+        self.winners = {}
+        self.losers = {}
+        self.schedule = []
+        self.layout = []
+
+    def __len__(self):
+        return len(self.rounds)
+
+    @property
+    def final(self):
+        # the match whose winner wins the tournament
+        return (len(self.rounds) - 1, 0)
+
+    def matches(self):
+        # every (round index, match index), in the order they can be played
+        return [(round_index, match_index) for round_index, (name, match_count) in enumerate(self.rounds) for match_index in range(match_count)]
+
+    def sources(self):
+        # the other way around: for every slot that's filled from an earlier match, ('winner' or 'loser', match)
+        sources = {}
+
+        for outcome, targets in (('winner', self.winners), ('loser', self.losers)):
+            for match, slot in targets.items():
+                sources[slot] = (outcome, match)
+
+        return sources
+
+    def _add_round(self, name, match_count):
+        self.rounds.append((name, match_count))
+
+        return len(self.rounds) - 1
+
+    def _schedule(self, schedule):
+        self.schedule = schedule
+        self.layout = [None] * len(self.rounds)
+
+        for api_round_index, (name, round_indexes) in enumerate(schedule):
+            for stage_index, round_index in enumerate(round_indexes):
+                self.layout[round_index] = (api_round_index, stage_index)
+
+@functools.lru_cache(maxsize=None)
+def from_template(template):
+    # the Bracket of singleelimN and doubleelimN templates, N being a power of two. brackets are shared, don't
+    # change them
+    match = TEMPLATE.match(template or '')
+
+    if not match:
+        raise ValueError('Unknown template: ' + str(template))
+
+    kind, teams = match.group(1), int(match.group(2))
+
+    if teams < (4 if kind == 'doubleelim' else 2) or teams & (teams - 1):
+        raise ValueError('Unsupported number of teams: ' + template)
+
+    bracket = Bracket(template, teams)
+    round_count = teams.bit_length() - 1
+
+    if kind == 'singleelim':
+        names = ['Round ' + str(round_number) for round_number in range(1, round_count + 1)]
+        names[-1] = 'Final'
+
+        if round_count > 1:
+            names[-2] = 'Semifinal'
+    else:
+        names = ['Upper round ' + str(round_number) for round_number in range(1, round_count)] + ['Upper final']
+
+    upper = [bracket._add_round(name, teams >> round_number) for round_number, name in enumerate(names, 1)]
+
+    for previous, current in zip(upper, upper[1:]):
+        for match_index in range(bracket.rounds[previous][1]):
+            bracket.winners[(previous, match_index)] = Slot(current, match_index // 2, match_index % 2)
+
+    if kind == 'singleelim':
+        bracket._schedule([(name, [round_index]) for round_index, (name, match_count) in enumerate(bracket.rounds)])
+
+        return bracket
+
+    lower_names = ['Lower round ' + str(round_number) for round_number in range(1, 2 * round_count - 2)] + ['Lower final']
+    lower_names.reverse()
+
+    previous = bracket._add_round(lower_names.pop(), teams // 4)
+    lower = [previous]
+
+    for match_index in range(teams // 2):
+        bracket.losers[(upper[0], match_index)] = Slot(previous, match_index // 2, match_index % 2)
+
+    for upper_index in upper[1:]:
+        match_count = bracket.rounds[upper_index][1]
+        current = bracket._add_round(lower_names.pop(), match_count)
+        lower.append(current)
+
+        for match_index in range(match_count):
+            bracket.winners[(previous, match_index)] = Slot(current, match_index, 0)
+            bracket.losers[(upper_index, match_index)] = Slot(current, match_count - 1 - match_index, 1)
+
+        previous = current
+
+        if match_count > 1:
+            current = bracket._add_round(lower_names.pop(), match_count // 2)
+            lower.append(current)
+
+            for match_index in range(match_count):
+                bracket.winners[(previous, match_index)] = Slot(current, match_index // 2, match_index % 2)
+
+            previous = current
+
+    grand_final = bracket._add_round('Grand final', 1)
+    bracket.winners[(upper[-1], 0)] = Slot(grand_final, 0, 0)
+    bracket.winners[(previous, 0)] = Slot(grand_final, 0, 1)
+
+    schedule = [('Round 1', [upper[0]])]
+
+    for round_number in range(2, len(lower) + 2):
+        schedule.append(('Round ' + str(round_number), upper[round_number - 1:round_number] + [lower[round_number - 2]]))
+
+    bracket._schedule(schedule + [('Grand final', [grand_final])])
+
+    return bracket
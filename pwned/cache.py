@@ -0,0 +1,108 @@
+import collections
+import threading
+import time
+
+# resources that only change through explicit writes, and how long to keep them (in seconds)
+DEFAULT_TTLS = {
+    'games': 3600,
+    'countries': 3600,
+    'tournaments/templates': 3600,
+    'leagues/scoringmodels': 300,
+}
+
+class ResponseCache:
+    def __init__(self, ttls=None, max_entries=256, max_size=4 * 1024 * 1024):
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def group(self, resource):
+        resource = resource.strip('/')
+
+        for name in self.ttls:
+            if resource == name or resource.startswith(name + '/'):
+                return name
+
+        return None
+
+    def get(self, resource):
+        group = self.group(resource)
+
+        if group is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(resource)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(resource)
+
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(resource)
+            self.hits += 1
+
+            return entry[1]
+
+    def put(self, resource, body):
+        group = self.group(resource)
+
+        if group is None or (self.max_size is not None and len(body) > self.max_size):
+            return
+
+        with self._lock:
+            if resource in self._entries:
+                self._remove(resource)
+
+            self._entries[resource] = (time.monotonic() + self.ttls[group], body)
+            self.size += len(body)
+
+            while self._entries and ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                                     (self.max_size is not None and self.size > self.max_size)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, resource):
+        group = self.group(resource)
+
+        if group is None:
+            return
+
+        with self._lock:
+            for key in [key for key in self._entries if self.group(key) == group]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size': self.size,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, resource):
+        expires, body = self._entries.pop(resource)
+        self.size -= len(body)
@@ -1,20 +1,70 @@
-import urllib.request, urllib.parse, http.client
-import json
+import urllib.parse
 import hmac, hashlib
 import sys
+import collections
+import time
 
 import pwned.competitions
+import pwned.pool
+import pwned.batch
+import pwned.streaming
+import pwned.profiling
+import pwned.codec
+import pwned.compression
+
+# a signed request, ready to be sent (any number of times) with Pwned.send. size is the length of the encoded payload,
+# before compression
+PreparedRequest = collections.namedtuple('PreparedRequest', ('resource', 'method', 'url', 'body', 'headers', 'size'))
 
 class Pwned:
     __version = '0'
 
-    def __init__(self, base_url, public_key, private_key):
+    def __init__(self, base_url, public_key, private_key, pool=None, cache=None, store=None, lazy=False, identities=None, limiter=None, metrics=None, codec=None, compression=True, compress_requests=None):
         if not base_url.endswith('/'):
             base_url = base_url + '/'
     
+        if pool is None:
+            pool = pwned.pool.ConnectionPool()
+
         self.base_url = base_url
         self.public_key = public_key
         self.private_key = private_key
+        self.pool = pool
+        self.cache = cache
+        self.store = store
+        self.lazy = lazy
+        self.identities = identities
+        self.limiter = limiter
+        self.metrics = metrics
+        
+        if codec is None or isinstance(codec, str):
+            codec = pwned.codec.get_codec(codec)
+        
+        self.codec = codec
+        
+        # compression asks for compressed responses; compress_requests gzips request bodies from that many bytes on
+        if compress_requests is True:
+            compress_requests = pwned.compression.DEFAULT_THRESHOLD
+        
+        self.compression = compression
+        self.compress_requests = compress_requests
+        
+        # keyed signing state per request method and everything else that's the same for every request, see prepare
+        self._signers = {}
+        self._signing_keys = None
+        self._headers = {'Content-Type': 'application/json', 'User-Agent': self._user_agent(), }
+        
+        if compression:
+            self._headers['Accept-Encoding'] = pwned.compression.ACCEPT_ENCODING
+        
+        self._compressed_headers = dict(self._headers, **{'Content-Encoding': 'gzip'})
+
+    def close(self):
+        self.pool.close()
+    
+    def profile(self, callback=None):
+        # with client.profile() as profile: ... times every call made in the block, see pwned.profiling
+        return pwned.profiling.Profile(callback)
         
     def create_tournament(self, tournament):
         response = self._request('tournaments', 'POST', tournament.get_api_dict())
@@ -33,6 +83,9 @@ class Pwned:
             return getattr(self, 'get_' + str(type))(id)
 
         raise PwnedAPIException('Unknown type for get: ' + str(type))
+
+    def get_many(self, type, ids, concurrency=None):
+        return pwned.batch.run_batch(lambda id: self.get(type, id), ids, concurrency)
     
     def get_league(self, id):
         response = self._get_competition('league', id)
@@ -71,6 +124,19 @@ class Pwned:
     
         return self._request(type + 's/' + str(competition_id) + '/signups', 'POST', data)
     
+    def import_signups(self, type, competition_id, signups, chunk_size=None, concurrency=None, retries=2):
+        # signups may be any iterable; each item of the result has the created Signup, or the error its chunk failed with
+        # adding signups isn't idempotent, so a chunk is only sent again if it can't have reached the API
+        return pwned.batch.run_chunked(lambda chunk: self._decode_signups(self.add_signups(type, competition_id, chunk)), signups, chunk_size, concurrency, retries, retry_errors=pwned.batch.UNSENT_ERRORS)
+    
+    def _decode_signups(self, response):
+        # a chunk that got a successful response was added; the created signups come back only when the API sends them
+        # as a list, anything else (True, a count, an empty body) leaves the items without a result
+        if not isinstance(response, list):
+            return None
+        
+        return [pwned.support.Signup.from_api_call(el, identities=self.identities) for el in response]
+    
     def get_signups(self, type, competition_id):
         response = self._request(type + 's/' + str(competition_id) + '/signups')
         
@@ -78,7 +144,7 @@ class Pwned:
             signups = []
             
             for el in response:
-                signups.append(pwned.support.Signup.from_api_call(el))
+                signups.append(pwned.support.Signup.from_api_call(el, identities=self.identities))
         
             return signups
             
@@ -89,7 +155,7 @@ class Pwned:
         response = self._request(type + 's/' + str(competition_id) + '/rounds/' + str(round_index))
         
         if not response is None:
-            return pwned.support.Round.from_api_call(response)
+            return pwned.support.Round.from_api_call(response, lazy=self.lazy, identities=self.identities)
 
     def get_rounds(self, type, competition_id):
         response = self._request(type + 's/' + str(competition_id) + '/rounds')
@@ -98,21 +164,41 @@ class Pwned:
             rounds = []
             
             for el in response:
-                rounds.append(pwned.support.Round.from_api_call(el))
+                rounds.append(pwned.support.Round.from_api_call(el, lazy=self.lazy, identities=self.identities))
         
             return rounds
 
+    def get_rounds_by_index(self, type, competition_id, round_indexes, concurrency=None):
+        return pwned.batch.run_batch(lambda round_index: self.get_round(type, competition_id, round_index), round_indexes, concurrency)
+
+    def iter_rounds(self, type, competition_id):
+        for el in self._stream(type + 's/' + str(competition_id) + '/rounds', ('*', )):
+            yield pwned.support.Round.from_api_call(el, lazy=self.lazy, identities=self.identities)
+
+    def iter_matches(self, type, competition_id):
+        for el in self._stream(type + 's/' + str(competition_id) + '/rounds', ('*', 'stages', '*', 'matches', '*')):
+            yield pwned.support.Match.from_api_call(el, lazy=self.lazy, identities=self.identities)
+
     def get_match(self, type, competition_id, match_id):
         response = self._request(type + 's/' + str(competition_id) + '/matches/' + str(match_id))
         
         if not response is None:
-            return pwned.support.Match.from_api_call(response)
+            return pwned.support.Match.from_api_call(response, lazy=self.lazy, identities=self.identities)
+
+    def get_matches(self, type, competition_id, match_ids, concurrency=None):
+        return pwned.batch.run_batch(lambda match_id: self.get_match(type, competition_id, match_id), match_ids, concurrency)
             
     def update_match(self, type, competition_id, match):
         return self._request(type + 's/' + str(competition_id) + '/matches/' + str(match.id), 'POST', match.get_api_dict())
         
     def update_round(self, type, competition_id, round):
-        return self._request(type + 's/' + str(competition_id) + '/rounds/' + round.round_number, 'POST', round.get_api_dict())
+        return self._request(type + 's/' + str(competition_id) + '/rounds/' + str(round.round_number), 'POST', round.get_api_dict())
+
+    def update_matches(self, type, competition_id, matches, concurrency=None):
+        return pwned.batch.run_batch(lambda match: self.update_match(type, competition_id, match), matches, concurrency)
+
+    def update_rounds(self, type, competition_id, rounds, concurrency=None):
+        return pwned.batch.run_batch(lambda round: self.update_round(type, competition_id, round), rounds, concurrency)
 
     def get_league_table(self, league_id):
         response = self._request('leagues/' + str(league_id) + '/table')
@@ -121,7 +207,7 @@ class Pwned:
             table = []
             
             for position in response:
-                table.append(pwned.support.LeagueTablePosition.from_api_call(position))
+                table.append(pwned.support.LeagueTablePosition.from_api_call(position, lazy=self.lazy, identities=self.identities))
     
             return table
 
@@ -192,44 +278,236 @@ class Pwned:
     def _get_competition(self, type, id):
         return self._request(type + 's/' + str(id))
     
-    def _request(self, resource, request_method = 'GET', data = None):
+    def prepare(self, resource, request_method = 'GET', data = None):
         if data:
-            data = json.dumps(data)
+            with pwned.profiling.phase('encode'):
+                data = self.codec.encode(data)
         else:
-            data = ''
+            data = b''
         
+        # the signature covers the payload itself, compressed or not
         url = self.base_url + resource + self._url_query_string(resource, request_method, data)
-        headers = {'Content-Type': 'application/json', 'User-Agent': self._user_agent(), }
-        response = None
-
-        try:
-            if data:
-                data = bytes(data.encode("utf-8"))
-            else:
-                data = None
+        size = len(data)
+        
+        if self.compress_requests is not None and data and size >= self.compress_requests:
+            with pwned.profiling.phase('encode'):
+                data = pwned.compression.compress(data)
             
-            if request_method in ('GET', 'POST'):
-                request = urllib.request.Request(url, data=data, headers=headers)
-                response = urllib.request.urlopen(request).read()
-            else:
-                url_info = urllib.parse.urlparse(url)
-                path = url_info.path
+            return PreparedRequest(resource, request_method, url, data, self._compressed_headers, size)
+        
+        return PreparedRequest(resource, request_method, url, data or None, self._headers, size)
+    
+    def send(self, prepared):
+        cached = self._cache_lookup(prepared.resource, prepared.method)
+        
+        if cached is not None:
+            return self._decode_response(cached)
+        
+        return self._send(prepared)
+    
+    def _request(self, resource, request_method = 'GET', data = None):
+        cached = self._cache_lookup(resource, request_method)
+        
+        if cached is not None:
+            return self._decode_response(cached)
+        
+        return self._send(self.prepare(resource, request_method, data))
+    
+    def _send(self, prepared):
+        call = pwned.profiling.begin(prepared.method, prepared.resource)
+        
+        try:
+            return self._send_profiled(prepared)
+        finally:
+            pwned.profiling.end(call)
+    
+    def _send_profiled(self, prepared):
+        headers = prepared.headers
+        
+        # the prepared headers are shared, conditional request headers go on a copy
+        if self.store is not None:
+            headers = dict(headers)
+        
+        stored = self._store_lookup(prepared.resource, prepared.method, headers)
+        stored_body = None
+        attempt = 0
+        started = time.perf_counter()
+        
+        try:
+            while True:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                
+                response = self.pool.request(prepared.method, prepared.url, body=prepared.body, headers=headers)
                 
-                if url_info.query:
-                    path = path + '?' + url_info.query
+                if self._should_retry(response, attempt):
+                    attempt += 1
+                    continue
                 
-                connection = http.client.HTTPConnection(url_info.netloc)
-                connection.request(request_method, path, body=data, headers=headers)
+                if stored is None or response.status != 304:
+                    break
                 
-                response = connection.getresponse().read()
-                connection.close()
-        except urllib.error.HTTPError as e:
-            response = e.read()
+                stored_body = self._read_stored(prepared.resource, stored, headers)
+                
+                if stored_body is not None:
+                    break
+                
+                # the stored body is gone, the request is sent again without the conditions
+                stored = None
+        except Exception:
+            self._record(prepared, None, time.perf_counter() - started, attempt, 'connection')
+            raise
+        
+        return self._handle_measured_response(prepared, response, stored_body, started, attempt)
+    
+    def _stream(self, resource, path):
+        # yields the values at path in the response as they arrive; bypasses the cache and the response store
+        prepared = self.prepare(resource)
+        call = pwned.profiling.begin(prepared.method, prepared.resource)
+        
+        if self.limiter is not None:
+            self.limiter.acquire()
+        
+        started = time.perf_counter()
         
         try:
-            response = json.loads(response.decode("utf-8"))
+            with self.pool.stream('GET', prepared.url, body=prepared.body, headers=prepared.headers) as response:
+                # for streams, the latency is the time until the response headers arrived
+                elapsed = time.perf_counter() - started
+                read = response.read
+                received = [0]
+                
+                if self.limiter is not None:
+                    self.limiter.update(response.status, response.msg)
+                
+                if self.metrics is not None or call is not None:
+                    # the body is read while it's decoded; only the reads count as reading the body
+                    def read(size):
+                        with pwned.profiling.phase('body'):
+                            chunk = response.read(size)
+                        
+                        received[0] += len(chunk)
+                        
+                        return chunk
+                
+                encoding = response.getheader('Content-Encoding')
+                reader = None
+                
+                if encoding and encoding != 'identity':
+                    reader = pwned.compression.DecompressingReader(read, encoding)
+                    read = reader.read
+                
+                stream = pwned.streaming.JsonStream(read)
+                
+                try:
+                    for el in stream.items(path):
+                        # the caller hydrates the item (and may make other calls) before asking for the next one
+                        pwned.profiling.suspend(call)
+                        yield el
+                        pwned.profiling.resume(call)
+                except ValueError:
+                    self._record(prepared, response, elapsed, 0, 'api', reader.decoded if reader else received[0], received[0])
+                    raise PwnedAPIException('Invalid JSON returned from server.')
+        finally:
+            pwned.profiling.end(call)
+        
+        if stream.envelope.get('error'):
+            self._record(prepared, response, elapsed, 0, 'api', reader.decoded if reader else received[0], received[0])
+            raise PwnedAPIException(stream.envelope['error']['reason'])
+        
+        self._record(prepared, response, elapsed, 0, None, reader.decoded if reader else received[0], received[0])
+    
+    def _handle_measured_response(self, prepared, response, stored_body, started, attempt):
+        wire_size = len(response.body)
+        response = self._decompress(response)
+        
+        if self.metrics is None:
+            return self._handle_response(prepared.resource, prepared.method, response, stored_body)
+        
+        elapsed = time.perf_counter() - started
+        
+        try:
+            result = self._handle_response(prepared.resource, prepared.method, response, stored_body)
+        except PwnedAPIException:
+            self._record(prepared, response, elapsed, attempt, 'api', response_wire_bytes=wire_size)
+            raise
+        
+        self._record(prepared, response, elapsed, attempt, response_wire_bytes=wire_size)
+        
+        return result
+    
+    def _decompress(self, response):
+        encoding = response.headers.get('Content-Encoding')
+        
+        if not encoding or not response.body:
+            return response
+        
+        try:
+            with pwned.profiling.phase('decode'):
+                return response._replace(body=pwned.compression.decompress(response.body, encoding))
+        except (ValueError, pwned.compression.zlib.error):
+            raise PwnedAPIException('Invalid ' + encoding + ' response from server.')
+    
+    def _record(self, prepared, response, elapsed, attempt, error=None, response_bytes=None, response_wire_bytes=None):
+        if self.metrics is None:
+            return
+        
+        if response_bytes is None:
+            response_bytes = len(response.body) if response is not None else 0
+        
+        status = response.status if response is not None else None
+        
+        self.metrics.record(prepared.method, prepared.resource, status, elapsed, prepared.size, response_bytes, attempt, error,
+                            len(prepared.body or b''), response_bytes if response_wire_bytes is None else response_wire_bytes)
+    
+    def _should_retry(self, response, attempt):
+        # a throttled request is sent again once the limiter lets it through
+        if self.limiter is None or not self.limiter.update(response.status, response.headers):
+            return False
+        
+        return self.limiter.retry(attempt)
+    
+    def _handle_response(self, resource, request_method, response, stored_body=None):
+        if stored_body is not None and response.status == 304:
+            # every caller gets a result of its own, decoded from the stored body
+            self._cache_update(resource, request_method, stored_body)
+            
+            return self._decode_response(stored_body)
+        
+        if response.status >= 400:
+            self._raise_for_status(response)
+        
+        if not response.body:
+            # a successful call with nothing to say; it may still have changed what a cached GET would return
+            if request_method != 'GET':
+                self._cache_update(resource, request_method, None)
+            
+            return None
+        
+        result = self._decode_response(response.body)
+        self._cache_update(resource, request_method, response.body)
+        self._store_update(resource, request_method, response)
+        
+        return result
+    
+    def _raise_for_status(self, response):
+        # the API's reason when the body has one, the HTTP status otherwise
+        try:
+            with pwned.profiling.phase('decode'):
+                decoded = self.codec.decode(response.body)
+        except ValueError:
+            decoded = None
+        
+        if isinstance(decoded, dict) and decoded.get('error'):
+            raise PwnedAPIException(decoded['error']['reason'])
+        
+        raise PwnedAPIException('HTTP ' + str(response.status) + ' returned from server.')
+    
+    def _decode_response(self, response):
+        try:
+            with pwned.profiling.phase('decode'):
+                response = self.codec.decode(response)
         except ValueError:
-            print(response)
             raise PwnedAPIException('Invalid JSON returned from server.', response)
         
         if ('error' in response) and response['error']:
@@ -240,14 +518,89 @@ class Pwned:
         
         return response
     
+    def _cache_lookup(self, resource, request_method):
+        if self.cache is None or request_method != 'GET':
+            return None
+        
+        return self.cache.get(resource)
+    
+    def _cache_update(self, resource, request_method, response):
+        if self.cache is None:
+            return
+        
+        if request_method == 'GET':
+            self.cache.put(resource, response)
+        else:
+            self.cache.invalidate(resource)
+    
+    def _store_lookup(self, resource, request_method, headers):
+        if self.store is None or request_method != 'GET':
+            return None
+        
+        stored = self.store.get(self._store_key(resource))
+        
+        if stored is not None:
+            if stored.etag:
+                headers['If-None-Match'] = stored.etag
+            
+            if stored.last_modified:
+                headers['If-Modified-Since'] = stored.last_modified
+        
+        return stored
+    
+    def _read_stored(self, resource, stored, headers):
+        # the store's files may have been removed under it, e.g. by another process sharing its directory; then the
+        # entry is dropped along with the conditional request headers and None is returned
+        try:
+            body = stored.read()
+        except OSError:
+            self.store.remove(self._store_key(resource))
+            headers.pop('If-None-Match', None)
+            headers.pop('If-Modified-Since', None)
+            
+            return None
+        
+        self.store.hit(stored)
+        
+        return body
+    
+    def _store_update(self, resource, request_method, response):
+        if self.store is None or request_method != 'GET' or response.status != 200:
+            return
+        
+        self.store.put(self._store_key(resource), response.body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    
+    def _store_key(self, resource):
+        # what one API key may read isn't necessarily what another may, so stored responses aren't shared between keys
+        return self.public_key + '|' + self.base_url + resource
+    
     def _url_query_string(self, resource, request_method, data):
-        return '?' + urllib.parse.urlencode({
-            'publicKey': self.public_key,
-            'signature': self._signature(resource, request_method, data)
-        })
+        # the same as urlencode({'publicKey': ..., 'signature': ...}); the signature is hex and never needs quoting
+        return '?publicKey=' + urllib.parse.quote_plus(self.public_key) + '&signature=' + self._signature(resource, request_method, data)
     
     def _signature(self, resource, request_method, data):
-        return hmac.new(self.private_key.encode('ascii'), bytes((self.public_key + '|' + request_method + '|' + resource + '|' + data).encode("utf-8")), hashlib.sha256).hexdigest()
+        # data is the request body, as it's sent (bytes) or as text
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        signer = self._signer(request_method).copy()
+        signer.update((resource + '|').encode('utf-8') + data)
+        
+        return signer.hexdigest()
+    
+    def _signer(self, request_method):
+        # an HMAC keyed with the private key that has already seen "public key|method|"; copied for every request
+        if self._signing_keys != (self.public_key, self.private_key):
+            self._signers = {}
+            self._signing_keys = (self.public_key, self.private_key)
+        
+        signer = self._signers.get(request_method)
+        
+        if signer is None:
+            signer = hmac.new(self.private_key.encode('ascii'), (self.public_key + '|' + request_method + '|').encode('utf-8'), hashlib.sha256)
+            self._signers[request_method] = signer
+        
+        return signer
         
     def _user_agent(self):
         return 'python-pwned-api/' + self.__version + '/' + '.'.join(str(x) for x in sys.version_info[0:3])
@@ -0,0 +1,49 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# codecs turn request payloads into bytes and response bodies (bytes) back into Python objects. the request
+# signature covers whatever bytes the codec produced, so codecs don't need to agree on formatting.
+class JsonCodec:
+    name = 'json'
+
+    def encode(self, data):
+        return json.dumps(data).encode('utf-8')
+
+    def decode(self, body):
+        return json.loads(body)
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is not installed')
+
+    def encode(self, data):
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, body):
+        return orjson.loads(body)
+
+CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+}
+
+def available_codecs():
+    return [name for name in CODECS if name != 'orjson' or orjson is not None]
+
+def get_codec(name=None):
+    # orjson when it's installed and the standard library otherwise. asking for 'orjson' by name raises ImportError
+    # when it isn't installed instead of falling back
+    if name is None:
+        name = 'orjson' if orjson is not None else 'json'
+
+    if name not in CODECS:
+        raise ValueError('Unknown JSON codec: ' + str(name))
+
+    return CODECS[name]()
@@ -0,0 +1,378 @@
+import array
+import collections
+import json
+import math
+import mmap
+import os
+import sys
+
+import pwned.support
+
+# an append-only, column per file archive of matches, signups and rounds. every column is a file of fixed-width native
+# numbers (see the array module's type codes) and strings are stored once, in strings.txt, and referenced by their
+# line number. meta.json holds the number of committed rows of each table; it's replaced only once the column files
+# have been written, so rows of an interrupted append are never read and are cut off by the next writer.
+#
+# missing values are -1 for ids, numbers and strings, and NaN for scores.
+TABLES = {
+    'matches': (
+        ('competition_type', 'b'), ('competition_id', 'q'), ('round_number', 'i'), ('stage_index', 'i'), ('id', 'q'),
+        ('signup_id', 'q'), ('signup_opponent_id', 'q'), ('score', 'd'), ('score_opponent', 'd'), ('is_walkover', 'b'),
+        ('time', 'i'), ('map_name', 'i'),
+    ),
+    'signups': (
+        ('competition_type', 'b'), ('competition_id', 'q'), ('id', 'q'), ('name', 'i'), ('remote_id', 'i'), ('clan_id', 'q'),
+        ('seeding', 'i'),
+    ),
+    'rounds': (
+        ('competition_type', 'b'), ('competition_id', 'q'), ('round_number', 'i'), ('name', 'i'), ('time', 'i'), ('started_at', 'i'),
+    ),
+}
+
+COMPETITION_TYPES = ('tournament', 'league')
+
+FORMAT_VERSION = 1
+
+# a match read back from an archive, with where it was played
+ArchivedMatch = collections.namedtuple('ArchivedMatch', ('type', 'competition_id', 'round_number', 'stage_index', 'match'))
+
+def _missing(value, default=-1):
+    return default if value is None else value
+
+def _convert(table, column, typecode, value):
+    try:
+        return float(value) if typecode == 'd' else int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Not a number in ' + table + '.' + column + ': ' + repr(value)) from None
+
+def _id(value):
+    return None if value is None else int(value)
+
+def _column_path(path, table, column):
+    return os.path.join(path, table, column + '.col')
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return {'version': FORMAT_VERSION, 'byteorder': sys.byteorder, 'rows': {table: 0 for table in TABLES}, 'strings': 0, 'blocks': {table: [] for table in TABLES}}
+
+    if meta['version'] != FORMAT_VERSION or meta['byteorder'] != sys.byteorder:
+        raise ValueError('Unsupported archive: version ' + str(meta['version']) + ', ' + meta['byteorder'] + ' endian')
+
+    return meta
+
+class ColumnarWriter:
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_meta(path)
+
+        os.makedirs(path, exist_ok=True)
+
+        for table in TABLES:
+            os.makedirs(os.path.join(path, table), exist_ok=True)
+
+        self._strings = {}
+        self._strings_list = []
+        self._load_strings()
+        self._truncate()
+
+        self._pending = {table: {column: array.array(typecode) for column, typecode in TABLES[table]} for table in TABLES}
+        self._pending_blocks = {table: [] for table in TABLES}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.commit()
+
+    def export(self, competition, client=None):
+        # appends a competition's signups and rounds, as fetched now
+        client = competition._get_client(client)
+        type = competition._get_type()
+
+        self.append_signups(type, competition.id, client.get_signups(type, competition.id) or [])
+        self.append_rounds(type, competition.id, client.get_rounds(type, competition.id) or [])
+
+    def append_rounds(self, type, competition_id, rounds):
+        # rounds with their stages and matches; append a round once it's finished
+        for round in rounds:
+            self._append('rounds', type, competition_id, (
+                COMPETITION_TYPES.index(type), competition_id, round.round_number, self._string(getattr(round, 'name', None)),
+                self._string(getattr(round, 'time', None)), self._string(getattr(round, 'started_at', None)),
+            ))
+
+            for stage_index, stage in enumerate(round.stages or []):
+                self.append_matches(type, competition_id, round.round_number, stage.matches or [], stage_index)
+
+    def append_matches(self, type, competition_id, round_number, matches, stage_index=0):
+        for match in matches:
+            data = match.get_api_dict()
+            is_walkover = data.get('isWalkover')
+
+            self._append('matches', type, competition_id, (
+                COMPETITION_TYPES.index(type), competition_id, _missing(round_number), stage_index, match.id,
+                _missing((data.get('signup') or {}).get('id')), _missing((data.get('signupOpponent') or {}).get('id')),
+                _missing(data.get('score'), math.nan), _missing(data.get('scoreOpponent'), math.nan),
+                -1 if is_walkover is None else int(bool(is_walkover)), self._string(data.get('time')), self._string(data.get('mapName')),
+            ))
+
+    def append_signups(self, type, competition_id, signups):
+        for signup in signups:
+            data = signup.get_api_dict()
+            remote_id = data.get('remoteId')
+
+            self._append('signups', type, competition_id, (
+                COMPETITION_TYPES.index(type), competition_id, signup.id, self._string(data.get('name')),
+                self._string(None if remote_id is None else str(remote_id)), _missing(data.get('clanId')), _missing(data.get('seeding')),
+            ))
+
+    def commit(self):
+        # writes what was appended since the last commit; readers see it once meta.json has been replaced
+        new_strings = self._strings_list[self.meta['strings']:]
+
+        if new_strings:
+            with open(os.path.join(self.path, 'strings.txt'), 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(string) + '\n' for string in new_strings)
+                f.flush()
+                os.fsync(f.fileno())
+
+        for table, columns in self._pending.items():
+            if not len(columns[TABLES[table][0][0]]):
+                continue
+
+            for column, values in columns.items():
+                with open(_column_path(self.path, table, column), 'ab') as f:
+                    values.tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self.meta['rows'][table] += len(columns[TABLES[table][0][0]])
+            self.meta['blocks'][table].extend(self._pending_blocks[table])
+
+        self.meta['strings'] = len(self._strings_list)
+        temporary = os.path.join(self.path, 'meta.json.tmp')
+
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporary, os.path.join(self.path, 'meta.json'))
+
+        self._pending = {table: {column: array.array(typecode) for column, typecode in TABLES[table]} for table in TABLES}
+        self._pending_blocks = {table: [] for table in TABLES}
+
+    def _append(self, table, type, competition_id, values):
+        # the API sends ids and scores as strings as often as not. every value is converted before any is appended, so
+        # a bad one doesn't leave the columns different lengths
+        columns = self._pending[table]
+        row = self.meta['rows'][table] + len(columns[TABLES[table][0][0]])
+        values = [_convert(table, column, typecode, value) for (column, typecode), value in zip(TABLES[table], values)]
+        competition_id = values[1]
+
+        for (column, typecode), value in zip(TABLES[table], values):
+            columns[column].append(value)
+
+        # blocks of consecutive rows per competition, so readers can go straight to a competition's rows
+        blocks = self._pending_blocks[table] or self.meta['blocks'][table]
+        last = blocks[-1] if blocks else None
+
+        if last is not None and last[0] == type and last[1] == competition_id and last[3] == row:
+            last[3] = row + 1
+        else:
+            self._pending_blocks[table].append([type, competition_id, row, row + 1])
+
+    def _string(self, value):
+        if value is None:
+            return -1
+
+        index = self._strings.get(value)
+
+        if index is None:
+            index = self._strings[value] = len(self._strings_list)
+            self._strings_list.append(value)
+
+        return index
+
+    def _load_strings(self):
+        try:
+            with open(os.path.join(self.path, 'strings.txt'), 'r', encoding='utf-8') as f:
+                for line, _ in zip(f, range(self.meta['strings'])):
+                    self._string(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def _truncate(self):
+        # drops whatever an interrupted commit left behind
+        for table, columns in TABLES.items():
+            for column, typecode in columns:
+                filename = _column_path(self.path, table, column)
+                size = self.meta['rows'][table] * array.array(typecode).itemsize
+
+                if os.path.exists(filename) and os.path.getsize(filename) != size:
+                    os.truncate(filename, size)
+
+        filename = os.path.join(self.path, 'strings.txt')
+
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                size = sum(len(line) for line, _ in zip(f, range(self.meta['strings'])))
+
+            os.truncate(filename, size)
+
+class ColumnarReader:
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_meta(path)
+
+        self._maps = []
+        self._columns = {}
+        self._strings = None
+        self._signups = None
+        self._signup_objects = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.meta['rows']['matches']
+
+    def close(self):
+        self._columns = {}
+
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                # a column someone still holds keeps its map open until it's released
+                pass
+
+        self._maps = []
+
+    def column(self, table, name):
+        # the committed values of a column, as a memoryview straight onto the mapped file
+        key = (table, name)
+
+        if key not in self._columns:
+            typecode = dict(TABLES[table])[name]
+            size = self.meta['rows'][table] * array.array(typecode).itemsize
+
+            if not size:
+                self._columns[key] = memoryview(array.array(typecode))
+            else:
+                with open(_column_path(self.path, table, name), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+                self._maps.append(mapped)
+                self._columns[key] = memoryview(mapped)[0:size].cast(typecode)
+
+        return self._columns[key]
+
+    def string(self, index):
+        if index < 0:
+            return None
+
+        if self._strings is None:
+            with open(os.path.join(self.path, 'strings.txt'), 'r', encoding='utf-8') as f:
+                self._strings = [json.loads(line) for line, _ in zip(f, range(self.meta['strings']))]
+
+        return self._strings[index]
+
+    def rows(self, table, type=None, competition_id=None):
+        # row numbers of a table, for one competition (through the blocks in meta.json) or all of them
+        competition_id = _id(competition_id)
+
+        if type is None and competition_id is None:
+            return range(self.meta['rows'][table])
+
+        return [row for block_type, block_id, start, end in self.meta['blocks'][table]
+                if (type is None or block_type == type) and (competition_id is None or block_id == competition_id) for row in range(start, end)]
+
+    def match_rows(self, type=None, competition_id=None, signup_id=None):
+        rows = self.rows('matches', type, competition_id)
+        signup_id = _id(signup_id)
+
+        if signup_id is None:
+            return list(rows)
+
+        # only the two signup columns are read to find a signup's matches
+        signups, opponents = self.column('matches', 'signup_id'), self.column('matches', 'signup_opponent_id')
+
+        if isinstance(rows, range):
+            return [row for row, (signup, opponent) in enumerate(zip(signups, opponents)) if signup == signup_id or opponent == signup_id]
+
+        return [row for row in rows if signups[row] == signup_id or opponents[row] == signup_id]
+
+    def matches(self, type=None, competition_id=None, signup_id=None):
+        # ArchivedMatch tuples, with Match objects (and their signups) built only for the rows asked for
+        columns = {column: self.column('matches', column) for column, typecode in TABLES['matches']}
+
+        for row in self.match_rows(type, competition_id, signup_id):
+            match_type = COMPETITION_TYPES[columns['competition_type'][row]]
+            match_competition_id = columns['competition_id'][row]
+            is_walkover = columns['is_walkover'][row]
+
+            match = pwned.support.Match(
+                id=columns['id'][row],
+                signup=self._signup(match_type, match_competition_id, columns['signup_id'][row]),
+                signup_opponent=self._signup(match_type, match_competition_id, columns['signup_opponent_id'][row]),
+                score=self._number(columns['score'][row]),
+                score_opponent=self._number(columns['score_opponent'][row]),
+                is_walkover=None if is_walkover < 0 else bool(is_walkover),
+                time=self.string(columns['time'][row]),
+                map_name=self.string(columns['map_name'][row]),
+            )
+            round_number = columns['round_number'][row]
+
+            yield ArchivedMatch(match_type, match_competition_id, None if round_number < 0 else round_number, columns['stage_index'][row], match)
+
+    def signups(self, type=None, competition_id=None):
+        return [self._signup_at(row) for row in self.rows('signups', type, competition_id)]
+
+    def _signup(self, type, competition_id, signup_id):
+        if signup_id < 0:
+            return None
+
+        if self._signups is None:
+            self._signups = {}
+            types, competition_ids, ids = (self.column('signups', name) for name in ('competition_type', 'competition_id', 'id'))
+
+            for row in range(self.meta['rows']['signups']):
+                self._signups[(COMPETITION_TYPES[types[row]], competition_ids[row], ids[row])] = row
+
+        row = self._signups.get((type, competition_id, signup_id))
+
+        if row is None:
+            return pwned.support.Signup(id=signup_id)
+
+        return self._signup_at(row)
+
+    def _signup_at(self, row):
+        # one Signup per row, shared by every match it played
+        signup = self._signup_objects.get(row)
+
+        if signup is None:
+            column = lambda name: self.column('signups', name)[row]
+            clan_id, seeding = column('clan_id'), column('seeding')
+
+            signup = self._signup_objects[row] = pwned.support.Signup(
+                id=column('id'), name=self.string(column('name')), remote_id=self.string(column('remote_id')),
+                clan_id=None if clan_id < 0 else clan_id, seeding=None if seeding < 0 else seeding,
+            )
+
+        return signup
+
+    def _number(self, value):
+        if math.isnan(value):
+            return None
+
+        if value == int(value):
+            return int(value)
+
+        return value
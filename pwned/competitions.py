@@ -1,4 +1,6 @@
-from pwned.support import Game, LeagueScoringModel
+from pwned.support import Game, LeagueScoringModel, COMPACT_MODELS, model_slots, compile_decoder
+from pwned.profiling import phase
+import pwned.standings
 
 class Competition:
     _fields = {
@@ -21,6 +23,12 @@ class Competition:
         'path': 'path',
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('game', 'client'))
+    
+    # compiled decoders for each subclass, see from_api_call
+    _decoders = {}
+    
     def __init__(self, **args):
         for f in self._fields:
             k = self._fields[f]
@@ -45,43 +53,50 @@ class Competition:
         
         response = {}
         
-        for f in fields:
-            if hasattr(self, fields[f]):
-                response[f] = getattr(self, fields[f])
+        with phase('encode'):
+            for f in fields:
+                if hasattr(self, fields[f]):
+                    response[f] = getattr(self, fields[f])
         
         return response
     
     @classmethod
     def from_api_call(cls, specific_class, data, fields=None, client=None):
-        if fields is None:
-            fields = {}
-            
-        fields = dict(list(fields.items()) + list(cls._fields.items()))
-        arguments = {}
-
-        for f in fields:
-            if f in data:
-                arguments[fields[f]] = data[f]
+        decoder = cls._decoders.get(specific_class)
+        
+        if decoder is None:
+            if fields is None:
+                fields = {}
                 
-        if 'game' in data:
-            arguments['game'] = Game.from_api_call(data['game'])
+            fields = dict(list(fields.items()) + list(cls._fields.items()))
+            decoder = cls._decoders[specific_class] = compile_decoder(specific_class, fields)
+        
+        with phase('hydrate'):
+            competition = decoder(data)
+                    
+            if data.get('game'):
+                competition.game = Game.from_api_call(data['game'])
         
         if client:
-            arguments['client'] = client
+            competition.client = client
             
-        return specific_class(**arguments)
+        return competition
 
     def create(self, client):
         return getattr(client, 'create_' + self._get_type())(self)
 
     def start(self, client=None):
         client = self._get_client(client)
-        client.start(self._get_type(), self.id)
+        return client.start(self._get_type(), self.id)
         
     def add_signups(self, signups, client=None):
         client = self._get_client(client)
         return client.add_signups(self._get_type(), self.id, signups)
     
+    def import_signups(self, signups, client=None, chunk_size=None, concurrency=None, retries=2):
+        client = self._get_client(client)
+        return client.import_signups(self._get_type(), self.id, signups, chunk_size, concurrency, retries)
+    
     def get_signups(self, client=None):
         client = self._get_client(client)
         
@@ -100,21 +115,51 @@ class Competition:
         client = self._get_client(client)
         
         return client.update_round(self._get_type(), self.id, round)
+
+    def update_rounds(self, rounds, client=None, concurrency=None):
+        client = self._get_client(client)
+        
+        return client.update_rounds(self._get_type(), self.id, rounds, concurrency)
         
     def get_rounds(self, client=None):
         client = self._get_client(client)
         
         return client.get_rounds(self._get_type(), self.id)
+
+    def get_rounds_by_index(self, round_indexes, client=None, concurrency=None):
+        client = self._get_client(client)
+        
+        return client.get_rounds_by_index(self._get_type(), self.id, round_indexes, concurrency)
+
+    def iter_rounds(self, client=None):
+        client = self._get_client(client)
+        
+        return client.iter_rounds(self._get_type(), self.id)
+
+    def iter_matches(self, client=None):
+        client = self._get_client(client)
+        
+        return client.iter_matches(self._get_type(), self.id)
     
     def get_match(self, match_id, client=None):
         client = self._get_client(client)
         
         return client.get_match(self._get_type(), self.id, match_id)
 
+    def get_matches(self, match_ids, client=None, concurrency=None):
+        client = self._get_client(client)
+        
+        return client.get_matches(self._get_type(), self.id, match_ids, concurrency)
+
     def update_match(self, match, client=None):
         client = self._get_client(client)
         
         return client.update_match(self._get_type(), self.id, match)
+
+    def update_matches(self, matches, client=None, concurrency=None):
+        client = self._get_client(client)
+        
+        return client.update_matches(self._get_type(), self.id, matches, concurrency)
     
     def _get_type(self):
         return self.__class__.__name__.lower()
@@ -133,6 +178,9 @@ class Tournament(Competition):
         'quickProgress': 'quick_progress',
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(__fields, inherited=Competition.__slots__)
+    
     def __init__(self, **args):
         super().__init__(**args)
 
@@ -156,6 +204,9 @@ class League(Competition):
         'scoringModelId': 'scoring_model_id',
         'roundCount': 'round_count',
     }
+    
+    if COMPACT_MODELS:
+        __slots__ = model_slots(__fields, extra=('scoring_model', ), inherited=Competition.__slots__)
 
     def __init__(self, **args):
         super().__init__(**args)
@@ -187,6 +238,10 @@ class League(Competition):
         client = self._get_client(client)
         
         return client.get_league_table(self.id)
+    
+    def get_standings(self, client=None):
+        # a pwned.standings.LeagueStandings to keep up to date locally, see there
+        return pwned.standings.LeagueStandings.from_league(self, client)
         
     def set_championship_round_results(self, round_number, results, client=None):
         client = self._get_client(client)
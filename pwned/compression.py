@@ -0,0 +1,91 @@
+import gzip
+import zlib
+
+ACCEPT_ENCODING = 'gzip, deflate'
+
+# bodies smaller than this aren't worth compressing
+DEFAULT_THRESHOLD = 16 * 1024
+
+def compress(body, level=6):
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def decompress(body, encoding):
+    if not encoding or encoding == 'identity':
+        return body
+
+    decoder = Decompressor(encoding)
+
+    return decoder.decompress(body) + decoder.flush()
+
+class Decompressor:
+    # gzip, or deflate as servers actually send it: usually zlib-wrapped, sometimes raw. gzip and zlib headers are told
+    # apart by zlib itself (wbits 32 + 15), so a gzip body labelled deflate (or the other way round) still decodes.
+    # with a max_length, at most that much comes out of a call and the rest of the input is kept (pending) for the
+    # next one, so a streamed body is inflated only as far as it's read
+    def __init__(self, encoding):
+        encoding = encoding.strip().lower()
+
+        if encoding not in ('gzip', 'x-gzip', 'deflate'):
+            raise ValueError('Unsupported content encoding: ' + encoding)
+
+        self.encoding = encoding
+        self._started = False
+        self._decoder = zlib.decompressobj(32 + zlib.MAX_WBITS)
+
+    @property
+    def pending(self):
+        return bool(self._decoder.unconsumed_tail)
+
+    def decompress(self, chunk, max_length=0):
+        if self._decoder.unconsumed_tail:
+            chunk = self._decoder.unconsumed_tail + chunk
+
+        if self._started or self.encoding != 'deflate':
+            return self._decoder.decompress(chunk, max_length)
+
+        self._started = True
+
+        try:
+            return self._decoder.decompress(chunk, max_length)
+        except zlib.error:
+            self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decoder.decompress(chunk, max_length)
+
+    def flush(self):
+        return self._decoder.flush()
+
+class DecompressingReader:
+    # wraps read(size) of a compressed body for pwned.streaming.JsonStream; returns at most size bytes, and b'' only
+    # once the body is done
+    def __init__(self, read, encoding, chunk_size=64 * 1024):
+        self.read_raw = read
+        self.chunk_size = chunk_size
+        self.received = 0
+        self.decoded = 0
+
+        self._decoder = Decompressor(encoding)
+        self._eof = False
+
+    def read(self, size=-1):
+        max_length = size if size and size > 0 else 0
+
+        while not self._eof:
+            if self._decoder.pending:
+                data = self._decoder.decompress(b'', max_length)
+            else:
+                chunk = self.read_raw(self.chunk_size)
+                self.received += len(chunk)
+
+                if not chunk:
+                    self._eof = True
+                    data = self._decoder.flush()
+                    self.decoded += len(data)
+                    return data
+
+                data = self._decoder.decompress(chunk, max_length)
+
+            if data:
+                self.decoded += len(data)
+                return data
+
+        return b''
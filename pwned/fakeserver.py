@@ -0,0 +1,834 @@
+import datetime
+import hashlib
+import hmac
+import http.server
+import argparse
+import itertools
+import json
+import random
+import re
+import socket
+import threading
+import time
+import urllib.parse
+import zlib
+
+import pwned.brackets
+import pwned.compression
+
+GAMES = [
+    {'id': 1, 'name': 'Quake III Arena', 'teamBased': False, 'privateServers': True, 'active': True, 'defaultLeagueType': 'league'},
+    {'id': 2, 'name': 'Dota 2', 'teamBased': True, 'privateServers': False, 'active': True, 'defaultLeagueType': 'league'},
+    {'id': 3, 'name': 'Counter-Strike', 'teamBased': True, 'privateServers': True, 'active': True, 'defaultLeagueType': 'league'},
+    {'id': 4, 'name': 'Trackmania', 'teamBased': False, 'privateServers': True, 'active': True, 'defaultLeagueType': 'championship'},
+]
+
+COUNTRIES = [
+    {'id': 1, 'code': 'no', 'languageKey': 'norwegian', 'countryKey': 'norway', 'defaultLanguage': 'nb'},
+    {'id': 2, 'code': 'se', 'languageKey': 'swedish', 'countryKey': 'sweden', 'defaultLanguage': 'sv'},
+    {'id': 3, 'code': 'dk', 'languageKey': 'danish', 'countryKey': 'denmark', 'defaultLanguage': 'da'},
+    {'id': 4, 'code': 'gb', 'languageKey': 'english', 'countryKey': 'united_kingdom', 'defaultLanguage': 'en'},
+]
+
+TEMPLATES = [
+    {'template': kind + str(teams), 'teams': teams, 'description': description + ', ' + str(teams) + ' teams'}
+    for kind, description in (('singleelim', 'Single elimination'), ('doubleelim', 'Double elimination'))
+    for teams in (4, 8, 16, 32, 64, 128)
+]
+
+SCORING_MODELS = [
+    {
+        'id': 1, 'type': 'league', 'name': 'Standard', 'description': 'Three points for a win, one for a draw', 'active': True,
+        'winPoints': 3, 'drawPoints': 1, 'lossPoints': 0, 'positionPoints': None, 'bonusPoints': None,
+    },
+    {
+        'id': 2, 'type': 'championship', 'name': 'Formula 1', 'description': 'Points for the ten best placed', 'active': True,
+        'winPoints': None, 'drawPoints': None, 'lossPoints': None, 'bonusPoints': None,
+        'positionPoints': {'1': 25, '2': 18, '3': 15, '4': 12, '5': 10, '6': 8, '7': 6, '8': 4, '9': 2, '10': 1},
+    },
+]
+
+# fields a client is allowed to set on each kind of object
+COMPETITION_FIELDS = ('name', 'gameId', 'playersOnTeam', 'countryId', 'language', 'description', 'demandGUIDs', 'onlyRegistered', 'signupMode')
+TOURNAMENT_FIELDS = ('template', 'groupSize', 'groupCount', 'quickProgress')
+LEAGUE_FIELDS = ('leagueType', 'teamCount', 'scoringModelId', 'roundCount')
+SIGNUP_FIELDS = ('name', 'hasServer', 'isAccepted', 'onWaitingList', 'contact', 'seeding', 'clanId', 'remoteId')
+MATCH_FIELDS = ('score', 'scoreOpponent', 'isWalkover', 'time', 'mapName')
+ROUND_FIELDS = ('name', 'description', 'time', 'startedAt')
+SCORING_MODEL_FIELDS = ('type', 'name', 'description', 'active', 'winPoints', 'drawPoints', 'lossPoints', 'positionPoints', 'bonusPoints')
+
+# the API hands out what it keeps in its database as strings: ids, seedings, scores, counts and the points of the
+# scoring model embedded in a league. what it works out, like tables and round numbers, comes out as numbers, and so
+# does everything on the scoring model endpoints
+def _text(value):
+    if value is None or isinstance(value, (bool, str)):
+        return value
+
+    return str(value)
+
+def _texts(data, fields):
+    return dict(data, **{field: _text(data[field]) for field in fields if field in data})
+
+def _game_payload(game):
+    return _texts(game, ('id', )) if game is not None else None
+
+def _signup_payload(signup):
+    return _texts(signup, ('id', 'seeding', 'clanId')) if signup is not None else None
+
+def _match_payload(match):
+    payload = _texts(match, ('id', 'score', 'scoreOpponent', 'seeding', 'seedingOpponent'))
+    payload['signup'] = _signup_payload(match['signup'])
+    payload['signupOpponent'] = _signup_payload(match['signupOpponent'])
+
+    return payload
+
+def _round_payload(round):
+    return dict(round, stages=[dict(stage, matches=[_match_payload(match) for match in stage['matches']]) for stage in round['stages']])
+
+def _competition_payload(data):
+    payload = _texts(data, ('id', 'gameId', 'countryId', 'signupCount'))
+    payload['game'] = _game_payload(data['game'])
+
+    if 'leagueType' in data:
+        payload = _texts(payload, ('teamCount', 'scoringModelId'))
+        payload['scoringModel'] = _texts(data['scoringModel'], ('id', 'winPoints', 'drawPoints', 'lossPoints'))
+
+    return payload
+
+def _table_payload(table):
+    return [dict(row, signup=_signup_payload(row['signup'])) for row in table]
+
+def _each(payload):
+    return lambda values: [payload(value) for value in values]
+
+class FakeApiError(Exception):
+    def __init__(self, reason, status=400):
+        Exception.__init__(self, reason)
+
+        self.reason = reason
+        self.status = status
+
+class FakeCompetition:
+    def __init__(self, type, data):
+        self.type = type
+        self.data = data
+        self.rounds = []
+        self.signups = []
+        self.results = {}
+
+        # tournaments: the layout of the bracket, and per match the earlier matches that have sent it a team (or a bye)
+        self.bracket = None
+        self.fed = {}
+
+class FakeApi:
+    def __init__(self, public_key='abc', private_key='123'):
+        self.keys = {public_key: private_key}
+
+        self.competitions = {'tournament': {}, 'league': {}}
+        self.matches = {}
+        self.scoring_models = {}
+
+        self._competition_ids = itertools.count(1)
+        self._signup_ids = itertools.count(1)
+        self._match_ids = itertools.count(1)
+        self._scoring_model_ids = itertools.count(1)
+        self.lock = threading.RLock()
+
+        for scoring_model in SCORING_MODELS:
+            self.scoring_models[next(self._scoring_model_ids)] = dict(scoring_model)
+
+        self.routes = [
+            ('GET', r'games', self.get_games, _each(_game_payload)),
+            ('GET', r'countries', self.get_countries),
+            ('GET', r'tournaments/templates', self.get_templates),
+            ('GET', r'leagues/scoringmodels', self.get_scoring_models),
+            ('GET', r'leagues/scoringmodels/(league|championship)', self.get_scoring_models),
+            ('GET', r'leagues/scoringmodels/(\d+)', self.get_scoring_model),
+            ('POST', r'leagues/scoringmodels', self.create_scoring_model),
+            ('POST', r'leagues/scoringmodels/(\d+)', self.update_scoring_model),
+            ('DELETE', r'leagues/scoringmodels/(\d+)', self.delete_scoring_model),
+            ('POST', r'(tournament|league)s', self.create_competition, _competition_payload),
+            ('GET', r'(tournament|league)s/(\d+)', self.get_competition, _competition_payload),
+            ('POST', r'(tournament|league)s/(\d+)', self.update_competition, _competition_payload),
+            ('GET', r'(tournament|league)s/(\d+)/signups', self.get_signups, _each(_signup_payload)),
+            ('POST', r'(tournament|league)s/(\d+)/signups', self.add_signups, _each(_signup_payload)),
+            ('DELETE', r'(tournament|league)s/(\d+)/signups/(\d+)', self.remove_signup),
+            ('GET', r'(tournament|league)s/(\d+)/rounds', self.get_rounds, _each(_round_payload)),
+            ('GET', r'(tournament|league)s/(\d+)/rounds/(\d+)', self.get_round, _round_payload),
+            ('POST', r'(tournament|league)s/(\d+)/rounds/(\d+)', self.update_round, _round_payload),
+            ('GET', r'(tournament|league)s/(\d+)/matches/(\d+)', self.get_match, _match_payload),
+            ('POST', r'(tournament|league)s/(\d+)/matches/(\d+)', self.update_match, _match_payload),
+            ('GET', r'(league)s/(\d+)/table', self.get_table, _table_payload),
+            ('POST', r'(league)s/(\d+)/rounds/(\d+)/results', self.set_round_results),
+        ]
+        # handlers work on the fake's own data; the payload function, where there is one, shapes what's sent back
+        self.routes = [(route[0], re.compile(route[1] + '$'), route[2], route[3] if len(route) > 3 else None) for route in self.routes]
+
+    def handle(self, method, resource, query, body=b''):
+        try:
+            self.verify_signature(method, resource, query, body)
+            data = self.parse_body(body)
+
+            for route_method, pattern, handler, payload in self.routes:
+                if route_method != method:
+                    continue
+
+                match = pattern.match(resource.strip('/'))
+
+                if match:
+                    with self.lock:
+                        result = handler(data, *match.groups())
+
+                        return 200, {'result': payload(result) if payload else result}
+
+            raise FakeApiError('Unknown resource: ' + method + ' ' + resource, 404)
+        except FakeApiError as e:
+            return e.status, {'error': {'reason': e.reason}}
+
+    def parse_body(self, body):
+        # only what can't be read as JSON is the caller's fault; errors in the handlers are the fake's own and propagate
+        if not body:
+            return None
+
+        try:
+            return json.loads(body.decode('utf-8'))
+        except ValueError:
+            raise FakeApiError('Invalid JSON in request body', 400)
+
+    def verify_signature(self, method, resource, query, body):
+        public_key = query.get('publicKey')
+
+        if public_key not in self.keys:
+            raise FakeApiError('Unknown public key', 403)
+
+        message = (public_key + '|' + method + '|' + resource + '|').encode('utf-8') + (body or b'')
+        expected = hmac.new(self.keys[public_key].encode('ascii'), message, 'sha256').hexdigest()
+
+        if not hmac.compare_digest(expected, query.get('signature') or ''):
+            raise FakeApiError('Invalid signature', 403)
+
+    def get_games(self, data):
+        return GAMES
+
+    def get_countries(self, data):
+        return COUNTRIES
+
+    def get_templates(self, data):
+        return TEMPLATES
+
+    def get_scoring_models(self, data, type=None):
+        return [scoring_model for scoring_model in self.scoring_models.values() if scoring_model['active'] and (not type or scoring_model['type'] == type)]
+
+    def get_scoring_model(self, data, id):
+        if int(id) not in self.scoring_models:
+            raise FakeApiError('Scoring model not found', 404)
+
+        return self.scoring_models[int(id)]
+
+    def create_scoring_model(self, data):
+        scoring_model = {'id': next(self._scoring_model_ids), 'active': True}
+
+        for field in SCORING_MODEL_FIELDS:
+            scoring_model.setdefault(field, None)
+
+        self._assign(scoring_model, data, SCORING_MODEL_FIELDS)
+        self.scoring_models[scoring_model['id']] = scoring_model
+
+        return scoring_model
+
+    def update_scoring_model(self, data, id):
+        scoring_model = self.get_scoring_model(None, id)
+        self._assign(scoring_model, data, SCORING_MODEL_FIELDS)
+
+        return scoring_model
+
+    def delete_scoring_model(self, data, id):
+        self.get_scoring_model(None, id)['active'] = False
+
+        return True
+
+    def create_competition(self, data, type):
+        data = data or {}
+        id = next(self._competition_ids)
+        competition = FakeCompetition(type, {
+            'id': id,
+            'name': None,
+            'gameId': None,
+            'game': None,
+            'playersOnTeam': None,
+            'countryId': None,
+            'language': None,
+            'description': None,
+            'lastActivityAt': None,
+            'liveAt': None,
+            'teamCount': None,
+            'roundCount': None,
+            'roundCurrent': 0,
+            'demandGUIDs': False,
+            'onlyRegistered': False,
+            'signupMode': 'open',
+            'signupCount': 0,
+            'path': type + 's/' + str(id),
+            'status': 'signup',
+        })
+
+        self._assign(competition.data, data, COMPETITION_FIELDS)
+
+        if type == 'tournament':
+            self._create_tournament(competition, data)
+        else:
+            self._create_league(competition, data)
+
+        self._set_game(competition)
+        self._touch(competition)
+        self.competitions[type][id] = competition
+
+        return competition.data
+
+    def get_competition(self, data, type, id):
+        competition = self._competition(type, id)
+        competition.data['signupCount'] = len(competition.signups)
+
+        return competition.data
+
+    def update_competition(self, data, type, id):
+        competition = self._competition(type, id)
+        data = data or {}
+
+        if data.get('status') == 'live' and competition.data['status'] != 'live':
+            self._start(competition)
+
+        self._assign(competition.data, data, COMPETITION_FIELDS)
+        self._set_game(competition)
+        self._touch(competition)
+
+        return self.get_competition(None, type, id)
+
+    def get_signups(self, data, type, id):
+        return self._competition(type, id).signups
+
+    def add_signups(self, data, type, id):
+        competition = self._competition(type, id)
+        added = []
+
+        if isinstance(data, dict):
+            data = [data]
+
+        for el in data or []:
+            signup = {'id': next(self._signup_ids), 'isAccepted': True, 'onWaitingList': False}
+
+            for field in SIGNUP_FIELDS:
+                signup.setdefault(field, None)
+
+            self._assign(signup, el, SIGNUP_FIELDS)
+            competition.signups.append(signup)
+            added.append(signup)
+
+        self._touch(competition)
+
+        return added
+
+    def remove_signup(self, data, type, id, signup_id):
+        competition = self._competition(type, id)
+
+        for signup in competition.signups:
+            if signup['id'] == int(signup_id):
+                competition.signups.remove(signup)
+                self._touch(competition)
+
+                return True
+
+        raise FakeApiError('Signup not found', 404)
+
+    def get_rounds(self, data, type, id):
+        return self._competition(type, id).rounds
+
+    def get_round(self, data, type, id, round_number):
+        rounds = self._competition(type, id).rounds
+
+        if not 1 <= int(round_number) <= len(rounds):
+            raise FakeApiError('Round not found', 404)
+
+        return rounds[int(round_number) - 1]
+
+    def update_round(self, data, type, id, round_number):
+        round = self.get_round(None, type, id, round_number)
+        self._assign(round, data, ROUND_FIELDS)
+        self._touch(self._competition(type, id))
+
+        return round
+
+    def get_match(self, data, type, id, match_id):
+        competition = self._competition(type, id)
+
+        if int(match_id) not in self.matches or self.matches[int(match_id)][0] is not competition:
+            raise FakeApiError('Match not found', 404)
+
+        return self.matches[int(match_id)][3]
+
+    def update_match(self, data, type, id, match_id):
+        match = self.get_match(None, type, id, match_id)
+        competition, round_index, match_index, match = self.matches[int(match_id)]
+
+        self._assign(match, data, MATCH_FIELDS)
+
+        if competition.type == 'tournament':
+            self._advance(competition, round_index, match_index)
+
+        self._touch(competition)
+
+        return match
+
+    def get_table(self, data, type, id):
+        # worked out here from what the fake keeps (int ids, scores and points as they were sent), without the client's
+        # helpers, so that tables from pwned.standings and pwned.analytics are checked against a second implementation
+        competition = self._competition(type, id)
+        scoring_model = competition.data['scoringModel']
+        rows = {}
+
+        for signup in competition.signups:
+            rows[signup['id']] = {'signup': signup, 'position': None, 'wins': 0, 'draws': 0, 'losses': 0, 'points': 0.0, 'scoreFor': 0.0, 'scoreAgainst': 0.0}
+
+        if competition.data['leagueType'] == 'championship':
+            position_points = scoring_model['positionPoints'] or {}
+
+            for results in competition.results.values():
+                for result in results:
+                    row = rows.get(result['signupId'])
+
+                    if row:
+                        row['points'] += float(position_points.get(str(result['position']), 0) or 0)
+                        row['scoreFor'] += float(result['score'] or 0)
+        else:
+            for round in competition.rounds:
+                for stage in round['stages']:
+                    for match in stage['matches']:
+                        self._score_match(rows, match, scoring_model)
+
+        if isinstance(scoring_model['bonusPoints'], dict):
+            for signup_id, points in scoring_model['bonusPoints'].items():
+                if int(signup_id) in rows and points not in (None, ''):
+                    rows[int(signup_id)]['points'] += float(points)
+
+        for row in rows.values():
+            row['score'] = row['scoreFor'] - row['scoreAgainst']
+
+        table = sorted(rows.values(), key=lambda row: (-row['points'], -row['score'], -row['scoreFor']))
+
+        for position, row in enumerate(table, 1):
+            row['position'] = position
+
+            for field in ('points', 'score', 'scoreFor', 'scoreAgainst'):
+                if row[field].is_integer():
+                    row[field] = int(row[field])
+
+        return table
+
+    def set_round_results(self, data, type, id, round_number):
+        competition = self._competition(type, id)
+        self.get_round(None, type, id, round_number)
+
+        competition.results[int(round_number)] = [
+            {'signupId': int(result['signupId']), 'position': result.get('position'), 'score': result.get('score')}
+            for result in data or []
+        ]
+        competition.data['roundCurrent'] = min(max(competition.results) + 1, competition.data['roundCount'])
+        self._touch(competition)
+
+        return True
+
+    def _competition(self, type, id):
+        competition = self.competitions[type].get(int(id))
+
+        if competition is None:
+            raise FakeApiError(type.capitalize() + ' not found', 404)
+
+        return competition
+
+    def _create_tournament(self, competition, data):
+        self._assign(competition.data, data, TOURNAMENT_FIELDS)
+
+        try:
+            bracket = pwned.brackets.from_template(competition.data.get('template') or 'singleelim8')
+        except ValueError:
+            raise FakeApiError('Unknown template: ' + str(competition.data.get('template')))
+
+        competition.bracket = bracket
+        competition.data['template'] = bracket.template
+        competition.data['teamCount'] = bracket.teams
+        competition.data['roundCount'] = len(bracket.schedule)
+
+        # each stage is a round of the bracket, matches are kept track of by their place in the bracket
+        for name, round_indexes in bracket.schedule:
+            self._add_round(competition, name, [(bracket.rounds[round_index][0], bracket.rounds[round_index][1], round_index) for round_index in round_indexes])
+
+    def _create_league(self, competition, data):
+        competition.data.update({'leagueType': 'league', 'teamCount': 8, 'scoringModelId': None, 'roundCount': None})
+        self._assign(competition.data, data, LEAGUE_FIELDS)
+
+        if competition.data['leagueType'] not in ('league', 'championship'):
+            raise FakeApiError('Unknown league type: ' + str(competition.data['leagueType']))
+
+        if not competition.data['scoringModelId']:
+            competition.data['scoringModelId'] = 2 if competition.data['leagueType'] == 'championship' else 1
+
+        competition.data['scoringModel'] = self.get_scoring_model(None, competition.data['scoringModelId'])
+
+        if competition.data['leagueType'] == 'championship':
+            competition.data['roundCount'] = int(competition.data['roundCount'] or 1)
+
+            for round_number in range(1, competition.data['roundCount'] + 1):
+                self._add_round(competition, 'Round ' + str(round_number), [])
+        else:
+            teams = int(competition.data['teamCount'])
+            teams = teams + teams % 2
+            competition.data['roundCount'] = teams - 1
+
+            for round_number in range(1, teams):
+                self._add_round(competition, 'Round ' + str(round_number), [(None, teams // 2, round_number - 1)])
+
+    def _add_round(self, competition, name, stages):
+        # stages are (description, match count, round index the matches are kept track of by)
+        round_index = len(competition.rounds)
+        round_stages = []
+
+        for description, match_count, position in stages:
+            matches = []
+
+            for match_index in range(0, match_count):
+                match = {
+                    'id': next(self._match_ids), 'signup': None, 'signupOpponent': None, 'score': None, 'scoreOpponent': None,
+                    'seeding': None, 'seedingOpponent': None, 'isWalkover': False, 'time': None, 'mapName': None,
+                }
+                self.matches[match['id']] = (competition, position, match_index, match)
+                matches.append(match)
+
+            round_stages.append({'mapName': None, 'description': description, 'time': None, 'matches': matches})
+
+        competition.rounds.append({
+            'roundNumber': round_index + 1,
+            'identifier': 'round-' + str(round_index + 1),
+            'name': name,
+            'description': None,
+            'time': None,
+            'startedAt': None,
+            'stages': round_stages,
+            'groups': [],
+        })
+
+    def _start(self, competition):
+        competition.data['status'] = 'live'
+        competition.data['liveAt'] = self._now()
+        competition.data['roundCurrent'] = 1
+
+        if competition.data['roundCount']:
+            competition.rounds[0]['startedAt'] = competition.data['liveAt']
+
+        if competition.type == 'tournament':
+            self._seed_bracket(competition)
+        elif competition.data['leagueType'] == 'league':
+            self._schedule_league(competition)
+
+    def _seed_bracket(self, competition):
+        teams = competition.data['teamCount']
+        signups = sorted(competition.signups[0:teams], key=lambda signup: (signup['seeding'] is None, signup['seeding'] or 0))
+        slots = signups + [None] * (teams - len(signups))
+        matches = self._bracket_matches(competition, 0)
+
+        for match_index, match in enumerate(matches):
+            match['signup'] = slots[match_index]
+            match['signupOpponent'] = slots[teams - 1 - match_index]
+            match['seeding'] = match_index + 1
+            match['seedingOpponent'] = teams - match_index
+
+            if match['signup'] is None or match['signupOpponent'] is None:
+                match['isWalkover'] = True
+                self._advance(competition, 0, match_index)
+
+    def _schedule_league(self, competition):
+        teams = list(competition.signups)
+        teams = teams + [None] * ((len(competition.rounds) + 1) - len(teams))
+
+        for round in competition.rounds:
+            for match_index, match in enumerate(round['stages'][0]['matches']):
+                match['signup'] = teams[match_index]
+                match['signupOpponent'] = teams[len(teams) - 1 - match_index]
+
+            # circle method: keep the first team fixed and rotate the rest
+            teams = [teams[0], teams[-1]] + teams[1:-1]
+
+    def _advance(self, competition, round_index, match_index):
+        # sends the winner and the loser of a decided match on. walkovers send their only team, or nothing, on as the
+        # winner, and a bye on as the loser; a match that ends up with a team and a bye is a walkover in turn
+        match = self._bracket_matches(competition, round_index)[match_index]
+
+        if match['isWalkover']:
+            winner, loser = match['signup'] or match['signupOpponent'], None
+        elif match['score'] is not None and match['scoreOpponent'] is not None and match['score'] != match['scoreOpponent']:
+            winner, loser = match['signup'], match['signupOpponent']
+
+            if float(match['score']) < float(match['scoreOpponent']):
+                winner, loser = loser, winner
+        else:
+            return
+
+        for slot, signup in ((competition.bracket.winners.get((round_index, match_index)), winner), (competition.bracket.losers.get((round_index, match_index)), loser)):
+            if slot is None:
+                continue
+
+            next_match = self._bracket_matches(competition, slot.round_index)[slot.match_index]
+            next_match['signup' if slot.side == 0 else 'signupOpponent'] = signup
+            fed = competition.fed.setdefault((slot.round_index, slot.match_index), set())
+            fed.add((round_index, match_index))
+
+            if len(fed) == 2 and not next_match['isWalkover'] and (next_match['signup'] is None or next_match['signupOpponent'] is None):
+                next_match['isWalkover'] = True
+                self._advance(competition, slot.round_index, slot.match_index)
+
+    def _bracket_matches(self, competition, round_index):
+        api_round_index, stage_index = competition.bracket.layout[round_index]
+
+        return competition.rounds[api_round_index]['stages'][stage_index]['matches']
+
+    def _score_match(self, rows, match, scoring_model):
+        if match['signup'] is None or match['signupOpponent'] is None or match['score'] is None or match['scoreOpponent'] is None:
+            return
+
+        score, score_opponent = float(match['score']), float(match['scoreOpponent'])
+
+        for signup, score_for, score_against in ((match['signup'], score, score_opponent), (match['signupOpponent'], score_opponent, score)):
+            row = rows.get(int(signup['id']))
+
+            if row is None:
+                continue
+
+            if score_for > score_against:
+                row['wins'] += 1
+                row['points'] += float(scoring_model['winPoints'] or 0)
+            elif score_for == score_against:
+                row['draws'] += 1
+                row['points'] += float(scoring_model['drawPoints'] or 0)
+            else:
+                row['losses'] += 1
+                row['points'] += float(scoring_model['lossPoints'] or 0)
+
+            row['scoreFor'] += score_for
+            row['scoreAgainst'] += score_against
+
+    def _set_game(self, competition):
+        competition.data['game'] = None
+
+        for game in GAMES:
+            if competition.data['gameId'] is not None and game['id'] == int(competition.data['gameId']):
+                competition.data['game'] = game
+
+    def _touch(self, competition):
+        competition.data['lastActivityAt'] = self._now()
+
+    def _now(self):
+        return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    def _assign(self, target, data, fields):
+        if not isinstance(data, dict):
+            return
+
+        for field in fields:
+            if field in data:
+                target[field] = data[field]
+
+class FakeServer:
+    def __init__(self, api=None, host='127.0.0.1', port=0, latency=0, error_rate=0, seed=None, rate_limit=None, compression=False, compression_threshold=1024):
+        if api is None:
+            api = FakeApi()
+
+        self.api = api
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self.compressed_requests = 0
+        self.compressed_responses = 0
+
+        # compress responses of at least compression_threshold bytes for clients that accept it
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+
+        # requests per second before answering 429, with a burst of one second's worth
+        self.rate_limit = rate_limit
+        self._tokens = rate_limit
+        self._tokens_updated = time.monotonic()
+        self._tokens_lock = threading.Lock()
+
+        self._server = http.server.ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[0:2]
+
+        return 'http://' + host + ':' + str(port) + '/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05, ), daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _retry_after(self):
+        # None if the request may go ahead, or how long the client should wait
+        if not self.rate_limit:
+            return None
+
+        with self._tokens_lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._tokens_updated) * self.rate_limit)
+            self._tokens_updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+
+            self.throttled += 1
+
+            return (1 - self._tokens) / self.rate_limit
+
+    def _response_encoding(self, accept_encoding, body):
+        if not self.compression or not accept_encoding or len(body) < self.compression_threshold:
+            return None
+
+        accepted = [value.split(';')[0].strip().lower() for value in accept_encoding.split(',')]
+
+        for encoding in ('gzip', 'deflate'):
+            if encoding in accepted:
+                return encoding
+
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+
+                # headers and body are written separately, which stalls kept-alive connections without this
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                self.respond()
+
+            def do_POST(self):
+                self.respond()
+
+            def do_DELETE(self):
+                self.respond()
+
+            def respond(self):
+                url_info = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url_info.query))
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                server.requests += 1
+
+                if self.headers.get('Content-Encoding'):
+                    # signatures cover the payload, not what was sent
+                    body = pwned.compression.decompress(body, self.headers.get('Content-Encoding'))
+                    server.compressed_requests += 1
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                retry_after = server._retry_after()
+                extra_headers = {}
+
+                if retry_after is not None:
+                    # finer grained than the whole seconds real servers send, so tests don't have to wait that long
+                    status = 429
+                    body = json.dumps({'error': {'reason': 'Too many requests'}}).encode('utf-8')
+                    extra_headers['Retry-After'] = '{:.3f}'.format(retry_after)
+                elif server.error_rate and server.random.random() < server.error_rate:
+                    status = 503
+                    body = json.dumps({'error': {'reason': 'Service temporarily unavailable'}}).encode('utf-8')
+                else:
+                    # payloads reference live state, so serialize them before anyone else can change it
+                    with server.api.lock:
+                        status, payload = server.api.handle(self.command, url_info.path[1:], query, body)
+                        body = json.dumps(payload).encode('utf-8')
+
+                etag = None
+
+                if self.command == 'GET' and status == 200:
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+                    if self.headers.get('If-None-Match') == etag:
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+
+                encoding = server._response_encoding(self.headers.get('Accept-Encoding'), body)
+
+                if encoding == 'gzip':
+                    body = pwned.compression.compress(body)
+                elif encoding == 'deflate':
+                    body = zlib.compress(body)
+
+                if encoding:
+                    server.compressed_responses += 1
+                    extra_headers['Content-Encoding'] = encoding
+                    extra_headers['Vary'] = 'Accept-Encoding'
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+
+                if etag:
+                    self.send_header('ETag', etag)
+
+                for name in extra_headers:
+                    self.send_header(name, extra_headers[name])
+
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a fake pwned.no API for local testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0, help='seconds to wait before answering each request')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests to fail with a 503')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests per second before answering 429')
+    parser.add_argument('--compression', action='store_true', help='gzip or deflate responses for clients that accept it')
+    args = parser.parse_args(argv)
+
+    server = FakeServer(host=args.host, port=args.port, latency=args.latency, error_rate=args.error_rate, seed=args.seed, rate_limit=args.rate_limit, compression=args.compression)
+    print(server.base_url, flush=True)
+
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+if __name__ == '__main__':
+    main()
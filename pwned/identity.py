@@ -0,0 +1,72 @@
+import threading
+
+import pwned.support
+
+# resolves objects with an _identity (signups, by id) to one shared instance per client, and deduplicates the
+# repeated strings of a response (match times, map names, ...). decoding the same signup again updates the shared
+# instance in place, so a change is visible in every match and table row that references it. ids are matched by
+# signup_key, so 5 and '5' are the same signup.
+class IdentityMap:
+    def __init__(self):
+        self.strings = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def decode(self, cls, data):
+        decoder = pwned.support.get_decoder(cls, shared=True)
+
+        if getattr(cls, '_identity', None):
+            return self.resolve(cls, decoder, data)
+
+        return decoder(data, self)
+
+    def resolve(self, cls, decoder, data):
+        key = pwned.support.signup_key(data.get(cls._identity))
+
+        if key is None:
+            return decoder(data, self)
+
+        obj = self._objects.get((cls, key))
+
+        if obj is None:
+            obj = decoder(data, self)
+
+            with self._lock:
+                self.misses += 1
+                shared = self._objects.setdefault((cls, key), obj)
+
+            if shared is obj:
+                return obj
+
+            obj = shared
+        else:
+            self.hits += 1
+
+        return decoder(data, self, obj)
+
+    def get(self, cls, key):
+        return self._objects.get((cls, pwned.support.signup_key(key)))
+
+    def forget(self, cls, key):
+        with self._lock:
+            self._objects.pop((cls, pwned.support.signup_key(key)), None)
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self.strings.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'objects': len(self._objects),
+            'strings': len(self.strings),
+        }
+
+    def __len__(self):
+        return len(self._objects)
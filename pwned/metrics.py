@@ -0,0 +1,168 @@
+import bisect
+import collections
+import re
+import threading
+
+# upper bounds of the latency buckets, in seconds; anything slower goes in a last, unbounded bucket
+LATENCY_BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+def _ratio(wire, size):
+    return wire / size if size else None
+
+# one finished request, as passed to exporters. request_bytes and response_bytes are payload sizes, the *_wire_bytes
+# what was actually sent and received; they only differ for compressed bodies
+class RequestRecord(collections.namedtuple('RequestRecord', ('method', 'template', 'resource', 'status', 'elapsed', 'request_bytes', 'response_bytes', 'retries', 'error', 'request_wire_bytes', 'response_wire_bytes'))):
+    __slots__ = ()
+
+    @property
+    def request_ratio(self):
+        return _ratio(self.request_wire_bytes, self.request_bytes)
+
+    @property
+    def response_ratio(self):
+        return _ratio(self.response_wire_bytes, self.response_bytes)
+
+_ids = re.compile(r'(?<=/)\d+(?=/|$)')
+
+def resource_template(resource):
+    # tournaments/12/matches/3 -> tournaments/{id}/matches/{id}
+    return _ids.sub('{id}', resource.strip('/'))
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        # the upper bound of the bucket the percentile falls in (the largest value seen for the last bucket)
+        if not self.count:
+            return None
+
+        wanted = fraction * self.count
+        seen = 0
+
+        for i, count in enumerate(self.counts):
+            seen += count
+
+            if seen >= wanted and count:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'buckets': list(zip(self.bounds + (None, ), self.counts)),
+        }
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.request_wire_bytes = 0
+        self.response_wire_bytes = 0
+        self.statuses = collections.Counter()
+        self.latency = Histogram()
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'failures': self.failures,
+            'retries': self.retries,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'request_wire_bytes': self.request_wire_bytes,
+            'response_wire_bytes': self.response_wire_bytes,
+            # compressed size / payload size, None when nothing was sent or received
+            'request_ratio': _ratio(self.request_wire_bytes, self.request_bytes),
+            'response_ratio': _ratio(self.response_wire_bytes, self.response_bytes),
+            'statuses': dict(self.statuses),
+            'latency': self.latency.snapshot(),
+        }
+
+# collects what Pwned(metrics=...) sends and receives, per method and resource template. errors are requests that
+# ended in a PwnedAPIException, failures are requests that never got a response (connection errors, timeouts).
+# exporters are called with a RequestRecord after every request.
+class ClientMetrics:
+    def __init__(self, exporters=()):
+        self.exporters = list(exporters)
+
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def record(self, method, resource, status, elapsed, request_bytes=0, response_bytes=0, retries=0, error=None,
+               request_wire_bytes=None, response_wire_bytes=None):
+        if request_wire_bytes is None:
+            request_wire_bytes = request_bytes
+
+        if response_wire_bytes is None:
+            response_wire_bytes = response_bytes
+
+        template = resource_template(resource)
+        key = method + ' ' + template
+
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+
+            if endpoint is None:
+                endpoint = self._endpoints[key] = EndpointMetrics()
+
+            endpoint.requests += 1
+            endpoint.retries += retries
+            endpoint.request_bytes += request_bytes
+            endpoint.response_bytes += response_bytes
+            endpoint.request_wire_bytes += request_wire_bytes
+            endpoint.response_wire_bytes += response_wire_bytes
+            endpoint.latency.add(elapsed)
+
+            if status is None:
+                endpoint.failures += 1
+            else:
+                endpoint.statuses[status] += 1
+
+            if error == 'api':
+                endpoint.errors += 1
+
+        if self.exporters:
+            record = RequestRecord(method, template, resource, status, elapsed, request_bytes, response_bytes, retries, error, request_wire_bytes, response_wire_bytes)
+
+            for exporter in self.exporters:
+                exporter(record)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: self._endpoints[key].snapshot() for key in sorted(self._endpoints)}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
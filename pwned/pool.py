@@ -0,0 +1,461 @@
+import http.client
+import urllib.parse
+import threading
+import collections
+import contextlib
+import asyncio
+import ssl
+import io
+import select
+import time
+
+import pwned.profiling
+
+PooledResponse = collections.namedtuple('PooledResponse', ('status', 'headers', 'body'))
+
+# requests that are safe to send again when a kept-alive connection turns out to be gone. anything else might have
+# reached the server before the connection dropped, so the error goes to the caller instead
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+def _closed_by_peer(connection):
+    # an idle kept-alive socket has nothing to read unless the server has closed it (or sent something it shouldn't)
+    if connection.sock is None:
+        return False
+
+    try:
+        readable, writable, failed = select.select([connection.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+
+    return bool(readable)
+
+class ConnectionPool:
+    # errors raised when a kept-alive socket has been closed by the server while idle
+    stale_errors = (
+        http.client.RemoteDisconnected,
+        http.client.BadStatusLine,
+        ConnectionResetError,
+        ConnectionAbortedError,
+        BrokenPipeError,
+    )
+
+    def __init__(self, max_size=10, idle_timeout=60, timeout=None, ssl_context=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None):
+        with self.stream(method, url, body, headers) as response:
+            with pwned.profiling.phase('body'):
+                body = response.read()
+
+            return PooledResponse(response.status, response.msg, body)
+
+    @contextlib.contextmanager
+    def stream(self, method, url, body=None, headers=None):
+        url_info = urllib.parse.urlsplit(url)
+        key = (url_info.scheme, url_info.netloc)
+        path = url_info.path or '/'
+
+        if url_info.query:
+            path = path + '?' + url_info.query
+
+        if headers is None:
+            headers = {}
+
+        connection, reused = self._acquire(key)
+
+        try:
+            try:
+                response = self._send(connection, method, path, body, headers)
+            except self.stale_errors:
+                if not reused or method not in IDEMPOTENT_METHODS:
+                    raise
+
+                connection.close()
+                connection = self._connect(key)
+                response = self._send(connection, method, path, body, headers)
+
+            yield response
+        except BaseException:
+            connection.close()
+            raise
+
+        # only a fully read response leaves the connection ready for the next request
+        if response.will_close or not response.isclosed():
+            connection.close()
+        else:
+            self._release(key, connection)
+
+    def idle_count(self, scheme=None, netloc=None):
+        with self._lock:
+            if scheme is None:
+                return sum(len(connections) for connections in self._idle.values())
+
+            return len(self._idle.get((scheme, netloc), []))
+
+    def close(self):
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+
+        for connections in idle.values():
+            for connection, last_used in connections:
+                connection.close()
+
+    def _send(self, connection, method, path, body, headers):
+        if connection.sock is None:
+            with pwned.profiling.phase('connect'):
+                connection.connect()
+
+        with pwned.profiling.phase('send'):
+            connection.request(method, path, body=body, headers=headers)
+
+        with pwned.profiling.phase('first_byte'):
+            return connection.getresponse()
+
+    def _acquire(self, key):
+        expired = []
+        connection = None
+
+        with self._lock:
+            connections = self._idle.get(key, [])
+            now = time.monotonic()
+
+            while connections:
+                candidate, last_used = connections.pop()
+
+                if (self.idle_timeout is not None and now - last_used > self.idle_timeout) or _closed_by_peer(candidate):
+                    expired.append(candidate)
+                else:
+                    connection = candidate
+                    break
+
+            # anything older than the connection we picked has been idle even longer
+            if self.idle_timeout is not None:
+                while connections and now - connections[0][1] > self.idle_timeout:
+                    expired.append(connections.pop(0)[0])
+
+        for candidate in expired:
+            candidate.close()
+
+        if connection:
+            return connection, True
+
+        return self._connect(key), False
+
+    def _release(self, key, connection):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+
+            if len(connections) < self.max_size:
+                connections.append((connection, time.monotonic()))
+                return
+
+        connection.close()
+
+    def _connect(self, key):
+        scheme, netloc = key
+
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout, context=self.ssl_context)
+
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+# a response of the AsyncConnectionPool, read as it arrives: read(size) returns up to size bytes of the body, all of
+# the rest without a size, and b'' once the body is done
+class AsyncResponse:
+    def __init__(self, reader, method, version, status, headers, timeout=None):
+        self.status = status
+        self.headers = headers
+        self.timeout = timeout
+
+        self._reader = reader
+        self._chunked = False
+        self._remaining = None
+        self._done = False
+
+        connection_header = (headers.get('Connection') or '').lower()
+        self.will_close = connection_header == 'close' or (version == b'HTTP/1.0' and connection_header != 'keep-alive')
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            self._done = True
+        elif 'chunked' in (headers.get('Transfer-Encoding') or '').lower():
+            self._chunked = True
+            self._remaining = 0
+        elif headers.get('Content-Length') is not None:
+            self._remaining = int(headers.get('Content-Length'))
+            self._done = not self._remaining
+        else:
+            # the body ends when the server closes the connection
+            self.will_close = True
+
+    @property
+    def complete(self):
+        return self._done
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    async def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+
+            while True:
+                chunk = await self.read(64 * 1024)
+
+                if not chunk:
+                    return b''.join(chunks)
+
+                chunks.append(chunk)
+
+        if self._done or not size:
+            return b''
+
+        if self._chunked:
+            return await self._read_chunked(size)
+
+        if self._remaining is None:
+            chunk = await self._reader.read(size)
+            self._done = not chunk
+
+            return chunk
+
+        chunk = await self._reader.read(min(size, self._remaining))
+
+        if not chunk:
+            raise asyncio.IncompleteReadError(chunk, self._remaining)
+
+        self._remaining -= len(chunk)
+        self._done = not self._remaining
+
+        return chunk
+
+    async def _read_chunked(self, size):
+        if not self._remaining:
+            self._remaining = int((await self._reader.readline()).split(b';', 1)[0], 16)
+
+            if not self._remaining:
+                # skip any trailers
+                while (await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+
+                self._done = True
+
+                return b''
+
+        chunk = await self._reader.read(min(size, self._remaining))
+
+        if not chunk:
+            raise asyncio.IncompleteReadError(chunk, self._remaining)
+
+        self._remaining -= len(chunk)
+
+        # the line break after each chunk
+        if not self._remaining:
+            await self._reader.readline()
+
+        return chunk
+
+class AsyncConnectionPool:
+    stale_errors = (
+        asyncio.IncompleteReadError,
+        ConnectionResetError,
+        ConnectionAbortedError,
+        BrokenPipeError,
+    )
+
+    def __init__(self, max_size=10, idle_timeout=60, timeout=None, ssl_context=None, max_connections=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.max_connections = max_connections
+
+        self._idle = {}
+        self._limits = {}
+
+    async def request(self, method, url, body=None, headers=None):
+        key, request = self._prepare(method, url, body, headers)
+        limit = self._limit(key)
+
+        if limit is None:
+            return await self._request(key, method, request)
+
+        async with limit:
+            return await self._request(key, method, request)
+
+    def idle_count(self, scheme=None, netloc=None):
+        if scheme is None:
+            return sum(len(connections) for connections in self._idle.values())
+
+        return len(self._idle.get((scheme, netloc), []))
+
+    async def close(self):
+        idle = self._idle
+        self._idle = {}
+
+        for connections in idle.values():
+            for (reader, writer), last_used in connections:
+                writer.close()
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method, url, body=None, headers=None):
+        # the response as soon as its headers are in; the body is read from it with await response.read(size)
+        key, request = self._prepare(method, url, body, headers)
+        limit = self._limit(key)
+
+        if limit is not None:
+            await limit.acquire()
+
+        try:
+            connection, response = await self._open(key, method, request)
+
+            try:
+                yield response
+            except BaseException:
+                connection[1].close()
+                raise
+
+            # only a fully read response leaves the connection ready for the next request
+            if response.will_close or not response.complete:
+                connection[1].close()
+            else:
+                self._release(key, connection)
+        finally:
+            if limit is not None:
+                limit.release()
+
+    async def _request(self, key, method, request):
+        connection, response = await self._open(key, method, request)
+
+        try:
+            with pwned.profiling.phase('body'):
+                body = await asyncio.wait_for(response.read(), self.timeout)
+        except BaseException:
+            connection[1].close()
+            raise
+
+        if response.will_close:
+            connection[1].close()
+        else:
+            self._release(key, connection)
+
+        return PooledResponse(response.status, response.headers, body)
+
+    async def _open(self, key, method, request):
+        # sends the request and reads the response headers, on a fresh connection if a reused one turns out to be gone
+        connection, reused = await self._acquire(key)
+
+        try:
+            try:
+                response = await asyncio.wait_for(self._send(connection, method, request), self.timeout)
+            except self.stale_errors:
+                if not reused or method not in IDEMPOTENT_METHODS:
+                    raise
+
+                connection[1].close()
+                connection = await self._connect(key)
+                response = await asyncio.wait_for(self._send(connection, method, request), self.timeout)
+        except BaseException:
+            connection[1].close()
+            raise
+
+        return connection, response
+
+    async def _send(self, connection, method, request):
+        reader, writer = connection
+
+        with pwned.profiling.phase('send'):
+            writer.write(request)
+            await writer.drain()
+
+        with pwned.profiling.phase('first_byte'):
+            status_line = await reader.readline()
+
+            if not status_line:
+                raise asyncio.IncompleteReadError(status_line, None)
+
+            version, status = status_line.split(None, 2)[0:2]
+            status = int(status)
+            header_lines = []
+
+            while True:
+                line = await reader.readline()
+
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+                header_lines.append(line)
+
+        headers = http.client.parse_headers(io.BytesIO(b''.join(header_lines) + b'\r\n'))
+
+        return AsyncResponse(reader, method, version, status, headers, self.timeout)
+
+    def _prepare(self, method, url, body, headers):
+        url_info = urllib.parse.urlsplit(url)
+        path = url_info.path or '/'
+
+        if url_info.query:
+            path = path + '?' + url_info.query
+
+        return (url_info.scheme, url_info.netloc), self._serialize_request(method, path, url_info.netloc, body, headers or {})
+
+    def _serialize_request(self, method, path, netloc, body, headers):
+        lines = [method + ' ' + path + ' HTTP/1.1', 'Host: ' + netloc]
+
+        for name in headers:
+            lines.append(name + ': ' + str(headers[name]))
+
+        if body is not None or method in ('POST', 'PUT'):
+            lines.append('Content-Length: ' + str(len(body or b'')))
+
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+    def _limit(self, key):
+        if not self.max_connections:
+            return None
+
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.max_connections)
+
+        return self._limits[key]
+
+    async def _acquire(self, key):
+        connections = self._idle.get(key, [])
+        now = time.monotonic()
+
+        while connections:
+            connection, last_used = connections.pop()
+
+            if connection[0].at_eof() or (self.idle_timeout is not None and now - last_used > self.idle_timeout):
+                connection[1].close()
+            else:
+                return connection, True
+
+        return await self._connect(key), False
+
+    def _release(self, key, connection):
+        connections = self._idle.setdefault(key, [])
+
+        if len(connections) < self.max_size:
+            connections.append((connection, time.monotonic()))
+        else:
+            connection[1].close()
+
+    async def _connect(self, key):
+        scheme, netloc = key
+        url_info = urllib.parse.urlsplit(scheme + '://' + netloc)
+        context = None
+
+        if scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+
+        port = url_info.port or (443 if scheme == 'https' else 80)
+
+        with pwned.profiling.phase('connect'):
+            return await asyncio.wait_for(asyncio.open_connection(url_info.hostname, port, ssl=context), self.timeout)
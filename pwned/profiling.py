@@ -0,0 +1,207 @@
+import contextvars
+import threading
+import time
+
+PHASES = ('encode', 'connect', 'send', 'first_byte', 'body', 'decode', 'hydrate')
+
+# the active Profile, the request being made right now, the last request made in this context, and phases measured
+# before a request started (encoding) that belong to the next one. run_batch copies the context into its workers,
+# and asyncio tasks copy it too, so requests made from a profiled block are profiled wherever they run.
+_profile = contextvars.ContextVar('pwned_profile', default=None)
+_current = contextvars.ContextVar('pwned_profile_current', default=None)
+_last = contextvars.ContextVar('pwned_profile_last', default=None)
+_pending = contextvars.ContextVar('pwned_profile_pending', default=None)
+_open = contextvars.ContextVar('pwned_profile_open', default=())
+
+class CallProfile:
+    def __init__(self, method, resource):
+        self.method = method
+        self.resource = resource
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.elapsed = 0.0
+        self.closed = False
+
+        self._started = time.perf_counter()
+        self._suspended = 0.0
+        self._suspended_at = None
+
+    @property
+    def total(self):
+        # the request itself, plus encoding before and hydration after it
+        return self.elapsed + self.phases['encode'] + self.phases['hydrate']
+
+    @property
+    def other(self):
+        # time spent in the request that none of the phases account for: signing, the rate limiter, retries, and
+        # for streamed calls (iter_rounds, iter_matches) decoding, which happens as the body is read
+        network = sum(self.phases[name] for name in ('connect', 'send', 'first_byte', 'body', 'decode'))
+
+        return max(0.0, self.elapsed - network)
+
+    def __repr__(self):
+        return 'CallProfile(' + self.method + ' ' + self.resource + ', ' + '{:.3f} ms'.format(self.total * 1000) + ')'
+
+class Profile:
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.calls = []
+
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _profile.set(self)
+        return self
+
+    def __exit__(self, *args):
+        _profile.reset(self._token)
+
+        for call in list(self.calls):
+            self._close(call)
+
+    def summary(self):
+        totals = dict.fromkeys(PHASES + ('other', 'total'), 0.0)
+
+        for call in self.calls:
+            for name in PHASES:
+                totals[name] += call.phases[name]
+
+            totals['other'] += call.other
+            totals['total'] += call.total
+
+        return totals
+
+    def report(self):
+        columns = PHASES + ('other', 'total')
+        lines = ['{:<48}'.format('call') + ''.join('{:>11}'.format(name) for name in columns)]
+
+        for call in self.calls:
+            values = [call.phases[name] for name in PHASES] + [call.other, call.total]
+            lines.append('{:<48}'.format((call.method + ' ' + call.resource)[0:47]) + ''.join('{:>11.3f}'.format(value * 1000) for value in values))
+
+        summary = self.summary()
+        lines.append('{:<48}'.format('total (ms), ' + str(len(self.calls)) + ' calls') + ''.join('{:>11.3f}'.format(summary[name] * 1000) for name in columns))
+
+        return '\n'.join(lines)
+
+    def _add(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    def _close(self, call):
+        with self._lock:
+            if call.closed:
+                return
+
+            call.closed = True
+
+        if self.callback is not None:
+            self.callback(call)
+
+class _Phase:
+    __slots__ = ('profile', 'name', 'started', 'token')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.token = _open.set(_open.get() + (self.name, ))
+        self.started = time.perf_counter()
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.started
+        _open.reset(self.token)
+
+        call = _current.get()
+
+        if call is None and self.name == 'encode':
+            # encoding happens before the request it's for
+            pending = _pending.get()
+
+            if pending is None:
+                pending = {}
+                _pending.set(pending)
+
+            pending[self.name] = pending.get(self.name, 0.0) + elapsed
+            return
+
+        if call is None:
+            call = _last.get()
+
+        if call is not None:
+            call.phases[self.name] += elapsed
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+_no_phase = _NoPhase()
+
+def phase(name):
+    # times a with block as one phase of the current call; does nothing unless a profile is active, or when the
+    # block is nested in a phase of the same name (decoding nested objects, for example)
+    profile = _profile.get()
+
+    if profile is None or name in _open.get():
+        return _no_phase
+
+    return _Phase(profile, name)
+
+def begin(method, resource):
+    profile = _profile.get()
+
+    if profile is None:
+        return None
+
+    previous = _last.get()
+
+    if previous is not None:
+        profile._close(previous)
+
+    call = CallProfile(method, resource)
+    pending = _pending.get()
+
+    if pending:
+        for name in pending:
+            call.phases[name] += pending[name]
+
+        _pending.set(None)
+
+    profile._add(call)
+    _current.set(call)
+
+    return call
+
+def suspend(call):
+    # a streaming call handing an item to its caller; the time until resume() isn't part of the request
+    if call is None:
+        return
+
+    call._suspended_at = time.perf_counter()
+    _current.set(None)
+    _last.set(call)
+
+def resume(call):
+    if call is None:
+        return
+
+    call._suspended += time.perf_counter() - call._suspended_at
+    call._suspended_at = None
+    _current.set(call)
+
+def end(call):
+    if call is None:
+        return
+
+    if call._suspended_at is not None:
+        resume(call)
+
+    call.elapsed = time.perf_counter() - call._started - call._suspended
+    _current.set(None)
+    _last.set(call)
@@ -0,0 +1,250 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import email.utils
+import threading
+import time
+
+LANES = ('interactive', 'bulk')
+
+# statuses that mean "slow down"; the request wasn't handled and can be sent again
+THROTTLED = (429, 503)
+
+_lane = contextvars.ContextVar('pwned_rate_limit_lane', default=None)
+
+class LaneStats:
+    def __init__(self):
+        self.acquired = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+# a token bucket shared by every request of a client. requests wait in lanes; a request is only let through when no
+# lane in front of it (in the order given by lanes) has anyone waiting, so interactive calls overtake bulk jobs.
+#
+# the rate adapts: every successful response raises it by increase (up to max_rate), every 429/503 halves it (down
+# to min_rate), and a Retry-After header pauses the bucket for as long as the server asked.
+class RateLimiter:
+    def __init__(self, rate=10.0, burst=None, lanes=LANES, min_rate=0.5, max_rate=None, increase=None, decrease=0.5, max_retries=3):
+        if burst is None:
+            burst = max(rate, 1.0)
+
+        if max_rate is None:
+            max_rate = rate * 4
+
+        if increase is None:
+            increase = rate / 10
+
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.lanes = tuple(lanes)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+
+        self.throttled = 0
+        self.retries = 0
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queues = {name: collections.deque() for name in self.lanes}
+        self._stats = {name: LaneStats() for name in self.lanes}
+        self._condition = threading.Condition()
+        self._async_waiters = set()
+
+    @contextlib.contextmanager
+    def lane(self, name):
+        # requests made inside the block (and by batch helpers started from it) wait in this lane
+        if name not in self._queues:
+            raise ValueError('Unknown rate limiter lane: ' + str(name))
+
+        token = _lane.set(name)
+
+        try:
+            yield self
+        finally:
+            _lane.reset(token)
+
+    def acquire(self, lane=None):
+        lane = self._lane(lane)
+        ticket = object()
+        started = time.monotonic()
+
+        with self._condition:
+            self._queues[lane].append(ticket)
+
+            try:
+                delay = self._take(lane, ticket)
+
+                while delay:
+                    self._condition.wait(None if delay is True else delay)
+                    delay = self._take(lane, ticket)
+            finally:
+                if delay:
+                    self._queues[lane].remove(ticket)
+                    self._notify()
+
+            self._record(lane, time.monotonic() - started)
+            self._notify()
+
+    async def acquire_async(self, lane=None):
+        # the limiter may be shared by threads and event loops, which an asyncio.Condition (bound to one loop) can't
+        # be; every waiting coroutine has an asyncio.Event instead, set from _notify() with call_soon_threadsafe
+        lane = self._lane(lane)
+        ticket = object()
+        started = time.monotonic()
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+
+        with self._condition:
+            self._queues[lane].append(ticket)
+            delay = self._take(lane, ticket)
+
+            if delay:
+                self._async_waiters.add(waiter)
+
+        try:
+            while delay:
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), None if delay is True else delay)
+                except asyncio.TimeoutError:
+                    pass
+
+                waiter[1].clear()
+
+                with self._condition:
+                    delay = self._take(lane, ticket)
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+                if delay:
+                    self._queues[lane].remove(ticket)
+                    self._notify()
+
+        with self._condition:
+            self._record(lane, time.monotonic() - started)
+            self._notify()
+
+    def update(self, status, headers=None):
+        # called with every response; returns whether the request should be sent again
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+
+            if status not in THROTTLED:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                return False
+
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+            retry_after = _retry_after(headers.get('Retry-After') if headers else None)
+
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+            self._notify()
+
+            return True
+
+    def retry(self, attempt):
+        if attempt >= self.max_retries:
+            return False
+
+        with self._condition:
+            self.retries += 1
+
+        return True
+
+    def stats(self):
+        with self._condition:
+            self._refill(time.monotonic())
+
+            return {
+                'rate': self.rate,
+                'tokens': self._tokens,
+                'paused': max(0.0, self._paused_until - time.monotonic()),
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'lanes': {name: {
+                    'waiting': len(self._queues[name]),
+                    'acquired': self._stats[name].acquired,
+                    'wait_total': self._stats[name].wait_total,
+                    'wait_max': self._stats[name].wait_max,
+                    'wait_mean': self._stats[name].wait_total / self._stats[name].acquired if self._stats[name].acquired else 0.0,
+                } for name in self.lanes},
+            }
+
+    def queue_depth(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _lane(self, lane):
+        if lane is None:
+            lane = _lane.get()
+
+        if lane is None or lane not in self._queues:
+            return self.lanes[0]
+
+        return lane
+
+    def _take(self, lane, ticket):
+        # 0 when a token was taken, seconds to wait for one, or True to wait for someone else to go first
+        for name in self.lanes:
+            if name == lane:
+                break
+
+            if self._queues[name]:
+                return True
+
+        if self._queues[lane][0] is not ticket:
+            return True
+
+        now = time.monotonic()
+
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        self._refill(now)
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self._queues[lane].popleft()
+            return 0
+
+        return (1 - self._tokens) / self.rate
+
+    def _notify(self):
+        # wakes every waiter to check whether it's its turn; called with the condition held
+        self._condition.notify_all()
+
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record(self, lane, waited):
+        stats = self._stats[lane]
+        stats.acquired += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+
+def _retry_after(value):
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,295 @@
+import array
+import collections
+import concurrent.futures
+import itertools
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import pwned.brackets
+import pwned.support
+
+DEFAULT_RATING = 1500
+
+# simulated tournaments per task; every batch has its own seed, so a seeded run gives the same result however many
+# processes it's spread over
+BATCH_SIZE = 20000
+
+def win_probability(rating, rating_opponent, scale=400):
+    # Elo: the chance that a team rated rating beats a team rated rating_opponent
+    return 1 / (1 + 10 ** ((rating_opponent - rating) / scale))
+
+# the rest of an elimination tournament, played out many times over. each signup's strength is an Elo rating (a
+# mapping of signup id to rating; DEFAULT_RATING for those left out), and every match that isn't decided yet is won
+# with the chance win_probability() gives. decided matches and the teams already placed in later rounds stay as they
+# are, so the odds follow the tournament as results come in. rounds are laid out the way the API lays out the
+# template (see pwned.brackets.Bracket.schedule), with a stage per bracket round played in a round.
+#
+# a batch of simulated tournaments is played match by match, in bracket order, with a column holding every
+# tournament's winner and loser of each match: numpy arrays when numpy is installed, lists otherwise. batches run in
+# a process pool.
+class TournamentSimulation:
+    def __init__(self, template, rounds, ratings=None, scale=400, default_rating=DEFAULT_RATING):
+        self.bracket = pwned.brackets.from_template(template)
+        self.rounds = rounds
+        self.ratings = {pwned.support.signup_key(signup_id): rating for signup_id, rating in (ratings or {}).items()}
+        self.scale = scale
+        self.default_rating = default_rating
+
+        if [[len(stage.matches or []) for stage in round.stages or []] for round in rounds] != [[self.bracket.rounds[round_index][1] for round_index in round_indexes] for name, round_indexes in self.bracket.schedule]:
+            raise ValueError('The rounds are not laid out like a ' + self.bracket.template + ' bracket')
+
+        self._positions = {match.id: (round_index, match_index) for round_index in range(len(self.bracket)) for match_index, match in enumerate(self._matches(round_index))}
+
+    @classmethod
+    def from_tournament(cls, tournament, ratings=None, client=None, **kwargs):
+        # a started tournament's bracket as it is now
+        client = tournament._get_client(client)
+
+        return cls(tournament.template, client.get_rounds('tournament', tournament.id), ratings, **kwargs)
+
+    def apply_match(self, match):
+        # takes in a match as it is after update_match (or from get_match), without fetching the rounds again. the
+        # teams a decided match sends on come from the bracket, so the next rounds don't need to be up to date
+        round_index, match_index = self._positions[match.id]
+        self._matches(round_index)[match_index] = match
+
+    def run(self, iterations=100000, seed=None, workers=None, executor=None, backend=None, batch_size=BATCH_SIZE):
+        # plays the tournament out iterations times and returns a SimulationResult. workers is the number of
+        # processes (as many as there are cores by default, and 1 runs everything in this process); an executor that's
+        # kept around saves starting the processes for every run. backend is 'numpy' or 'python'
+        if backend is None:
+            backend = 'numpy' if numpy is not None else 'python'
+
+        if backend not in ('numpy', 'python'):
+            raise ValueError('Unknown backend: ' + str(backend))
+
+        if backend == 'numpy' and numpy is None:
+            raise ImportError('numpy is not installed')
+
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+
+        signups, plan = self._plan()
+        sizes = [min(batch_size, iterations - start) for start in range(0, iterations, batch_size)]
+        arguments = (itertools.repeat(plan), sizes, [(seed, index) for index in range(len(sizes))], itertools.repeat(backend))
+
+        if executor is not None:
+            batches = list(executor.map(_simulate, *arguments))
+        elif workers == 1 or len(sizes) < 2:
+            batches = list(map(_simulate, *arguments))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+                batches = list(pool.map(_simulate, *arguments))
+
+        counts = [array.array('q', [0]) * len(signups) for round in self.bracket.rounds]
+        champions = array.array('q', [0]) * len(signups)
+
+        for batch_counts, batch_champions in batches:
+            for total, values in zip(counts + [champions], batch_counts + [batch_champions]):
+                for index, value in enumerate(values):
+                    total[index] += value
+
+        return SimulationResult(self.bracket, signups, counts, champions, iterations, seed)
+
+    def _plan(self):
+        # the bracket as plain tuples for the worker processes: signups are numbered, and len(signups) stands for a
+        # bye. every side of a match is either a signup's number or (position in the plan, 0 for the winner or 1
+        # for the loser) of an earlier match that isn't decided. losers are only kept track of where they play on
+        signups = []
+        numbers = {}
+
+        for round in self.rounds:
+            for match in (match for stage in round.stages for match in stage.matches):
+                for signup in (match.signup, match.signup_opponent):
+                    if signup is not None and pwned.support.signup_key(signup.id) not in numbers:
+                        numbers[pwned.support.signup_key(signup.id)] = len(signups)
+                        signups.append(signup)
+
+        bye = len(signups)
+        sources = self.bracket.sources()
+        outcomes = {}
+        matches = []
+
+        for round_index, match_index in self.bracket.matches():
+            match = self._matches(round_index)[match_index]
+            sides = []
+
+            for side, signup in enumerate((match.signup, match.signup_opponent)):
+                if signup is not None:
+                    sides.append(numbers[pwned.support.signup_key(signup.id)])
+                elif (round_index, match_index, side) in sources:
+                    outcome, earlier = sources[(round_index, match_index, side)]
+                    sides.append(outcomes[earlier][0 if outcome == 'winner' else 1])
+                else:
+                    sides.append(bye)
+
+            left, right = sides
+            known = isinstance(left, int) and isinstance(right, int)
+
+            if known and bye in sides:
+                outcome = (left if left != bye else right, bye)
+            elif known and match.score is not None and match.score_opponent is not None and float(match.score) != float(match.score_opponent):
+                outcome = (left, right) if float(match.score) > float(match.score_opponent) else (right, left)
+            else:
+                outcome = None
+
+            if outcome is None:
+                outcomes[(round_index, match_index)] = ((len(matches), 0), (len(matches), 1))
+            else:
+                outcomes[(round_index, match_index)] = outcome
+
+            matches.append((round_index, left, right, outcome is not None, (round_index, match_index) in self.bracket.losers))
+
+        ratings = [self.ratings.get(pwned.support.signup_key(signup.id), self.default_rating) for signup in signups]
+        probabilities = [[win_probability(rating, rating_opponent, self.scale) for rating_opponent in ratings] + [1.0] for rating in ratings]
+        probabilities.append([0.0] * bye + [1.0])
+
+        return signups, (tuple(matches), outcomes[self.bracket.final][0], probabilities, bye, len(self.bracket))
+
+    def _matches(self, round_index):
+        # the matches of a round of the bracket
+        api_round_index, stage_index = self.bracket.layout[round_index]
+
+        return self.rounds[api_round_index].stages[stage_index].matches
+
+def _simulate(plan, size, seed, backend):
+    # one batch: how many times each signup reached each round and won, as array('q') per round and for the winners
+    if backend == 'numpy':
+        return _simulate_numpy(plan, size, seed)
+
+    return _simulate_python(plan, size, seed)
+
+def _simulate_numpy(plan, size, seed):
+    matches, champion, probabilities, bye, round_count = plan
+    generator = numpy.random.default_rng(list(seed))
+    probabilities = numpy.array(probabilities)
+    counts = numpy.zeros((round_count, bye + 1), dtype=numpy.int64)
+    outcomes = []
+
+    def column(side):
+        if isinstance(side, int):
+            return side
+
+        return outcomes[side[0]][side[1]]
+
+    for round_index, left, right, decided, loser_plays_on in matches:
+        left, right = column(left), column(right)
+
+        for side in (left, right):
+            if isinstance(side, int):
+                counts[round_index, side] += size
+            else:
+                counts[round_index] += numpy.bincount(side, minlength=bye + 1)
+
+        if decided:
+            outcomes.append(None)
+            continue
+
+        won = generator.random(size) < probabilities[left, right]
+        outcomes.append((numpy.where(won, left, right), numpy.where(won, right, left) if loser_plays_on else None))
+
+    winners = numpy.zeros(bye + 1, dtype=numpy.int64)
+    champion = column(champion)
+
+    if isinstance(champion, int):
+        winners[champion] = size
+    else:
+        winners += numpy.bincount(champion, minlength=bye + 1)
+
+    return [array.array('q', row[:bye].tolist()) for row in counts], array.array('q', winners[:bye].tolist())
+
+def _simulate_python(plan, size, seed):
+    matches, champion, probabilities, bye, round_count = plan
+    chance = random.Random('{}/{}'.format(*seed)).random
+    counts = [[0] * (bye + 1) for round_index in range(round_count)]
+    outcomes = []
+
+    def column(side):
+        if isinstance(side, int):
+            return side
+
+        return outcomes[side[0]][side[1]]
+
+    def count(totals, side):
+        if isinstance(side, int):
+            totals[side] += size
+        else:
+            for number, times in collections.Counter(side).items():
+                totals[number] += times
+
+    for round_index, left, right, decided, loser_plays_on in matches:
+        left, right = column(left), column(right)
+        count(counts[round_index], left)
+        count(counts[round_index], right)
+
+        if decided:
+            outcomes.append(None)
+            continue
+
+        if isinstance(left, int) and isinstance(right, int):
+            probability = probabilities[left][right]
+            winners = [left if chance() < probability else right for i in range(size)]
+            left, right = [left] * size, [right] * size
+        else:
+            if isinstance(left, int):
+                left = [left] * size
+
+            if isinstance(right, int):
+                right = [right] * size
+
+            winners = [a if chance() < probabilities[a][b] else b for a, b in zip(left, right)]
+
+        outcomes.append((winners, [a + b - winner for a, b, winner in zip(left, right, winners)] if loser_plays_on else None))
+
+    winners = [0] * (bye + 1)
+    count(winners, column(champion))
+
+    return [array.array('q', round_counts[:bye]) for round_counts in counts], array.array('q', winners[:bye])
+
+# what came out of a TournamentSimulation: for every signup in the bracket, how often it reached each round and how
+# often it won. rounds are the bracket's (Bracket.rounds), numbered from 1; for single elimination, that's the same as
+# Round.round_number
+class SimulationResult:
+    def __init__(self, bracket, signups, counts, champions, iterations, seed):
+        self.bracket = bracket
+        self.signups = signups
+        self.counts = counts
+        self.champions = champions
+        self.iterations = iterations
+        self.seed = seed
+
+        self._numbers = {pwned.support.signup_key(signup.id): number for number, signup in enumerate(signups)}
+
+    def probability(self, signup_id, round_number):
+        # the chance that the signup plays in the round; 0 for signups that aren't in the bracket. ids match whether
+        # they're given as numbers or as strings
+        number = self._numbers.get(pwned.support.signup_key(signup_id))
+
+        if number is None:
+            return 0.0
+
+        return self.counts[round_number - 1][number] / self.iterations
+
+    def win_probability(self, signup_id):
+        number = self._numbers.get(pwned.support.signup_key(signup_id))
+
+        if number is None:
+            return 0.0
+
+        return self.champions[number] / self.iterations
+
+    def probabilities(self):
+        # signup id: the chance of reaching every round, in round order
+        return {signup.id: [round_counts[number] / self.iterations for round_counts in self.counts] for number, signup in enumerate(self.signups)}
+
+    def table(self):
+        # (signup, chances of reaching every round, chance of winning) per signup, most likely winner first
+        probabilities = self.probabilities()
+        rows = [(signup, probabilities[signup.id], self.champions[number] / self.iterations) for number, signup in enumerate(self.signups)]
+        rows.sort(key=lambda row: -row[2])
+
+        return rows
@@ -0,0 +1,352 @@
+import collections
+import json
+import sqlite3
+import threading
+
+import pwned.competitions
+import pwned.support
+
+# a match found by SnapshotStore.find_matches, with the competition and round it was played in
+StoredMatch = collections.namedtuple('StoredMatch', ('type', 'competition_id', 'round_number', 'match'))
+
+SCHEMA = '''
+create table if not exists competitions (
+    type text not null,
+    id integer not null,
+    name text,
+    game_id integer,
+    last_activity_at text,
+    round_current integer,
+    signup_count integer,
+    data text not null,
+    primary key (type, id)
+);
+
+create table if not exists signups (
+    type text not null,
+    competition_id integer not null,
+    id integer not null,
+    name text,
+    remote_id text,
+    clan_id integer,
+    data text not null,
+    primary key (type, competition_id, id)
+);
+
+create index if not exists signups_id on signups (id);
+create index if not exists signups_remote_id on signups (remote_id);
+create index if not exists signups_clan_id on signups (clan_id);
+
+create table if not exists rounds (
+    type text not null,
+    competition_id integer not null,
+    round_number integer not null,
+    data text not null,
+    primary key (type, competition_id, round_number)
+);
+
+create table if not exists stages (
+    type text not null,
+    competition_id integer not null,
+    round_number integer not null,
+    stage_index integer not null,
+    data text not null,
+    primary key (type, competition_id, round_number, stage_index)
+);
+
+create table if not exists matches (
+    type text not null,
+    competition_id integer not null,
+    id integer not null,
+    round_number integer,
+    stage_index integer,
+    match_index integer,
+    signup_id integer,
+    signup_opponent_id integer,
+    score real,
+    score_opponent real,
+    time text,
+    data text not null,
+    primary key (type, competition_id, id)
+);
+
+create index if not exists matches_id on matches (id);
+create index if not exists matches_signup_id on matches (signup_id, type, competition_id);
+create index if not exists matches_signup_opponent_id on matches (signup_opponent_id, type, competition_id);
+create index if not exists matches_time on matches (time);
+create index if not exists matches_round on matches (type, competition_id, round_number, stage_index, match_index);
+
+create table if not exists table_positions (
+    league_id integer not null,
+    signup_id integer not null,
+    position integer,
+    data text not null,
+    primary key (league_id, signup_id)
+);
+'''
+
+COMPETITION_CLASSES = {'tournament': pwned.competitions.Tournament, 'league': pwned.competitions.League}
+
+def _dumps(data):
+    return json.dumps(data, default=str)
+
+def _signup_id(signup):
+    return signup.get('id') if signup else None
+
+# a local copy of competitions, signups, rounds, matches and league tables in SQLite, for questions that would take
+# many API calls to answer. objects are stored as their API representation and decoded with the model classes when
+# they're loaded; the columns next to it are there to be queried and indexed. writes are batched in one transaction.
+class SnapshotStore:
+    def __init__(self, path=':memory:', identities=None):
+        self.path = path
+        self.identities = identities
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def snapshot(self, competition, client=None):
+        # fetches a competition with its signups, rounds and (for leagues) table, and stores them together
+        client = competition._get_client(client)
+        type = competition._get_type()
+        competition = client.get(type, competition.id)
+        signups = client.get_signups(type, competition.id) or []
+        rounds = client.get_rounds(type, competition.id) or []
+        table = client.get_league_table(competition.id) if type == 'league' else None
+
+        with self._lock, self._connection:
+            self._save_competitions([competition])
+            self._save_signups(type, competition.id, signups, replace=True)
+            self._save_rounds(type, competition.id, rounds)
+
+            if table is not None:
+                self._save_table(competition.id, table)
+
+        return competition
+
+    def save_competitions(self, competitions):
+        with self._lock, self._connection:
+            self._save_competitions(competitions)
+
+    def save_signups(self, type, competition_id, signups, replace=False):
+        # replace removes the competition's signups that aren't in signups
+        with self._lock, self._connection:
+            self._save_signups(type, competition_id, signups, replace)
+
+    def save_rounds(self, type, competition_id, rounds):
+        # replaces the stored rounds with the same round numbers, stages and matches included
+        with self._lock, self._connection:
+            self._save_rounds(type, competition_id, rounds)
+
+    def save_matches(self, type, competition_id, matches):
+        # updates single matches, e.g. after update_match; where they were played in is kept from the stored round
+        rows = [self._match_row(type, competition_id, None, None, None, match) for match in matches]
+
+        with self._lock, self._connection:
+            self._connection.executemany('''
+                insert into matches values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                on conflict (type, competition_id, id) do update set
+                    signup_id = excluded.signup_id, signup_opponent_id = excluded.signup_opponent_id, score = excluded.score,
+                    score_opponent = excluded.score_opponent, time = excluded.time, data = excluded.data
+            ''', rows)
+
+    def save_table(self, league_id, table):
+        with self._lock, self._connection:
+            self._save_table(league_id, table)
+
+    def load_competition(self, type, id, client=None):
+        row = self._query_one('select data from competitions where type = ? and id = ?', (type, id))
+
+        if row is not None:
+            return COMPETITION_CLASSES[type].from_api_call(json.loads(row[0]), client=client)
+
+    def load_competitions(self, type=None, client=None):
+        query = 'select type, data from competitions' + (' where type = ?' if type else '') + ' order by type, id'
+
+        return [COMPETITION_CLASSES[row[0]].from_api_call(json.loads(row[1]), client=client) for row in self._query(query, (type, ) if type else ())]
+
+    def load_signups(self, type, competition_id):
+        rows = self._query('select data from signups where type = ? and competition_id = ? order by rowid', (type, competition_id))
+
+        return [self._decode(pwned.support.Signup, row[0]) for row in rows]
+
+    def load_rounds(self, type, competition_id):
+        key = (type, competition_id)
+        rounds = self._query('select round_number, data from rounds where type = ? and competition_id = ? order by round_number', key)
+        stages = self._query('select round_number, stage_index, data from stages where type = ? and competition_id = ? order by round_number, stage_index', key)
+        matches = self._query('select round_number, stage_index, data from matches where type = ? and competition_id = ? and round_number is not null order by round_number, stage_index, match_index', key)
+
+        # reassembled into what get_rounds decodes, and decoded the same way
+        stage_data = collections.defaultdict(list)
+        match_data = collections.defaultdict(list)
+
+        for round_number, stage_index, data in matches:
+            match_data[(round_number, stage_index)].append(json.loads(data))
+
+        for round_number, stage_index, data in stages:
+            stage = json.loads(data)
+            stage['matches'] = match_data[(round_number, stage_index)]
+            stage_data[round_number].append(stage)
+
+        result = []
+
+        for round_number, data in rounds:
+            round = json.loads(data)
+            round['stages'] = stage_data[round_number]
+            result.append(pwned.support.Round.from_api_call(round, identities=self.identities))
+
+        return result
+
+    def load_table(self, league_id):
+        rows = self._query('select data from table_positions where league_id = ? order by position', (league_id, ))
+
+        return [self._decode(pwned.support.LeagueTablePosition, row[0]) for row in rows]
+
+    def find_signups(self, remote_id=None, clan_id=None, id=None):
+        # (type, competition id, Signup) for every competition the signup took part in
+        conditions, parameters = self._signup_conditions('', remote_id, clan_id, id)
+        rows = self._query('select type, competition_id, data from signups' + conditions + ' order by type, competition_id', parameters)
+
+        return [(row[0], row[1], self._decode(pwned.support.Signup, row[2])) for row in rows]
+
+    def find_matches(self, remote_id=None, clan_id=None, signup_id=None, since=None, until=None, type=None, competition_id=None):
+        # matches involving a signup, by its remote id, clan id or signup id, optionally within a time range
+        # (inclusive, compared as the API's 'YYYY-MM-DD HH:MM:SS' strings) and competition; ordered by time
+        conditions = []
+        parameters = []
+
+        if remote_id is not None or clan_id is not None:
+            # the signups first, through their index, then their matches through the signup id indexes
+            signup_conditions, signup_parameters = self._signup_conditions('s.', remote_id, clan_id, None)
+            signups = 'select s.type, s.competition_id, s.id from signups s' + signup_conditions
+            conditions.append('((m.type, m.competition_id, m.signup_id) in (' + signups + ') or (m.type, m.competition_id, m.signup_opponent_id) in (' + signups + '))')
+            parameters.extend(signup_parameters * 2)
+
+        if signup_id is not None:
+            conditions.append('(m.signup_id = ? or m.signup_opponent_id = ?)')
+            parameters.extend((signup_id, signup_id))
+
+        for condition, value in (('m.time >= ?', since), ('m.time <= ?', until), ('m.type = ?', type), ('m.competition_id = ?', competition_id)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+
+        query = 'select m.type, m.competition_id, m.round_number, m.data from matches m'
+
+        if conditions:
+            query += ' where ' + ' and '.join(conditions)
+
+        rows = self._query(query + ' order by m.time, m.type, m.competition_id, m.id', parameters)
+
+        return [StoredMatch(row[0], row[1], row[2], self._decode(pwned.support.Match, row[3])) for row in rows]
+
+    def _signup_conditions(self, prefix, remote_id, clan_id, id):
+        conditions = []
+        parameters = []
+
+        for column, value in (('remote_id', None if remote_id is None else str(remote_id)), ('clan_id', clan_id), ('id', id)):
+            if value is not None:
+                conditions.append(prefix + column + ' = ?')
+                parameters.append(value)
+
+        return (' where ' + ' and '.join(conditions)) if conditions else '', parameters
+
+    def _decode(self, cls, data):
+        return cls.from_api_call(json.loads(data), identities=self.identities)
+
+    def _query(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def _query_one(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchone()
+
+    def _save_competitions(self, competitions):
+        rows = []
+
+        for competition in competitions:
+            data = competition.get_api_dict()
+
+            if getattr(competition, 'game', None) is not None:
+                data['game'] = competition.game.get_api_dict()
+
+            if getattr(competition, 'scoring_model', None) is not None:
+                data['scoringModel'] = competition.scoring_model.get_api_dict()
+
+            rows.append((competition._get_type(), competition.id, data.get('name'), data.get('gameId'), data.get('lastActivityAt'),
+                         data.get('roundCurrent'), data.get('signupCount'), _dumps(data)))
+
+        self._connection.executemany('''
+            insert into competitions values (?, ?, ?, ?, ?, ?, ?, ?)
+            on conflict (type, id) do update set
+                name = excluded.name, game_id = excluded.game_id, last_activity_at = excluded.last_activity_at,
+                round_current = excluded.round_current, signup_count = excluded.signup_count, data = excluded.data
+        ''', rows)
+
+    def _save_signups(self, type, competition_id, signups, replace):
+        rows = []
+
+        for signup in signups:
+            data = signup.get_api_dict()
+            remote_id = data.get('remoteId')
+            rows.append((type, competition_id, signup.id, data.get('name'), None if remote_id is None else str(remote_id), data.get('clanId'), _dumps(data)))
+
+        if replace:
+            self._connection.execute('delete from signups where type = ? and competition_id = ?', (type, competition_id))
+
+        self._connection.executemany('''
+            insert into signups values (?, ?, ?, ?, ?, ?, ?)
+            on conflict (type, competition_id, id) do update set
+                name = excluded.name, remote_id = excluded.remote_id, clan_id = excluded.clan_id, data = excluded.data
+        ''', rows)
+
+    def _save_rounds(self, type, competition_id, rounds):
+        round_rows = []
+        stage_rows = []
+        match_rows = []
+
+        for round in rounds:
+            data = round.get_api_dict()
+            data.pop('stages', None)
+            round_rows.append((type, competition_id, round.round_number, _dumps(data)))
+
+            for stage_index, stage in enumerate(round.stages or []):
+                data = stage.get_api_dict()
+                data.pop('matches', None)
+                stage_rows.append((type, competition_id, round.round_number, stage_index, _dumps(data)))
+
+                for match_index, match in enumerate(stage.matches or []):
+                    match_rows.append(self._match_row(type, competition_id, round.round_number, stage_index, match_index, match))
+
+        for table in ('rounds', 'stages', 'matches'):
+            self._connection.executemany('delete from ' + table + ' where type = ? and competition_id = ? and round_number = ?',
+                                         [(type, competition_id, row[2]) for row in round_rows])
+
+        self._connection.executemany('insert into rounds values (?, ?, ?, ?)', round_rows)
+        self._connection.executemany('insert into stages values (?, ?, ?, ?, ?)', stage_rows)
+        self._connection.executemany('insert or replace into matches values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', match_rows)
+
+    def _match_row(self, type, competition_id, round_number, stage_index, match_index, match):
+        data = match.get_api_dict()
+
+        return (type, competition_id, match.id, round_number, stage_index, match_index, _signup_id(data.get('signup')),
+                _signup_id(data.get('signupOpponent')), data.get('score'), data.get('scoreOpponent'), data.get('time'), _dumps(data))
+
+    def _save_table(self, league_id, table):
+        rows = [(league_id, position.signup.id, position.position, _dumps(position.get_api_dict())) for position in table]
+
+        self._connection.execute('delete from table_positions where league_id = ?', (league_id, ))
+        self._connection.executemany('insert into table_positions values (?, ?, ?, ?)', rows)
@@ -0,0 +1,244 @@
+import inspect
+import threading
+
+import pwned.support
+
+# the fields compared against the API's table, in the order differences are reported
+TABLE_FIELDS = ('position', 'wins', 'draws', 'losses', 'points', 'score', 'score_for', 'score_against')
+
+def _signup_key(signup):
+    return pwned.support.signup_key(signup.id) if signup is not None else None
+
+def _is_async(client):
+    return inspect.iscoroutinefunction(client.get_league_table)
+
+def get_scoring_model(league, client):
+    # the league's scoring model as it is now; the copy embedded in the league is as old as the league object
+    scoring_model_id = getattr(league, 'scoring_model_id', None)
+
+    if scoring_model_id is not None:
+        return client.get_league_scoring_model(scoring_model_id)
+
+    return _embedded_scoring_model(league)
+
+async def get_scoring_model_async(league, client):
+    scoring_model_id = getattr(league, 'scoring_model_id', None)
+
+    if scoring_model_id is not None:
+        return await client.get_league_scoring_model(scoring_model_id)
+
+    return _embedded_scoring_model(league)
+
+def _embedded_scoring_model(league):
+    scoring_model = getattr(league, 'scoring_model', None)
+
+    if scoring_model is None:
+        raise ValueError('League ' + str(league.id) + ' has neither a scoring model nor a scoring model id')
+
+    return scoring_model
+
+# a league table kept up to date locally, from the same rules the API scores a league with: win, draw and loss points
+# per match for regular leagues, position points per round for championships, and bonus points (see
+# pwned.support.bonus_points) on top. signups are told apart by signup_key, so string and int ids match. applying a changed match takes back what that match counted for before and counts it again,
+# so an update costs the same however many matches the league has; positions are sorted out when the table is read.
+class LeagueStandings:
+    def __init__(self, scoring_model, signups=()):
+        self.scoring_model = scoring_model
+
+        self._rows = {}
+        self._matches = {}
+        self._results = {}
+        self._sorted = None
+        self._lock = threading.Lock()
+
+        for signup in signups:
+            self.add_signup(signup)
+
+        for signup_id, points in pwned.support.bonus_points(scoring_model).items():
+            row = self._rows.get(signup_id)
+
+            if row is not None:
+                row.points += points
+
+    @classmethod
+    def from_league(cls, league, client=None):
+        # everything the table is built from: the scoring model, the signups, and every round's matches. the API has
+        # no way to read back championship round results, so for championships the table starts out as the API's
+        # own, and only rounds set afterwards (apply_round_results) are tracked. with an AsyncPwned client, this
+        # returns a coroutine
+        client = league._get_client(client)
+
+        if _is_async(client):
+            return cls._from_league_async(league, client)
+
+        standings = cls(get_scoring_model(league, client), client.get_signups('league', league.id))
+
+        if league.league_type == 'championship':
+            standings._start_from(client.get_league_table(league.id))
+        else:
+            standings._apply_rounds(client.get_rounds('league', league.id))
+
+        return standings
+
+    @classmethod
+    async def _from_league_async(cls, league, client):
+        standings = cls(await get_scoring_model_async(league, client), await client.get_signups('league', league.id))
+
+        if league.league_type == 'championship':
+            standings._start_from(await client.get_league_table(league.id))
+        else:
+            standings._apply_rounds(await client.get_rounds('league', league.id))
+
+        return standings
+
+    def add_signup(self, signup):
+        with self._lock:
+            if _signup_key(signup) not in self._rows:
+                self._rows[_signup_key(signup)] = pwned.support.LeagueTablePosition(
+                    signup=signup, position=None, wins=0, draws=0, losses=0, points=0, score=0, score_for=0, score_against=0)
+                self._sorted = None
+
+    def apply_match(self, match):
+        # counts a new or changed match, replacing whatever the same match counted for before
+        contribution = self._match_contribution(match)
+
+        with self._lock:
+            self._apply(self._matches.pop(str(match.id), None), -1)
+            self._apply(contribution, 1)
+
+            if contribution is not None:
+                self._matches[str(match.id)] = contribution
+
+            self._sorted = None
+
+    def apply_matches(self, matches):
+        for match in matches:
+            self.apply_match(match)
+
+    def remove_match(self, match_id):
+        with self._lock:
+            self._apply(self._matches.pop(str(match_id), None), -1)
+            self._sorted = None
+
+    def apply_round_results(self, round_number, results):
+        # championship results for a round (LeagueChampionshipRoundResultEntry), replacing earlier results of that round
+        position_points = {int(position): pwned.support.number(points) for position, points in (self.scoring_model.points_position or {}).items()}
+        contribution = []
+
+        for result in results:
+            points = position_points.get(int(result.position), 0) if result.position is not None else 0
+            contribution.append((_signup_key(result.signup), points, pwned.support.number(result.score or 0)))
+
+        with self._lock:
+            for signup_id, points, score in self._results.pop(round_number, ()):
+                self._add_result(signup_id, -points, -score)
+
+            for signup_id, points, score in contribution:
+                self._add_result(signup_id, points, score)
+
+            self._results[round_number] = contribution
+            self._sorted = None
+
+    def table(self):
+        # LeagueTablePosition rows in table order, the same way the API orders them: points, then score difference,
+        # then score for, then signup order
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._rows.values(), key=lambda row: (-row.points, -row.score, -row.score_for))
+
+                for position, row in enumerate(self._sorted, 1):
+                    row.position = position
+
+            return list(self._sorted)
+
+    def position(self, signup_id):
+        for row in self.table():
+            if _signup_key(row.signup) == pwned.support.signup_key(signup_id):
+                return row
+
+        return None
+
+    def compare(self, server_table):
+        # differences to a table from League.get_table, as (signup id, field, local value, server value)
+        local = {_signup_key(row.signup): row for row in self.table()}
+        remote = {_signup_key(row.signup): row for row in server_table}
+        differences = []
+
+        for key in list(local) + [key for key in remote if key not in local]:
+            signup_id = (local.get(key) or remote[key]).signup.id
+
+            for field in TABLE_FIELDS:
+                local_value = getattr(local[key], field) if key in local else None
+                remote_value = getattr(remote[key], field) if key in remote else None
+
+                if local_value != remote_value:
+                    differences.append((signup_id, field, local_value, remote_value))
+
+        return differences
+
+    def verify(self, league, client=None):
+        # fetches the API's table and compares; an empty list means the local table is right. with an AsyncPwned
+        # client, this returns a coroutine
+        client = league._get_client(client)
+
+        if _is_async(client):
+            return self._verify_async(league, client)
+
+        return self.compare(league.get_table(client))
+
+    async def _verify_async(self, league, client):
+        return self.compare(await league.get_table(client))
+
+    def _apply_rounds(self, rounds):
+        for round in rounds:
+            for stage in round.stages:
+                self.apply_matches(stage.matches)
+
+    def _start_from(self, server_table):
+        for server_row in server_table:
+            self.add_signup(server_row.signup)
+            row = self._rows[_signup_key(server_row.signup)]
+
+            for field in ('wins', 'draws', 'losses', 'points', 'score', 'score_for', 'score_against'):
+                setattr(row, field, getattr(server_row, field))
+
+    def _match_contribution(self, match):
+        # matches count once both sides are known and both scores are in
+        if match.signup is None or match.signup_opponent is None or match.score is None or match.score_opponent is None:
+            return None
+
+        return (_signup_key(match.signup), _signup_key(match.signup_opponent), float(match.score), float(match.score_opponent))
+
+    def _apply(self, contribution, sign):
+        if contribution is None:
+            return
+
+        signup_id, opponent_id, score, score_opponent = contribution
+
+        for signup_id, score, score_opponent in ((signup_id, score, score_opponent), (opponent_id, score_opponent, score)):
+            row = self._rows.get(signup_id)
+
+            if row is None:
+                continue
+
+            if score > score_opponent:
+                row.wins += sign
+                row.points += sign * pwned.support.number(self.scoring_model.points_win or 0)
+            elif score == score_opponent:
+                row.draws += sign
+                row.points += sign * pwned.support.number(self.scoring_model.points_draw or 0)
+            else:
+                row.losses += sign
+                row.points += sign * pwned.support.number(self.scoring_model.points_loss or 0)
+
+            row.score_for = pwned.support.number(row.score_for + sign * score)
+            row.score_against = pwned.support.number(row.score_against + sign * score_opponent)
+            row.score = pwned.support.number(row.score_for - row.score_against)
+
+    def _add_result(self, signup_id, points, score):
+        row = self._rows.get(signup_id)
+
+        if row is not None:
+            row.points += points
+            row.score = pwned.support.number(row.score + score)
+            row.score_for = pwned.support.number(row.score_for + score)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+class StoredResponse:
+    def __init__(self, key, filename, size, etag=None, last_modified=None, last_used=None):
+        self.key = key
+        self.filename = filename
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.last_used = last_used or time.time()
+
+    def read(self):
+        with open(self.filename, 'rb') as f:
+            f.readline()
+            return f.read()
+
+class ResponseStore:
+    def __init__(self, path, max_size=64 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+
+            return entry
+
+    def hit(self, entry):
+        with self._lock:
+            self.hits += 1
+            entry.last_used = time.time()
+
+        try:
+            os.utime(entry.filename, (entry.last_used, entry.last_used))
+        except OSError:
+            pass
+
+    def put(self, key, body, etag=None, last_modified=None):
+        if not etag and not last_modified:
+            return None
+
+        filename = os.path.join(self.path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.response')
+        header = json.dumps({'key': key, 'etag': etag, 'lastModified': last_modified}).encode('utf-8')
+
+        if self.max_size is not None and len(header) + len(body) + 1 > self.max_size:
+            return None
+
+        fd, temporary = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header + b'\n')
+            f.write(body)
+
+        os.replace(temporary, filename)
+
+        entry = StoredResponse(key, filename, len(header) + len(body) + 1, etag, last_modified)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+
+            if previous:
+                self.size -= previous.size
+
+            self._entries[key] = entry
+            self.size += entry.size
+            self._evict()
+
+        return entry
+
+    def remove(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry:
+                self.size -= entry.size
+                self._unlink(entry)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                self._unlink(entry)
+
+            self._entries = {}
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'size': self.size,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        if self.max_size is None or self.size <= self.max_size:
+            return
+
+        for entry in sorted(self._entries.values(), key=lambda entry: entry.last_used):
+            if self.size <= self.max_size:
+                break
+
+            del self._entries[entry.key]
+            self.size -= entry.size
+            self._unlink(entry)
+
+    def _unlink(self, entry):
+        try:
+            os.remove(entry.filename)
+        except OSError:
+            pass
+
+    def _load(self):
+        for name in os.listdir(self.path):
+            filename = os.path.join(self.path, name)
+
+            if not name.endswith('.response'):
+                continue
+
+            try:
+                with open(filename, 'rb') as f:
+                    header = json.loads(f.readline().decode('utf-8'))
+
+                stat = os.stat(filename)
+            except (OSError, ValueError):
+                self._unlink(StoredResponse(None, filename, 0))
+                continue
+
+            self._entries[header['key']] = StoredResponse(header['key'], filename, stat.st_size, header['etag'], header['lastModified'], stat.st_mtime)
+            self.size += stat.st_size
+
+        self._evict()
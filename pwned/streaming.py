@@ -0,0 +1,179 @@
+import codecs
+import json
+
+# what JsonStream.parse yields when it has run out of data
+NEED_DATA = object()
+
+# walks a JSON document as it's read from a file-like object. items(path) yields the values found at path
+# as soon as each one is complete, e.g. ('*', 'stages', '*', 'matches', '*') for every match in a list of
+# rounds. anything else is decoded and dropped, except top-level keys next to the envelope (kept in .envelope).
+#
+# without a read function, data is pushed instead: parse(path) yields NEED_DATA whenever it needs more, and the caller
+# feed()s it (feed_eof() at the end) while needs_data() before asking for the next value. that's how the async client
+# parses on the event loop as the response arrives.
+class JsonStream:
+    def __init__(self, read=None, chunk_size=64 * 1024):
+        self.read = read
+        self.chunk_size = chunk_size
+        self.envelope = {}
+
+        self._buffer = ''
+        self._position = 0
+        self._wanted = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+
+    def items(self, path, envelope_key='result'):
+        for item in self.parse(path, envelope_key):
+            if item is not NEED_DATA:
+                yield item
+                continue
+
+            while self.needs_data():
+                chunk = self.read(self.chunk_size)
+
+                if chunk:
+                    self.feed(chunk)
+                else:
+                    self.feed_eof()
+
+    def parse(self, path, envelope_key='result'):
+        # responses are either wrapped as {"result": ...} or the value itself
+        if (yield from self._peek()) == '{':
+            for item in self._object(path, envelope_key):
+                yield item
+        else:
+            for item in self._walk(path):
+                yield item
+
+        if (yield from self._peek(required=False)):
+            raise ValueError('Extra data after JSON document')
+
+    def feed(self, chunk):
+        if self._position:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+
+        self._buffer += self._text.decode(chunk)
+
+    def feed_eof(self):
+        self._eof = True
+        self._buffer += self._text.decode(b'', final=True)
+
+    def needs_data(self):
+        return not self._eof and len(self._buffer) - self._position < self._wanted
+
+    def _object(self, path, envelope_key):
+        yield from self._expect('{')
+
+        while (yield from self._peek()) != '}':
+            key = yield from self._value()
+            yield from self._expect(':')
+
+            if key == envelope_key:
+                for item in self._walk(path):
+                    yield item
+            else:
+                self.envelope[key] = yield from self._value()
+
+            if (yield from self._peek()) == ',':
+                yield from self._expect(',')
+
+        yield from self._expect('}')
+
+    def _walk(self, path):
+        if not path:
+            yield (yield from self._value())
+            return
+
+        character = yield from self._peek()
+
+        if path[0] == '*' and character == '[':
+            self._position += 1
+
+            # arrays of items are the hot loop; _skip() saves starting a _peek() while the data is there already
+            while (self._skip() or (yield from self._peek())) != ']':
+                for item in self._walk(path[1:]):
+                    yield item
+
+                if (self._skip() or (yield from self._peek())) == ',':
+                    self._position += 1
+
+            self._position += 1
+        elif path[0] != '*' and character == '{':
+            yield from self._expect('{')
+
+            while (yield from self._peek()) != '}':
+                key = yield from self._value()
+                yield from self._expect(':')
+
+                if key == path[0]:
+                    for item in self._walk(path[1:]):
+                        yield item
+                else:
+                    yield from self._value()
+
+                if (yield from self._peek()) == ',':
+                    yield from self._expect(',')
+
+            yield from self._expect('}')
+        else:
+            # null or some other value where a container was expected -- nothing to yield from it
+            yield from self._value()
+
+    # the helpers below, except _skip, are generators too: they yield NEED_DATA until the data they need has been fed,
+    # and return what they read
+
+    def _value(self):
+        if self._skip() is None:
+            yield from self._peek()
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+
+                # a number at the very end of the buffer might continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+
+            # wait until the pending data has doubled before trying again, so large values are decoded in linear time
+            pending = len(self._buffer) - self._position
+            self._wanted = pending + max(pending, self.chunk_size)
+            yield NEED_DATA
+
+    def _expect(self, character):
+        if (yield from self._peek()) != character:
+            raise ValueError('Expected ' + repr(character) + ' at position ' + str(self._position))
+
+        self._position += 1
+
+    def _skip(self):
+        # skips whitespace; the next character, or None when it hasn't been fed yet (or at the end of the document)
+        while self._position < len(self._buffer) and self._buffer[self._position] in ' \t\r\n':
+            self._position += 1
+
+        if self._position < len(self._buffer):
+            return self._buffer[self._position]
+
+        return None
+
+    def _peek(self, required=True):
+        while True:
+            character = self._skip()
+
+            if character is not None:
+                return character
+
+            if self._eof:
+                if required:
+                    raise ValueError('Unexpected end of JSON document')
+
+                return None
+
+            self._wanted = 1
+            yield NEED_DATA
@@ -1,4 +1,28 @@
-import collections
+import collections.abc
+import os
+import threading
+
+import pwned.profiling
+
+# set PWNED_COMPACT_MODELS=1 before importing pwned to give the model classes __slots__ instead of a
+# per-instance __dict__. attributes outside of _fields (other than client) can't be set on them then.
+COMPACT_MODELS = os.environ.get('PWNED_COMPACT_MODELS', '').lower() not in ('', '0', 'false', 'no')
+
+def model_slots(*fields_tables, extra=(), inherited=()):
+    names = []
+
+    for name in extra:
+        if name not in names and name not in inherited:
+            names.append(name)
+
+    for fields in fields_tables:
+        for spec in fields.values():
+            name = spec if isinstance(spec, str) else spec[0]
+
+            if name not in names and name not in inherited:
+                names.append(name)
+
+    return tuple(names)
 
 class Game:
     _fields = {
@@ -10,9 +34,15 @@ class Game:
         'defaultLeagueType': ('default_league_type', ),
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
+    def get_api_dict(self, *args, **kwargs):
+        return get_api_dict_impl(self, *args, **kwargs)
+
     @classmethod
     def from_api_call(*args, **kwargs):
         return from_api_call_impl(*args, **kwargs)
@@ -31,6 +61,9 @@ class LeagueScoringModel:
         'bonusPoints': ('points_bonus', ),
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
@@ -53,6 +86,12 @@ class Signup:
         'clanId': ('clan_id', ),
         'remoteId': ('remote_id', ),
     }
+
+    # signups are shared by id when decoded through a pwned.identity.IdentityMap
+    _identity = 'id'
+    
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
     
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
@@ -77,6 +116,11 @@ class Match:
         'time': ('time', ),
         'mapName': ('map_name', ),
     }
+
+    _interned = ('time', 'map_name')
+    
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
     
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
@@ -93,6 +137,9 @@ class Group:
     
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
@@ -110,6 +157,11 @@ class RoundStage:
         'time': ('time', ),
         'matches': ('matches', Match),
     }
+
+    _interned = ('map_name', 'description', 'time')
+    
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
     
     def __init__(self, *args, **kwargs):
         self.matches = []
@@ -134,6 +186,11 @@ class Round:
         'stages': ('stages', RoundStage),
         'groups': ('groups', Group),
     }
+
+    _interned = ('description', 'time', 'started_at')
+    
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
     
     def __init__(self, *args, **kwargs):
         self.stages = []
@@ -161,6 +218,9 @@ class LeagueTablePosition:
         'scoreAgainst': ('score_against', ),
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
@@ -178,6 +238,9 @@ class LeagueChampionshipRoundResultEntry:
         'score': ('score', ),
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
@@ -195,6 +258,9 @@ class TournamentTemplate:
         'teams': ('teams', ),
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
@@ -214,6 +280,9 @@ class Country:
         'defaultLanguage': ('default_language', ),
     }
     
+    if COMPACT_MODELS:
+        __slots__ = model_slots(_fields, extra=('client', ))
+    
     def __init__(self, *args, **kwargs):
         object_init_impl(self, *args, **kwargs)
 
@@ -224,7 +293,39 @@ class Country:
     def from_api_call(*args, **kwargs):
         return from_api_call_impl(*args, **kwargs)        
         
+# the API sends most numbers as strings in some responses and as numbers in others: ids, scores and the points of a
+# scoring model embedded in a league among them. code that compares or adds them up goes through these
+def number(value):
+    # whole numbers come back as ints
+    value = float(value)
+
+    if value.is_integer():
+        return int(value)
+
+    return value
+
+def signup_key(signup_id):
+    # signup ids as strings, so ids from different responses match
+    if signup_id is None:
+        return None
+
+    return str(signup_id)
+
+def bonus_points(scoring_model):
+    # a scoring model's bonusPoints as {signup_key(signup id): points}. the API doesn't document its shape; it's taken
+    # to be a JSON object like positionPoints, keyed by signup id instead of position. anything else means no bonus
+    bonus = getattr(scoring_model, 'points_bonus', None)
+
+    if not isinstance(bonus, dict):
+        return {}
+
+    return {signup_key(signup_id): number(points) for signup_id, points in bonus.items() if points not in (None, '') and number(points)}
+
 def get_api_dict_impl(obj, *args):
+    with pwned.profiling.phase('encode'):
+        return _get_api_dict(obj, *args)
+
+def _get_api_dict(obj, *args):
     fields = obj._fields
     
     for el in args:
@@ -237,7 +338,7 @@ def get_api_dict_impl(obj, *args):
             response[f] = getattr(obj, fields[f][0])
             
             if response[f] and (len(fields[f]) > 1):
-                if isinstance(response[f], collections.Sequence):
+                if isinstance(response[f], collections.abc.Sequence):
                     val = []
                     
                     for el in response[f]:
@@ -249,7 +350,14 @@ def get_api_dict_impl(obj, *args):
     
     return response
         
-def from_api_call_impl(cls, data):
+def from_api_call_impl(cls, data, lazy=False, identities=None):
+    with pwned.profiling.phase('hydrate'):
+        if identities is not None:
+            return identities.decode(cls, data)
+
+        return get_decoder(cls, lazy=lazy)(data)
+
+def from_api_call_generic(cls, data):
     arguments = {}
 
     for f in cls._fields:
@@ -262,14 +370,204 @@ def from_api_call_impl(cls, data):
                     arguments[k[f][0]] = []
                     
                     for el in data[f]:
-                        arguments[k[f][0]].append(k[f][1].from_api_call(el))
+                        arguments[k[f][0]].append(from_api_call_generic(k[f][1], el))
                 else:
-                    arguments[k[f][0]] = k[f][1].from_api_call(data[f])
+                    arguments[k[f][0]] = from_api_call_generic(k[f][1], data[f])
             else:
                 arguments[k[f][0]] = data[f]
     
     return cls(**arguments)
 
+_decoders = {}
+
+def get_decoder(cls, fields=None, lazy=False, shared=False):
+    # decoders are compiled once per class, the first time the class is decoded
+    decoder = _decoders.get((cls, lazy, shared))
+
+    if decoder is None:
+        decoder = _decoders[(cls, lazy, shared)] = compile_decoder(cls, fields, lazy, shared)
+
+    return decoder
+
+def compile_decoder(cls, fields=None, lazy=False, shared=False):
+    # generates the same steps as from_api_call_generic as straight-line code for this class. attributes that
+    # __init__ sets without arguments (Round.stages etc.) are set directly instead of calling __init__.
+    #
+    # a lazy decoder keeps the raw value of fields declared with a class in obj._pending instead, and a LazyField
+    # on the class decodes it on first access. slotted (compact) classes can't have both, so they decode eagerly.
+    #
+    # a shared decoder is called as decode(data, identities, obj=None) for a pwned.identity.IdentityMap: nested
+    # classes with an _identity are resolved through the map, _interned strings are deduplicated, and passing obj
+    # updates an existing object in place. shared decoders are always eager.
+    if fields is None:
+        fields = cls._fields
+
+    if shared:
+        lazy = False
+
+    if lazy and hasattr(cls, '__slots__'):
+        return get_decoder(cls, fields)
+
+    namespace = {'cls': cls, 'new': object.__new__, 'sequence_types': (list, tuple), 'missing': object()}
+    lines = []
+    defaults = _instance_state(cls())
+    interned = getattr(cls, '_interned', ()) if shared else ()
+    pending = False
+
+    for attribute in defaults:
+        if not _is_literal(defaults[attribute]):
+            if shared:
+                return lambda data, identities, obj=None: _decode_with_init(cls, fields, data, identities, obj)
+
+            return lambda data: _decode_with_init(cls, fields, data)
+
+    for i, f in enumerate(fields):
+        spec = fields[f]
+
+        if isinstance(spec, str):
+            spec = (spec, )
+
+        if lazy and len(spec) > 1:
+            _install_lazy_field(cls, spec[0], spec[1])
+            pending = True
+
+            lines.append('    value = data.get(' + repr(f) + ', missing)')
+            lines.append('    if value is not missing and value:')
+            lines.append('        pending[' + repr(spec[0]) + '] = value')
+            lines.append('    elif value is not missing:')
+            lines.append('        obj.' + spec[0] + ' = value')
+
+            if spec[0] in defaults:
+                lines.append('    else:')
+                lines.append('        obj.' + spec[0] + ' = ' + repr(defaults.pop(spec[0])))
+
+            continue
+
+        lines.append('    value = data.get(' + repr(f) + ', missing)')
+        lines.append('    if value is not missing:')
+
+        if len(spec) > 1:
+            namespace['decode_' + str(i)] = get_decoder(spec[1], shared=shared)
+
+            if shared and getattr(spec[1], '_identity', None):
+                namespace['cls_' + str(i)] = spec[1]
+                call = 'identities.resolve(cls_' + str(i) + ', decode_' + str(i) + ', {})'
+            elif shared:
+                call = 'decode_' + str(i) + '({}, identities)'
+            else:
+                call = 'decode_' + str(i) + '({})'
+
+            lines.append('        if value and isinstance(value, sequence_types):')
+            lines.append('            value = [' + call.format('el') + ' for el in value]')
+            lines.append('        elif value:')
+            lines.append('            value = ' + call.format('value'))
+        elif spec[0] in interned:
+            lines.append('        if value.__class__ is str:')
+            lines.append('            value = strings.setdefault(value, value)')
+
+        lines.append('        obj.' + spec[0] + ' = value')
+
+    header = ['    obj.' + attribute + ' = ' + repr(defaults[attribute]) for attribute in reversed(list(defaults))]
+
+    if pending:
+        header.append('    pending = obj._pending = {}')
+
+    if shared:
+        # defaults only apply to new objects, so a partial payload (a signup inside a match) doesn't reset an existing one
+        header = ['def decode(data, identities, obj=None):', '    if obj is None:', '        obj = new(cls)'] + ['    ' + el for el in header]
+
+        if interned:
+            header.append('    strings = identities.strings')
+    else:
+        header = ['def decode(data):', '    obj = new(cls)'] + header
+
+    lines = header + lines
+    lines.append('    return obj')
+
+    exec(compile('\n'.join(lines), '<decoder for ' + cls.__name__ + '>', 'exec'), namespace)
+
+    return namespace['decode']
+
+class LazyField:
+    # non-data descriptor: once decoded, the value lives in the instance __dict__ and this isn't consulted again.
+    # threads reaching it at the same time decode the value once, the others get what the first one stored
+    def __init__(self, attribute, cls):
+        self.attribute = attribute
+        self.cls = cls
+        self._lock = threading.Lock()
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        with self._lock:
+            if self.attribute in obj.__dict__:
+                return obj.__dict__[self.attribute]
+
+            pending = obj.__dict__.get('_pending')
+
+            if not pending or self.attribute not in pending:
+                raise AttributeError(self.attribute)
+
+            value = pending.pop(self.attribute)
+            decoder = get_decoder(self.cls, lazy=True)
+
+            if isinstance(value, (list, tuple)):
+                value = [decoder(el) for el in value]
+            else:
+                value = decoder(value)
+
+            obj.__dict__[self.attribute] = value
+
+            return value
+
+def _install_lazy_field(cls, attribute, nested_cls):
+    if not isinstance(cls.__dict__.get(attribute), LazyField):
+        setattr(cls, attribute, LazyField(attribute, nested_cls))
+
+def _instance_state(obj):
+    if hasattr(obj, '__dict__'):
+        return dict(vars(obj))
+
+    state = {}
+
+    for klass in reversed(type(obj).__mro__):
+        for name in getattr(klass, '__slots__', ()):
+            if hasattr(obj, name):
+                state[name] = getattr(obj, name)
+
+    return state
+
+def _is_literal(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+
+    return isinstance(value, (list, dict)) and not value
+
+def _decode_with_init(cls, fields, data, identities=None, obj=None):
+    arguments = {}
+
+    for f in fields:
+        spec = fields[f]
+
+        if isinstance(spec, str):
+            spec = (spec, )
+
+        if f in data:
+            arguments[spec[0]] = data[f]
+
+            if data[f] and len(spec) > 1:
+                if isinstance(data[f], (list, tuple)):
+                    arguments[spec[0]] = [from_api_call_impl(spec[1], el, identities=identities) for el in data[f]]
+                else:
+                    arguments[spec[0]] = from_api_call_impl(spec[1], data[f], identities=identities)
+
+    if obj is not None:
+        object_init_impl(obj, **arguments)
+        return obj
+
+    return cls(**arguments)
+
 def object_init_impl(obj, *args, **kwargs):
     if 'client' in kwargs:
         obj.client = kwargs['client']
@@ -0,0 +1,255 @@
+import collections
+
+import pwned.batch
+
+# what a competition's activity is judged by: the API moves last_activity_at on every change to the competition, its
+# signups, rounds and matches; signup_count and round_current say which of those to fetch again
+Watermark = collections.namedtuple('Watermark', ('last_activity_at', 'round_current', 'signup_count'))
+
+def watermark(competition):
+    return Watermark(getattr(competition, 'last_activity_at', None), getattr(competition, 'round_current', None), getattr(competition, 'signup_count', None))
+
+def _attributes(obj):
+    # attribute names and nested model classes of a model object; competitions map API names to attribute names,
+    # everything in pwned.support to (attribute name, class)
+    for spec in obj._fields.values():
+        if isinstance(spec, str):
+            yield spec, None
+        else:
+            yield spec[0], spec[1] if len(spec) > 1 else None
+
+def merge(target, source):
+    # copies the values of source onto target, keeping target and the objects it holds (matched by id where they
+    # have one). returns whether anything changed
+    changed = False
+
+    for attribute, cls in _attributes(source):
+        if not hasattr(source, attribute):
+            continue
+
+        value = getattr(source, attribute)
+        current = getattr(target, attribute, None)
+
+        if cls is not None and isinstance(value, list) and isinstance(current, list):
+            changed = _merge_list(current, value) or changed
+        elif cls is not None and value is not None and current is not None and type(value) is type(current) and value is not current:
+            changed = merge(current, value) or changed
+        elif current is not value and (current != value or not hasattr(target, attribute)):
+            setattr(target, attribute, value)
+            changed = True
+
+    return changed
+
+def _merge_list(current, values):
+    changed = len(current) != len(values)
+    by_id = {getattr(item, 'id', None): item for item in current}
+    merged = []
+
+    for i, value in enumerate(values):
+        key = getattr(value, 'id', None)
+        existing = by_id.get(key) if key is not None else (current[i] if i < len(current) else None)
+
+        if existing is None or type(existing) is not type(value):
+            merged.append(value)
+            changed = True
+        else:
+            changed = merge(existing, value) or changed
+            merged.append(existing)
+
+    current[:] = merged
+
+    return changed
+
+class SyncChange:
+    def __init__(self, type, id, competition, markers, new=False):
+        self.type = type
+        self.id = id
+        self.competition = competition
+        self.markers = markers
+        self.new = new
+
+        self.signups_added = []
+        self.signups_removed = []
+        self.signups_changed = []
+        self.rounds_changed = []
+        self.matches_changed = []
+
+    def __repr__(self):
+        return 'SyncChange(' + self.type + ' ' + str(self.id) + ', ' + ', '.join(self.markers) + ')'
+
+class SyncReport:
+    def __init__(self):
+        self.changes = []
+        self.errors = []
+        self.checked = 0
+        self.requests = 0
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+class MirroredCompetition:
+    def __init__(self, type, id):
+        self.type = type
+        self.id = id
+        self.competition = None
+        self.signups = {}
+        self.rounds = {}
+        self.watermark = None
+
+# keeps a local copy of competitions, their signups and their rounds. each sync() fetches every tracked competition
+# (one request each), and only fetches the signups and rounds of those whose watermark moved since the last sync.
+# objects in the mirror are updated in place, so references to them stay current.
+class SyncEngine:
+    def __init__(self, client, concurrency=None):
+        self.client = client
+        self.concurrency = concurrency
+        self.competitions = {}
+
+    def track(self, type, id):
+        key = (type, id)
+
+        if key not in self.competitions:
+            self.competitions[key] = MirroredCompetition(type, id)
+
+        return self.competitions[key]
+
+    def untrack(self, type, id):
+        self.competitions.pop((type, id), None)
+
+    def get(self, type, id):
+        return self.competitions.get((type, id))
+
+    def sync(self):
+        report = SyncReport()
+        mirrors = list(self.competitions.values())
+        fetched = pwned.batch.run_batch(lambda mirror: self.client.get(mirror.type, mirror.id), mirrors, self.concurrency)
+
+        report.checked = len(mirrors)
+        report.requests += len(mirrors)
+        pending = []
+
+        for item in fetched:
+            if not item.ok:
+                report.errors.append(((item.key.type, item.key.id), item.error))
+                continue
+
+            mirror, competition = item.key, item.result
+            current = watermark(competition)
+
+            if current == mirror.watermark:
+                continue
+
+            pending.append((mirror, competition, current, self._stale(mirror.watermark, current)))
+
+        # signups and rounds of every changed competition, all at once
+        loads = [(mirror, resource) for mirror, competition, current, stale in pending for resource in stale]
+        loaded = pwned.batch.run_batch(lambda load: getattr(self.client, 'get_' + load[1])(load[0].type, load[0].id), loads, self.concurrency)
+        results = {(id(item.key[0]), item.key[1]): item for item in loaded}
+        report.requests += len(loads)
+
+        for mirror, competition, current, stale in pending:
+            items = [results[(id(mirror), resource)] for resource in stale]
+            failed = [item for item in items if not item.ok]
+
+            if failed:
+                # the watermark stays where it was, so the next sync tries again
+                report.errors.append(((mirror.type, mirror.id), failed[0].error))
+                continue
+
+            change = SyncChange(mirror.type, mirror.id, None, self._markers(mirror.watermark, current), new=mirror.watermark is None)
+
+            if mirror.competition is None:
+                mirror.competition = competition
+            else:
+                merge(mirror.competition, competition)
+
+                if competition.game is not None and mirror.competition.game is not None:
+                    merge(mirror.competition.game, competition.game)
+                else:
+                    mirror.competition.game = competition.game
+
+                if hasattr(competition, 'scoring_model'):
+                    mirror.competition.scoring_model = competition.scoring_model
+
+            for item, resource in zip(items, stale):
+                if resource == 'signups':
+                    self._sync_signups(mirror, item.result or [], change)
+                else:
+                    self._sync_rounds(mirror, item.result or [], change)
+
+            change.competition = mirror.competition
+            mirror.watermark = current
+            report.changes.append(change)
+
+        return report
+
+    def _stale(self, previous, current):
+        # which sub-resources to fetch again
+        if previous is None or previous.last_activity_at != current.last_activity_at:
+            return ('signups', 'rounds')
+
+        stale = ()
+
+        if previous.signup_count != current.signup_count:
+            stale += ('signups', )
+
+        if previous.round_current != current.round_current:
+            stale += ('rounds', )
+
+        return stale
+
+    def _markers(self, previous, current):
+        if previous is None:
+            return Watermark._fields
+
+        return tuple(name for name in Watermark._fields if getattr(previous, name) != getattr(current, name))
+
+    def _sync_signups(self, mirror, signups, change):
+        seen = set()
+
+        for signup in signups:
+            seen.add(signup.id)
+            existing = mirror.signups.get(signup.id)
+
+            if existing is None:
+                mirror.signups[signup.id] = signup
+                change.signups_added.append(signup.id)
+            elif existing is not signup and merge(existing, signup):
+                change.signups_changed.append(signup.id)
+
+        for signup_id in [signup_id for signup_id in mirror.signups if signup_id not in seen]:
+            del mirror.signups[signup_id]
+            change.signups_removed.append(signup_id)
+
+    def _sync_rounds(self, mirror, rounds, change):
+        seen = set()
+
+        for round in rounds:
+            seen.add(round.round_number)
+            existing = mirror.rounds.get(round.round_number)
+
+            if existing is None:
+                mirror.rounds[round.round_number] = round
+                change.rounds_changed.append(round.round_number)
+                continue
+
+            before = self._match_states(existing)
+
+            if merge(existing, round):
+                change.rounds_changed.append(round.round_number)
+                after = self._match_states(existing)
+                change.matches_changed.extend(match_id for match_id in after if before.get(match_id) != after[match_id])
+
+        for round_number in [round_number for round_number in mirror.rounds if round_number not in seen]:
+            del mirror.rounds[round_number]
+            change.rounds_changed.append(round_number)
+
+    def _match_states(self, round):
+        return {match.id: match.get_api_dict() for stage in round.stages for match in stage.matches}
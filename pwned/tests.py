@@ -1,9 +1,27 @@
-import unittest, collections, random, datetime
-import pwned.competitions, pwned.client, pwned.support
+import unittest, collections.abc, random, datetime, threading, time, hmac, hashlib, urllib.parse, http.client, http.server, asyncio, json, tempfile, os, subprocess, sys, io, zlib, concurrent.futures
+import pwned.competitions, pwned.client, pwned.support, pwned.pool, pwned.asyncclient, pwned.cache, pwned.store, pwned.fakeserver, pwned.streaming, pwned.identity, pwned.ratelimit, pwned.metrics, pwned.profiling, pwned.codec, pwned.compression, pwned.batch, pwned.standings, pwned.analytics, pwned.sync, pwned.snapshot, pwned.columnar, pwned.brackets, pwned.simulation
 
 class PwnedTests(unittest.TestCase):
+    # set PWNED_API_URL (and PWNED_PUBLIC_KEY / PWNED_PRIVATE_KEY) to run against a live API instead
+    @classmethod
+    def setUpClass(cls):
+        cls.server = None
+        cls.base_url = os.environ.get('PWNED_API_URL')
+
+        if not cls.base_url:
+            cls.server = pwned.fakeserver.FakeServer().start()
+            cls.base_url = cls.server.base_url
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.server:
+            cls.server.stop()
+
     def setUp(self):
-        self.pwned_client = pwned.client.Pwned('http://api.pwned.localhost/', 'abc', '123')
+        self.pwned_client = pwned.client.Pwned(self.base_url, os.environ.get('PWNED_PUBLIC_KEY', 'abc'), os.environ.get('PWNED_PRIVATE_KEY', '123'))
+
+    def tearDown(self):
+        self.pwned_client.close()
 
     def test_create_tournament(self):
         settings = {
@@ -501,7 +519,7 @@ class PwnedTests(unittest.TestCase):
             'template': 'singleelim8',
         }
         
-        if isinstance(settings, collections.Mapping):
+        if isinstance(settings, collections.abc.Mapping):
             settings_default.update(settings)
         
         tournament = pwned.competitions.Tournament(**settings_default)
@@ -516,7 +534,7 @@ class PwnedTests(unittest.TestCase):
             'remoteId': str(random.randint(1, 400000000)),
         }
         
-        if isinstance(settings, collections.Mapping):
+        if isinstance(settings, collections.abc.Mapping):
             settings_default.update(settings)
             
         return pwned.support.Signup(**settings_default)
@@ -540,9 +558,2147 @@ class PwnedTests(unittest.TestCase):
             'scoring_model_id': 1,
         }
         
-        if isinstance(settings, collections.Mapping):
+        if isinstance(settings, collections.abc.Mapping):
             settings_default.update(settings)
         
         league = pwned.competitions.League(**settings_default)
         
-        return self.pwned_client.create_league(league)
\ No newline at end of file
+        return self.pwned_client.create_league(league)
+
+class DecoderTests(unittest.TestCase):
+    def test_compiled_decoder_matches_generic_decoding(self):
+        data = {
+            'roundNumber': 1, 'name': 'Round 1', 'groups': [],
+            'stages': [{'matches': [{'id': 1, 'signup': {'id': 5, 'name': 'Team'}, 'signupOpponent': None, 'score': 0}]}],
+        }
+
+        def state(obj):
+            if isinstance(obj, list):
+                return [state(el) for el in obj]
+
+            if hasattr(obj, '_fields'):
+                return (obj.__class__, {k: state(v) for k, v in pwned.support._instance_state(obj).items()})
+
+            return obj
+
+        self.assertEqual(state(pwned.support.from_api_call_generic(pwned.support.Round, data)), state(pwned.support.Round.from_api_call(data)))
+
+    def test_defaults_and_missing_fields(self):
+        round = pwned.support.Round.from_api_call({'roundNumber': 2})
+        other = pwned.support.Round.from_api_call({'roundNumber': 3})
+
+        self.assertEqual([], round.stages)
+        self.assertIsNot(round.stages, other.stages)
+        self.assertFalse(hasattr(round, 'name'))
+        self.assertEqual({'roundNumber': 2, 'stages': [], 'groups': []}, round.get_api_dict())
+
+    def test_competition_decoder(self):
+        league = pwned.competitions.League.from_api_call({'id': 3, 'leagueType': 'league', 'game': {'id': 3}, 'scoringModel': {'id': 1}}, client='client')
+
+        self.assertEqual(3, league.id)
+        self.assertEqual('league', league.league_type)
+        self.assertEqual(3, league.game.id)
+        self.assertEqual(1, league.scoring_model.id)
+        self.assertEqual('client', league.client)
+        self.assertFalse(hasattr(league, 'name'))
+
+class LazyDecodingTests(unittest.TestCase):
+    data = {
+        'roundNumber': 1, 'time': '2026-10-18 20:00:00', 'groups': [],
+        'stages': [{'matches': [{'id': 1, 'signup': {'id': 5, 'name': 'Team'}, 'signupOpponent': None, 'score': 2}]}],
+    }
+
+    def test_nested_fields_decoded_on_access(self):
+        round = pwned.support.Round.from_api_call(self.data, lazy=True)
+
+        self.assertEqual(1, round.round_number)
+
+        # compact (slotted) classes always decode eagerly
+        if not pwned.support.COMPACT_MODELS:
+            self.assertNotIn('stages', vars(round))
+
+        match = round.stages[0].matches[0]
+
+        self.assertIsInstance(match, pwned.support.Match)
+        self.assertIs(match, round.stages[0].matches[0])
+        self.assertEqual('Team', match.signup.name)
+        self.assertIsNone(match.signup_opponent)
+
+    def test_round_trips_like_eager_decoding(self):
+        eager = pwned.support.Round.from_api_call(self.data)
+        lazy = pwned.support.Round.from_api_call(self.data, lazy=True)
+
+        self.assertEqual(eager.get_api_dict(), lazy.get_api_dict())
+
+    def test_missing_and_empty_fields(self):
+        round = pwned.support.Round.from_api_call({'roundNumber': 1, 'groups': None}, lazy=True)
+
+        self.assertEqual([], round.stages)
+        self.assertIsNone(round.groups)
+        self.assertFalse(hasattr(pwned.support.Match.from_api_call({'id': 1}, lazy=True), 'signup'))
+        self.assertFalse(hasattr(pwned.support.Match(id=2), 'signup'))
+
+    def test_assignment_overrides_pending_value(self):
+        match = pwned.support.Match.from_api_call({'id': 1, 'signup': {'id': 5}}, lazy=True)
+        match.signup = pwned.support.Signup(id=6)
+
+        self.assertEqual(6, match.signup.id)
+        self.assertEqual({'id': 6}, match.get_api_dict()['signup'])
+
+    def test_concurrent_access_decodes_once(self):
+        for attempt in range(20):
+            round = pwned.support.Round.from_api_call(self.data, lazy=True)
+
+            with concurrent.futures.ThreadPoolExecutor(8) as executor:
+                stages = list(executor.map(lambda i: round.stages, range(32)))
+
+            self.assertTrue(all(stage is stages[0] for stage in stages))
+
+class IdentityMapTests(unittest.TestCase):
+    def stage(self):
+        signup = {'id': 5, 'name': 'Team'}
+        opponent = {'id': 6, 'name': 'Other team'}
+
+        return {'mapName': 'de_dust2', 'matches': [
+            {'id': 1, 'signup': dict(signup), 'signupOpponent': dict(opponent), 'time': ''.join(['2026-10-18 ', '20:00'])},
+            {'id': 2, 'signup': dict(opponent), 'signupOpponent': dict(signup), 'time': ''.join(['2026-10-18 ', '20:00'])},
+        ]}
+
+    def test_signups_are_shared_by_id(self):
+        identities = pwned.identity.IdentityMap()
+        stage = pwned.support.RoundStage.from_api_call(self.stage(), identities=identities)
+        first, second = stage.matches
+
+        self.assertIs(first.signup, second.signup_opponent)
+        self.assertIs(first.signup_opponent, second.signup)
+        self.assertIs(first.time, second.time)
+        self.assertEqual({'hits': 2, 'misses': 2, 'objects': 2}, {k: v for k, v in identities.stats().items() if k != 'strings'})
+
+        first.signup.name = 'Renamed'
+
+        self.assertEqual('Renamed', second.signup_opponent.get_api_dict()['name'])
+
+    def test_decoding_again_updates_shared_instance(self):
+        identities = pwned.identity.IdentityMap()
+        match = pwned.support.Match.from_api_call(self.stage()['matches'][0], identities=identities)
+        signup = pwned.support.Signup.from_api_call({'id': 5, 'name': 'New name', 'seeding': 3}, identities=identities)
+        pwned.support.Signup.from_api_call({'id': 5}, identities=identities)
+
+        self.assertIs(match.signup, signup)
+        self.assertEqual(('New name', 3), (match.signup.name, match.signup.seeding))
+        self.assertIs(signup, identities.get(pwned.support.Signup, 5))
+
+    def test_string_and_int_ids_are_the_same_signup(self):
+        identities = pwned.identity.IdentityMap()
+        signup = pwned.support.Signup.from_api_call({'id': '5', 'name': 'Team'}, identities=identities)
+        again = pwned.support.Signup.from_api_call({'id': 5, 'name': 'Renamed'}, identities=identities)
+
+        self.assertIs(signup, again)
+        self.assertEqual('Renamed', signup.name)
+        self.assertEqual(1, len(identities))
+        self.assertIs(signup, identities.get(pwned.support.Signup, '5'))
+        self.assertIs(signup, identities.get(pwned.support.Signup, 5))
+
+        identities.forget(pwned.support.Signup, 5)
+        self.assertIsNone(identities.get(pwned.support.Signup, '5'))
+
+    def test_same_result_as_regular_decoding(self):
+        data = self.stage()
+
+        self.assertEqual(pwned.support.RoundStage.from_api_call(data).get_api_dict(),
+                         pwned.support.RoundStage.from_api_call(data, identities=pwned.identity.IdentityMap()).get_api_dict())
+
+    def test_client_shares_signups_between_calls(self):
+        with pwned.fakeserver.FakeServer() as server:
+            pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123', identities=pwned.identity.IdentityMap())
+            tournament = pwned_client.create_tournament(pwned.competitions.Tournament(name='Shared', template='singleelim4'))
+            tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(4)])
+            tournament.start()
+
+            signups = {signup.id: signup for signup in tournament.get_signups()}
+            matches = tournament.get_round(1).stages[0].matches
+            pwned_client.close()
+
+        for match in matches:
+            self.assertIs(signups[match.signup.id], match.signup)
+            self.assertIs(signups[match.signup_opponent.id], match.signup_opponent)
+
+class CompactModelTests(unittest.TestCase):
+    def run_compact(self, code):
+        environment = dict(os.environ, PWNED_COMPACT_MODELS='1')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], env=environment, cwd=root, capture_output=True, text=True)
+
+        self.assertEqual(0, result.returncode, result.stderr)
+
+        return json.loads(result.stdout)
+
+    def test_models_have_no_dict(self):
+        result = self.run_compact('''if True:
+            import json, pwned.support, pwned.competitions
+            match = pwned.support.Match.from_api_call({'id': 1, 'signup': {'id': 2}, 'score': 3})
+            league = pwned.competitions.League.from_api_call({'id': 4, 'leagueType': 'league', 'scoringModel': {'id': 1}}, client='client')
+            print(json.dumps({
+                'dict': [hasattr(obj, '__dict__') for obj in (match, match.signup, league, league.scoring_model)],
+                'has_time': hasattr(match, 'time'),
+                'match': match.get_api_dict(),
+                'league': league.get_api_dict(),
+                'scoring_model': league.scoring_model.id,
+            }))
+        ''')
+
+        self.assertEqual([False, False, False, False], result['dict'])
+        self.assertFalse(result['has_time'])
+        self.assertEqual({'id': 1, 'signup': {'id': 2}, 'score': 3}, result['match'])
+        self.assertEqual({'id': 4, 'leagueType': 'league'}, result['league'])
+        self.assertEqual(1, result['scoring_model'])
+
+class FakeServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer(seed=1).start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+
+    def test_rejects_invalid_signature(self):
+        pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', 'wrong')
+
+        with self.assertRaises(pwned.client.PwnedAPIException):
+            pwned_client.get_games()
+
+        pwned_client.close()
+
+    def test_bracket_advances_winners(self):
+        tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Bracket', template='singleelim4'))
+        tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(4)])
+        tournament.start()
+
+        for match in tournament.get_round(1).stages[0].matches:
+            match.score, match.score_opponent = 2, 1
+            tournament.update_match(match)
+
+        final = tournament.get_round(2).stages[0].matches[0]
+        first_round = tournament.get_round(1).stages[0].matches
+
+        self.assertEqual(first_round[0].signup.id, final.signup.id)
+        self.assertEqual(first_round[1].signup.id, final.signup_opponent.id)
+
+    def test_double_elimination_sends_losers_down(self):
+        tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Double', template='doubleelim4'))
+        tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(4)])
+        tournament.start()
+
+        # a stage per bracket round played in a round
+        rounds = tournament.get_rounds()
+        self.assertEqual(['Round 1', 'Round 2', 'Round 3', 'Grand final'], [round.name for round in rounds])
+        self.assertEqual([['Upper round 1'], ['Upper final', 'Lower round 1'], ['Lower final'], ['Grand final']], [[stage.description for stage in round.stages] for round in rounds])
+
+        for match in tournament.get_round(1).stages[0].matches:
+            match.score, match.score_opponent = 2, 1
+            tournament.update_match(match)
+
+        first_round = tournament.get_round(1).stages[0].matches
+        lower = tournament.get_round(2).stages[1].matches[0]
+
+        self.assertEqual([first_round[0].signup_opponent.id, first_round[1].signup_opponent.id], [lower.signup.id, lower.signup_opponent.id])
+
+        upper_final = tournament.get_round(2).stages[0].matches[0]
+        upper_final.score, upper_final.score_opponent = 0, 1
+        tournament.update_match(upper_final)
+        lower.score, lower.score_opponent = 1, 0
+        tournament.update_match(lower)
+
+        lower_final = tournament.get_round(3).stages[0].matches[0]
+        grand_final = tournament.get_round(4).stages[0].matches[0]
+
+        self.assertEqual([lower.signup.id, first_round[0].signup.id], [lower_final.signup.id, lower_final.signup_opponent.id])
+        self.assertEqual(first_round[1].signup.id, grand_final.signup.id)
+        self.assertIsNone(grand_final.signup_opponent)
+
+    def test_lazy_client_matches_eager(self):
+        tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Lazy', template='singleelim8'))
+        tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(8)])
+        tournament.start()
+
+        lazy_client = pwned.client.Pwned(self.server.base_url, 'abc', '123', lazy=True)
+        eager = [round.get_api_dict() for round in self.pwned_client.get_rounds('tournament', tournament.id)]
+        lazy = [round.get_api_dict() for round in lazy_client.get_rounds('tournament', tournament.id)]
+        lazy_client.close()
+
+        self.assertEqual(eager, lazy)
+
+    def test_injected_errors(self):
+        self.server.error_rate = 1
+
+        with self.assertRaises(pwned.client.PwnedAPIException):
+            self.pwned_client.get_games()
+
+        self.server.error_rate = 0
+        self.assertTrue(self.pwned_client.get_games())
+
+    def test_api_without_http(self):
+        api = pwned.fakeserver.FakeApi()
+        status, response = api.handle('GET', 'games', {'publicKey': 'abc', 'signature': self.pwned_client._signature('games', 'GET', '')})
+
+        self.assertEqual(200, status)
+        self.assertEqual([dict(game, id=str(game['id'])) for game in pwned.fakeserver.GAMES], response['result'])
+
+    def test_only_request_errors_are_400s(self):
+        api = pwned.fakeserver.FakeApi()
+        body = b'{"name": '
+        status, response = api.handle('POST', 'tournaments', {'publicKey': 'abc', 'signature': self.pwned_client._signature('tournaments', 'POST', body)}, body)
+
+        self.assertEqual((400, 'Invalid JSON in request body'), (status, response['error']['reason']))
+
+        # errors raised by the handlers propagate, so bugs in the fake don't pass for bad requests
+        body = b'{"leagueType": "league", "scoringModelId": "not a number"}'
+
+        with self.assertRaises(ValueError):
+            api.handle('POST', 'leagues', {'publicKey': 'abc', 'signature': self.pwned_client._signature('leagues', 'POST', body)}, body)
+
+class StandingsTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer().start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+        self.random = random.Random(7)
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+
+    def create_league(self, league_type, scoring_model_id):
+        league = self.pwned_client.create_league(pwned.competitions.League(name='Standings', league_type=league_type, team_count=6, round_count=3, scoring_model_id=scoring_model_id))
+        league.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(6)])
+        league.start()
+
+        return league
+
+    def test_matches_update_standings(self):
+        scoring_model = self.pwned_client.create_league_scoring_model(pwned.support.LeagueScoringModel(type='league', name='Bonus', points_win=3, points_draw=1, points_loss=-1))
+        league = self.create_league('league', scoring_model.id)
+        signups = league.get_signups()
+
+        scoring_model.points_bonus = {signups[4].id: 2}
+        self.pwned_client.update_league_scoring_model(scoring_model)
+
+        standings = league.get_standings()
+        self.assertEqual([], standings.verify(league))
+        self.assertEqual(2, standings.position(signups[4].id).points)
+
+        matches = [match for round in league.get_rounds() for stage in round.stages for match in stage.matches]
+
+        for match in matches:
+            match.score, match.score_opponent = self.random.randint(0, 3), self.random.randint(0, 3)
+            league.update_match(match)
+            standings.apply_match(match)
+
+            self.assertEqual([], standings.verify(league))
+
+        # changing a result takes back what it counted for
+        matches[0].score, matches[0].score_opponent = matches[0].score_opponent + 1, matches[0].score_opponent
+        league.update_match(matches[0])
+        standings.apply_match(matches[0])
+
+        self.assertEqual([], standings.verify(league))
+        self.assertEqual(list(range(1, 7)), [row.position for row in standings.table()])
+        self.assertEqual([row.signup.id for row in league.get_table()], [row.signup.id for row in standings.table()])
+
+        standings.remove_match(matches[0].id)
+        differences = standings.verify(league)
+
+        self.assertIn((matches[0].signup.id, 'wins'), [difference[0:2] for difference in differences])
+
+    def test_known_table(self):
+        # scores worked out by hand: 3 points a win, 1 a draw, -1 a loss, and 2 bonus points for Team 2
+        scoring_model = self.pwned_client.create_league_scoring_model(pwned.support.LeagueScoringModel(type='league', name='Known', points_win=3, points_draw=1, points_loss=-1))
+        league = self.pwned_client.create_league(pwned.competitions.League(name='Known', league_type='league', team_count=4, round_count=3, scoring_model_id=scoring_model.id))
+        league.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(4)])
+        league.start()
+
+        signups = {signup.name: signup.id for signup in league.get_signups()}
+        scoring_model.points_bonus = {signups['Team 2']: 2}
+        self.pwned_client.update_league_scoring_model(scoring_model)
+        scores = {('Team 0', 'Team 1'): (2, 0), ('Team 0', 'Team 2'): (1, 1), ('Team 0', 'Team 3'): (0, 1),
+                  ('Team 1', 'Team 2'): (3, 1), ('Team 1', 'Team 3'): (2, 2), ('Team 2', 'Team 3'): (1.5, 0)}
+        matches = [match for round in league.get_rounds() for stage in round.stages for match in stage.matches]
+
+        for match in matches:
+            if (match.signup.name, match.signup_opponent.name) in scores:
+                match.score, match.score_opponent = scores[(match.signup.name, match.signup_opponent.name)]
+            else:
+                match.score_opponent, match.score = scores[(match.signup_opponent.name, match.signup.name)]
+
+        league.update_matches(matches)
+
+        # (name, position, wins, draws, losses, points, score, score for, score against)
+        expected = [
+            ('Team 2', 1, 1, 1, 1, 5, -0.5, 3.5, 4),
+            ('Team 0', 2, 1, 1, 1, 3, 1, 3, 2),
+            ('Team 1', 3, 1, 1, 1, 3, 0, 5, 5),
+            ('Team 3', 4, 1, 1, 1, 3, -0.5, 3, 3.5),
+        ]
+
+        def values(table):
+            return [(row.signup.name, row.position, row.wins, row.draws, row.losses, row.points, row.score, row.score_for, row.score_against) for row in table]
+
+        self.assertEqual(expected, values(league.get_table()))
+        self.assertEqual(expected, values(league.get_standings().table()))
+
+    def test_async_client(self):
+        league_id = self.create_league('league', 1).id
+
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.server.base_url, 'abc', '123') as client:
+                league = await client.get_league(league_id)
+                standings = await league.get_standings()
+
+                return standings, await standings.verify(league)
+
+        standings, differences = asyncio.run(run())
+
+        self.assertEqual([], differences)
+        self.assertEqual(6, len(standings.table()))
+
+    def test_unplayed_matches_do_not_count(self):
+        scoring_model = pwned.support.LeagueScoringModel(points_win=3, points_draw=1, points_loss=0, points_bonus=None)
+        signups = [pwned.support.Signup(id=i, name=str(i)) for i in (1, 2)]
+        standings = pwned.standings.LeagueStandings(scoring_model, signups)
+
+        standings.apply_match(pwned.support.Match(id=1, signup=signups[0], signup_opponent=signups[1], score=None, score_opponent=None))
+        self.assertEqual([0, 0], [row.points for row in standings.table()])
+
+        standings.apply_match(pwned.support.Match(id=1, signup=signups[0], signup_opponent=signups[1], score=1.5, score_opponent=1.5))
+        self.assertEqual([(1, 1, 0), (1, 1, 0)], [(row.points, row.draws, row.score) for row in standings.table()])
+
+        standings.apply_match(pwned.support.Match(id=1, signup=signups[0], signup_opponent=signups[1], score=0, score_opponent=2))
+        self.assertEqual([(2, 3, 1, 0), (1, 0, 0, 0)], [(row.signup.id, row.points, row.wins, row.draws) for row in standings.table()])
+        self.assertEqual(-2, standings.position(1).score)
+
+    def test_string_ids_and_numbers(self):
+        # the shapes the API sends: string ids and scores, and a scoring model embedded in a league with string points
+        scoring_model = pwned.support.LeagueScoringModel(id='4', points_win='3', points_draw='1', points_loss='0', points_bonus={'2': '1.5', '9': 4, '1': None})
+        signups = [pwned.support.Signup(id=i, name=str(i)) for i in (1, 2)]
+        standings = pwned.standings.LeagueStandings(scoring_model, signups)
+
+        standings.apply_match(pwned.support.Match(id='7', signup=pwned.support.Signup(id='1'), signup_opponent=pwned.support.Signup(id='2'), score='2', score_opponent='0'))
+        standings.apply_match(pwned.support.Match(id=7, signup=pwned.support.Signup(id='1'), signup_opponent=pwned.support.Signup(id='2'), score='2', score_opponent='1'))
+
+        self.assertEqual({'2': 1.5, '9': 4}, pwned.support.bonus_points(scoring_model))
+        self.assertEqual([(1, 3, 1, 1), (2, 1.5, 0, -1)], [(row.signup.id, row.points, row.wins, row.score) for row in standings.table()])
+        self.assertEqual(1.5, standings.position('2').points)
+        self.assertEqual([], standings.compare([pwned.support.LeagueTablePosition(signup=pwned.support.Signup(id=str(row.signup.id)), **{field: getattr(row, field) for field in pwned.standings.TABLE_FIELDS}) for row in standings.table()]))
+
+    def test_league_without_scoring_model(self):
+        league = pwned.competitions.League(id=3, name='No model')
+
+        with self.assertRaisesRegex(ValueError, 'scoring model'):
+            pwned.standings.LeagueStandings.from_league(league, self.pwned_client)
+
+    def test_championship_round_results(self):
+        league = self.create_league('championship', 2)
+        signups = league.get_signups()
+
+        league.set_championship_round_results(1, [pwned.support.LeagueChampionshipRoundResultEntry(signup=signup, position=i + 1, score=100 - i) for i, signup in enumerate(signups)])
+        standings = league.get_standings()
+        self.assertEqual([], standings.verify(league))
+
+        for round_number in (2, 1):
+            self.random.shuffle(signups)
+            results = [pwned.support.LeagueChampionshipRoundResultEntry(signup=signup, position=i + 1, score=self.random.randint(0, 100)) for i, signup in enumerate(signups)]
+
+            league.set_championship_round_results(round_number, results)
+            standings.apply_round_results(round_number, results)
+
+        # round 1 was only applied locally once, so replacing it can't take back the results the table started from
+        differences = standings.verify(league)
+        self.assertTrue(differences)
+
+        standings = league.get_standings()
+        results = [pwned.support.LeagueChampionshipRoundResultEntry(signup=signup, position=i + 1, score=10) for i, signup in enumerate(signups)]
+        league.set_championship_round_results(3, results)
+        standings.apply_round_results(3, results)
+
+        self.assertEqual([], standings.verify(league))
+
+class AnalyticsTests(unittest.TestCase):
+    def table_values(self, table):
+        return [(row.signup.id, row.position, row.wins, row.draws, row.losses, row.points, row.score, row.score_for, row.score_against) for row in table]
+
+    def test_statistics_match_server_tables(self):
+        with pwned.fakeserver.FakeServer() as server:
+            client = pwned.client.Pwned(server.base_url, 'abc', '123')
+            scoring_model = client.create_league_scoring_model(pwned.support.LeagueScoringModel(type='league', name='Two for a win', points_win=2, points_draw=1, points_loss=0))
+            leagues = []
+            rng = random.Random(3)
+
+            for scoring_model_id in (1, scoring_model.id):
+                league = client.create_league(pwned.competitions.League(name='Season', team_count=6, scoring_model_id=scoring_model_id))
+                league.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(6)])
+                league.start()
+
+                matches = [match for round in league.get_rounds() for stage in round.stages for match in stage.matches]
+
+                for match in matches[0:-2]:
+                    match.score, match.score_opponent = rng.randint(0, 3), rng.choice((0, 1, 2.5))
+
+                league.update_matches(matches)
+                leagues.append(league)
+
+            scoring_model.points_bonus = {leagues[1].get_signups()[0].id: 5}
+            client.update_league_scoring_model(scoring_model)
+
+            results, loaded = pwned.analytics.LeagueResults.from_leagues(leagues + [pwned.competitions.League(id=999, client=client)], concurrency=2)
+            statistics = results.compute(backend='python')
+
+            self.assertEqual([999], [item.key.id for item in loaded.failed])
+            self.assertEqual(2 * 13, len(results))
+
+            for league in leagues:
+                self.assertEqual(self.table_values(league.get_table()), self.table_values(statistics.table(league.id)))
+
+            rows = list(statistics.rows())
+            self.assertEqual(12, len(rows))
+            self.assertEqual((leagues[0].id, results.signups[0]), rows[0][0:2])
+            client.close()
+
+    def test_backends_agree(self):
+        results = pwned.analytics.LeagueResults()
+        rng = random.Random(5)
+        signups = [pwned.support.Signup(id=i) for i in range(8)]
+
+        for league_id in range(3):
+            results.add_league(league_id, pwned.support.LeagueScoringModel(points_win=3, points_draw=league_id, points_loss=-1, points_bonus={'2': 1}), signups)
+
+            for i in range(40):
+                results.add_match(league_id, rng.randrange(8), rng.randrange(8), rng.randint(0, 2), rng.randint(0, 2))
+
+        results.add_match(0, 1, 2, None, 1)
+        results.add_match(0, 1, 99, 1, 1)
+        self.assertEqual(120, len(results))
+
+        with self.assertRaises(ValueError):
+            results.add_league(0, pwned.support.LeagueScoringModel(points_win=3, points_draw=1, points_loss=0, points_bonus=None), signups)
+
+        with self.assertRaises(ValueError):
+            results.compute(backend='fortran')
+
+        python = results.compute(backend='python')
+        self.assertEqual(sum(python['wins']), sum(python['losses']))
+        self.assertEqual(2 * 120, sum(python['wins']) + sum(python['draws']) + sum(python['losses']))
+
+        if pwned.analytics.numpy is None:
+            with self.assertRaises(ImportError):
+                results.compute(backend='numpy')
+        else:
+            vectorized = results.compute(backend='numpy')
+
+            for name in pwned.analytics.STATISTICS:
+                self.assertEqual(list(python[name]), list(vectorized[name]))
+
+    def known_results(self):
+        # worked out by hand, see expected_rows
+        results = pwned.analytics.LeagueResults()
+        signups = [pwned.support.Signup(id=i, name='Team ' + str(i)) for i in range(1, 6)]
+
+        results.add_league(7, pwned.support.LeagueScoringModel(points_win=3, points_draw=1, points_loss=0, points_bonus={'3': 2}), signups[0:3])
+        results.add_match(7, 1, 2, 2, 1)
+        results.add_match(7, 2, 3, 1.5, 1.5)
+        results.add_match(7, 3, 1, 0, 4)
+        results.add_match(7, 1, 2, 0, 0)
+
+        results.add_league(8, pwned.support.LeagueScoringModel(points_win=2, points_draw=1, points_loss=-1, points_bonus=None), signups[3:5])
+        results.add_match(8, 5, 4, 3, 1)
+        results.add_match(8, 4, 5, None, None)
+        results.add_match(8, 4, 99, 1, 0)
+
+        return results
+
+    # (league id, signup id, wins, draws, losses, points, score for, score against)
+    expected_rows = [
+        (7, 1, 2, 1, 0, 7, 6, 1),
+        (7, 2, 0, 2, 1, 2, 2.5, 3.5),
+        (7, 3, 0, 1, 1, 3, 1.5, 5.5),
+        (8, 4, 0, 0, 1, -1, 1, 3),
+        (8, 5, 1, 0, 0, 2, 3, 1),
+    ]
+
+    def test_known_statistics(self):
+        statistics = self.known_results().compute(backend='python')
+
+        self.assertEqual(self.expected_rows, [(row[0], row[1].id) + row[2:] for row in statistics.rows()])
+        self.assertEqual([(1, 1, 7, 5), (3, 2, 3, -4), (2, 3, 2, -1)], [(row.signup.id, row.position, row.points, row.score) for row in statistics.table(7)])
+
+    @unittest.skipUnless(pwned.analytics.numpy, 'numpy is not installed')
+    def test_known_statistics_numpy(self):
+        statistics = self.known_results().compute(backend='numpy')
+
+        self.assertEqual(self.expected_rows, [(row[0], row[1].id) + row[2:] for row in statistics.rows()])
+        self.assertEqual([(5, 1, 2, 2), (4, 2, -1, -2)], [(row.signup.id, row.position, row.points, row.score) for row in statistics.table(8)])
+
+    def test_string_ids_match_standings(self):
+        # signups from get_signups next to string ids and scores in matches, the way the API sends them
+        scoring_model = pwned.support.LeagueScoringModel(points_win='3', points_draw='1', points_loss='0', points_bonus={'2': 2, '3': '0.5'})
+        signups = [pwned.support.Signup(id=i, name=str(i)) for i in (1, 2, 3)]
+        matches = [
+            pwned.support.Match(id='1', signup=pwned.support.Signup(id='1'), signup_opponent=pwned.support.Signup(id='2'), score='2', score_opponent='1'),
+            pwned.support.Match(id='2', signup=pwned.support.Signup(id='2'), signup_opponent=pwned.support.Signup(id='3'), score='1.5', score_opponent='1.5'),
+        ]
+        results = pwned.analytics.LeagueResults()
+        results.add_league(5, scoring_model, signups)
+        results.add_matches(5, matches)
+        standings = pwned.standings.LeagueStandings(scoring_model, signups)
+        standings.apply_matches(matches)
+
+        self.assertEqual(2, len(results))
+        self.assertEqual([3, 3, 1.5], [row[5] for row in results.compute(backend='python').rows()])
+        self.assertEqual(self.table_values(standings.table()), self.table_values(results.compute(backend='python').table(5)))
+
+class SyncTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer().start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+        self.engine = pwned.sync.SyncEngine(self.pwned_client, concurrency=4)
+        self.leagues = []
+
+        for i in range(4):
+            league = self.pwned_client.create_league(pwned.competitions.League(name='League ' + str(i), team_count=4))
+            league.add_signups([pwned.support.Signup(name='Team ' + str(j)) for j in range(4)])
+            league.start()
+            self.leagues.append(league)
+            self.engine.track('league', league.id)
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+
+    def test_only_active_competitions_are_fetched(self):
+        report = self.engine.sync()
+
+        self.assertTrue(report.ok)
+        self.assertEqual(4, len(report))
+        self.assertTrue(all(change.new for change in report))
+        self.assertEqual(4 + 4 * 2, report.requests)
+
+        mirror = self.engine.get('league', self.leagues[1].id)
+        match = mirror.rounds[1].stages[0].matches[0]
+        signup = mirror.signups[match.signup.id]
+        self.assertEqual(4, len(mirror.signups))
+
+        report = self.engine.sync()
+        self.assertEqual(0, len(report))
+        self.assertEqual(4, report.requests)
+
+        self.leagues[1].update_match(pwned.support.Match(id=match.id, score=3, score_opponent=1))
+        self.leagues[1].add_signups([pwned.support.Signup(name='Late')])
+        self.pwned_client.update('league', self.leagues[2].id, pwned.competitions.League(name='Renamed'))
+
+        report = self.engine.sync()
+        changes = {change.id: change for change in report}
+
+        self.assertEqual({self.leagues[1].id, self.leagues[2].id}, set(changes))
+        self.assertEqual(4 + 2 * 2, report.requests)
+        self.assertIn('signup_count', changes[self.leagues[1].id].markers)
+        self.assertEqual([match.id], changes[self.leagues[1].id].matches_changed)
+        self.assertEqual(1, len(changes[self.leagues[1].id].signups_added))
+        self.assertEqual([], changes[self.leagues[2].id].matches_changed)
+        self.assertEqual('Renamed', self.engine.get('league', self.leagues[2].id).competition.name)
+
+        # the same objects, updated in place
+        self.assertIs(match, mirror.rounds[1].stages[0].matches[0])
+        self.assertIs(signup, mirror.signups[signup.id])
+        self.assertEqual(('3', '1'), (match.score, match.score_opponent))
+        self.assertEqual('5', mirror.competition.signup_count)
+
+        self.leagues[1].remove_signup(pwned.support.Signup(id=changes[self.leagues[1].id].signups_added[0]))
+        report = self.engine.sync()
+
+        self.assertEqual(changes[self.leagues[1].id].signups_added, report.changes[0].signups_removed)
+        self.assertEqual(4, len(mirror.signups))
+
+    def test_failures_are_retried_next_sync(self):
+        self.engine.track('tournament', 999)
+        self.engine.sync()
+
+        self.server.error_rate = 1
+        report = self.engine.sync()
+
+        self.assertFalse(report.ok)
+        self.assertEqual(5, len(report.errors))
+        self.assertEqual(0, len(report))
+
+        self.server.error_rate = 0
+        self.engine.untrack('tournament', 999)
+        self.pwned_client.update('league', self.leagues[0].id, pwned.competitions.League(name='Changed'))
+        report = self.engine.sync()
+
+        self.assertTrue(report.ok)
+        self.assertEqual([self.leagues[0].id], [change.id for change in report])
+
+    def test_merge_keeps_objects(self):
+        signup = pwned.support.Signup(id=1, name='A')
+        target = pwned.support.Match(id=1, signup=signup, signup_opponent=None, score=None)
+        source = pwned.support.Match(id=1, signup=pwned.support.Signup(id=1, name='B'), signup_opponent=pwned.support.Signup(id=2, name='C'), score=2)
+
+        self.assertTrue(pwned.sync.merge(target, source))
+        self.assertIs(signup, target.signup)
+        self.assertEqual(('B', 'C', 2), (target.signup.name, target.signup_opponent.name, target.score))
+        self.assertFalse(pwned.sync.merge(target, source))
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer().start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'snapshot.db')
+
+        signups = lambda: [pwned.support.Signup(name='Team ' + str(i), remote_id='r' + str(i), clan_id=100 + i) for i in range(8)]
+        self.tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Cup', template='singleelim8'))
+        self.tournament.add_signups(signups())
+        self.tournament.start()
+
+        self.league = self.pwned_client.create_league(pwned.competitions.League(name='Season', team_count=8, game_id=3))
+        self.league.add_signups(signups())
+        self.league.start()
+
+        for match in self.league.get_round(1).stages[0].matches:
+            match.score, match.score_opponent, match.time = 2, 1, '2026-10-0' + str(int(match.id) % 9 + 1) + ' 20:00:00'
+            self.league.update_match(match)
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_snapshot_loads_back(self):
+        with pwned.snapshot.SnapshotStore(self.path) as store:
+            store.snapshot(self.tournament)
+            store.snapshot(self.league)
+
+        with pwned.snapshot.SnapshotStore(self.path) as store:
+            league = store.load_competition('league', self.league.id, client=self.pwned_client)
+
+            self.assertIsInstance(league, pwned.competitions.League)
+            self.assertEqual(self.pwned_client.get_league(self.league.id).get_api_dict(), league.get_api_dict())
+            self.assertEqual('1', league.scoring_model.id)
+            self.assertEqual('Counter-Strike', league.game.name)
+            self.assertEqual(['Cup', 'Season'], sorted(competition.name for competition in store.load_competitions()))
+            self.assertIsNone(store.load_competition('tournament', 999))
+
+            for competition in (self.tournament, league):
+                self.assertEqual([signup.get_api_dict() for signup in competition.get_signups()], [signup.get_api_dict() for signup in store.load_signups(competition._get_type(), competition.id)])
+                self.assertEqual([round.get_api_dict() for round in competition.get_rounds()], [round.get_api_dict() for round in store.load_rounds(competition._get_type(), competition.id)])
+
+            self.assertEqual([row.get_api_dict() for row in league.get_table()], [row.get_api_dict() for row in store.load_table(league.id)])
+
+    def test_find_matches_and_signups(self):
+        with pwned.snapshot.SnapshotStore(self.path) as store:
+            store.snapshot(self.tournament)
+            store.snapshot(self.league)
+
+            signups = store.find_signups(remote_id='r3')
+            self.assertEqual([('league', int(self.league.id)), ('tournament', int(self.tournament.id))], [signup[0:2] for signup in signups])
+            self.assertEqual('103', signups[0][2].clan_id)
+            self.assertEqual(2, len(store.find_signups(clan_id=105)))
+
+            found = store.find_matches(remote_id='r3')
+            names = lambda match: (match.signup.name if match.signup else None, match.signup_opponent.name if match.signup_opponent else None)
+
+            self.assertEqual({'league', 'tournament'}, set(stored.type for stored in found))
+            self.assertTrue(all('Team 3' in names(stored.match) for stored in found))
+            # every other team once in the league, and the first round of the cup
+            self.assertEqual(7 + 1, len(found))
+
+            played = store.find_matches(remote_id='r3', since='2026-10-01', until='2026-10-31', type='league')
+            self.assertEqual(1, len(played))
+            self.assertEqual(('2', '1'), (played[0].match.score, played[0].match.score_opponent))
+            self.assertEqual(1, played[0].round_number)
+
+            # a later result, stored on its own
+            match = played[0].match
+            match.score_opponent = 5
+            self.league.update_match(match)
+            store.save_matches('league', self.league.id, [match])
+
+            stored = store.find_matches(signup_id=match.signup.id, type='league', since='2026-10-01')[0]
+            self.assertEqual((5, 1), (stored.match.score_opponent, stored.round_number))
+            loaded = {loaded.id: loaded for loaded in store.load_rounds('league', self.league.id)[0].stages[0].matches}
+            self.assertEqual(5, loaded[match.id].score_opponent)
+
+            plan = ' '.join(str(row) for row in store._query('explain query plan select * from signups where remote_id = ?', ('r3', )))
+            self.assertIn('signups_remote_id', plan)
+
+    def test_shared_signups(self):
+        with pwned.snapshot.SnapshotStore(identities=pwned.identity.IdentityMap()) as store:
+            store.snapshot(self.league)
+            rounds = store.load_rounds('league', self.league.id)
+            signups = {signup.id: signup for signup in store.load_signups('league', self.league.id)}
+
+            for match in rounds[0].stages[0].matches:
+                self.assertIs(signups[match.signup.id], match.signup)
+
+class ColumnarTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer().start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+        self.league = self.pwned_client.create_league(pwned.competitions.League(name='Season', team_count=6))
+        self.league.add_signups([pwned.support.Signup(name='Team ' + str(i), remote_id='r' + str(i), clan_id=i or None) for i in range(6)])
+        self.league.start()
+
+        for match in self.league.get_round(1).stages[0].matches:
+            match.score, match.score_opponent, match.map_name = 2, 1.5, 'de_dust2'
+            self.league.update_match(match)
+
+        self.tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Cup', template='singleelim4'))
+        self.tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(4)])
+        self.tournament.start()
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def match_values(self, match):
+        # the archive keeps ids and scores as numbers, the API sends them as strings
+        signup_id = lambda signup: int(signup.id) if signup else None
+        score = lambda score: pwned.support.number(score) if score is not None else None
+
+        return (int(match.id), signup_id(match.signup), signup_id(match.signup_opponent), score(match.score), score(match.score_opponent), match.is_walkover, match.time, match.map_name)
+
+    def test_round_trip_and_filters(self):
+        with pwned.columnar.ColumnarWriter(self.path) as writer:
+            writer.export(self.league)
+            writer.export(self.tournament)
+
+        with pwned.columnar.ColumnarReader(self.path) as reader:
+            for competition in (self.league, self.tournament):
+                expected = [self.match_values(match) for round in competition.get_rounds() for stage in round.stages for match in stage.matches]
+                archived = list(reader.matches(competition._get_type(), competition.id))
+
+                self.assertEqual(expected, [self.match_values(stored.match) for stored in archived])
+
+            self.assertEqual(15 + 3, len(reader))
+            self.assertEqual(['r' + str(i) for i in range(6)], [signup.remote_id for signup in reader.signups('league', self.league.id)])
+            self.assertEqual([None, 1], [signup.clan_id for signup in reader.signups('league')[0:2]])
+
+            signup = self.league.get_signups()[2]
+            played = list(reader.matches(signup_id=signup.id))
+
+            self.assertEqual(5, len(played))
+            self.assertTrue(all(int(signup.id) in (stored.match.signup.id, stored.match.signup_opponent.id) for stored in played))
+            self.assertEqual('Team 2', [stored.match.signup if stored.match.signup.id == int(signup.id) else stored.match.signup_opponent for stored in played][0].name)
+            self.assertEqual([1.5], list(set(stored.match.score_opponent for stored in reader.matches('league') if stored.round_number == 1)))
+
+            scores = reader.column('matches', 'score')
+            self.assertIsInstance(scores, memoryview)
+            self.assertEqual('d', scores.format)
+            self.assertEqual(len(reader), len(scores))
+
+    def test_append_only_growth(self):
+        rounds = self.league.get_rounds()
+
+        with pwned.columnar.ColumnarWriter(self.path) as writer:
+            writer.append_signups('league', self.league.id, self.league.get_signups())
+            writer.append_rounds('league', self.league.id, rounds[0:1])
+
+        reader = pwned.columnar.ColumnarReader(self.path)
+        self.assertEqual(3, len(reader))
+
+        with pwned.columnar.ColumnarWriter(self.path) as writer:
+            writer.append_rounds('league', self.league.id, rounds[1:])
+
+        self.assertEqual(3, len(list(reader.matches())))
+        reader.close()
+
+        with pwned.columnar.ColumnarReader(self.path) as reader:
+            self.assertEqual(15, len(reader))
+            self.assertEqual([['league', int(self.league.id), 0, 15]], reader.meta['blocks']['matches'])
+            self.assertEqual(list(range(1, 6)), sorted(set(stored.round_number for stored in reader.matches('league', self.league.id))))
+
+    def test_interrupted_append_is_discarded(self):
+        with pwned.columnar.ColumnarWriter(self.path) as writer:
+            writer.export(self.tournament)
+
+        # a commit that died after writing some of the columns
+        writer = pwned.columnar.ColumnarWriter(self.path)
+        writer.append_rounds('league', self.league.id, self.league.get_rounds())
+
+        with open(os.path.join(self.path, 'matches', 'id.col'), 'ab') as f:
+            f.write(b'\x01' * 20)
+
+        with open(os.path.join(self.path, 'strings.txt'), 'a') as f:
+            f.write('"half')
+
+        with pwned.columnar.ColumnarReader(self.path) as reader:
+            self.assertEqual(3, len(reader))
+
+        with pwned.columnar.ColumnarWriter(self.path) as writer:
+            writer.append_rounds('league', self.league.id, self.league.get_rounds()[0:1])
+
+        with pwned.columnar.ColumnarReader(self.path) as reader:
+            self.assertEqual(6, len(reader))
+            self.assertEqual([int(match.id) for match in self.league.get_round(1).stages[0].matches], [stored.match.id for stored in reader.matches('league')])
+            self.assertEqual(reader.meta['rows']['matches'] * 8, os.path.getsize(os.path.join(self.path, 'matches', 'id.col')))
+
+    def test_string_ids_and_scores(self):
+        # ids, seedings and scores the way the API sends them
+        signups = [pwned.support.Signup(id='11', name='A', seeding='1', clan_id='4'), pwned.support.Signup(id='12', name='B', seeding='2')]
+        match = pwned.support.Match(id='7', signup=signups[0], signup_opponent=signups[1], score='2', score_opponent='0.5')
+
+        with pwned.columnar.ColumnarWriter(self.path) as writer:
+            writer.append_signups('league', '3', signups)
+            writer.append_matches('league', '3', '1', [match])
+
+            with self.assertRaisesRegex(ValueError, 'matches.score'):
+                writer.append_matches('league', '3', '1', [pwned.support.Match(id='8', score='n/a')])
+
+        with pwned.columnar.ColumnarReader(self.path) as reader:
+            stored, = reader.matches('league', '3', signup_id='12')
+
+            self.assertEqual(1, len(reader))
+            self.assertEqual((7, 11, 12, 2, 0.5), (stored.match.id, stored.match.signup.id, stored.match.signup_opponent.id, stored.match.score, stored.match.score_opponent))
+            self.assertEqual(('league', 3, 1), (stored.type, stored.competition_id, stored.round_number))
+            self.assertEqual([(1, 4), (2, None)], [(signup.seeding, signup.clan_id) for signup in reader.signups('league', 3)])
+
+class SimulationTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer().start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+
+    def create_tournament(self, template, teams):
+        tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Cup', template=template))
+        tournament.add_signups([pwned.support.Signup(name='Team ' + str(i), seeding=i + 1) for i in range(teams)])
+        tournament.start()
+
+        return tournament, tournament.get_signups()
+
+    def test_equal_teams(self):
+        tournament, signups = self.create_tournament('singleelim4', 4)
+        result = pwned.simulation.TournamentSimulation.from_tournament(tournament).run(20000, seed=1, workers=1)
+
+        for signup in signups:
+            self.assertEqual(1.0, result.probability(signup.id, 1))
+            self.assertAlmostEqual(0.5, result.probability(signup.id, 2), delta=0.02)
+            self.assertAlmostEqual(0.25, result.win_probability(signup.id), delta=0.02)
+
+        self.assertAlmostEqual(1.0, sum(result.win_probability(signup.id) for signup in signups))
+        self.assertEqual(0.0, result.win_probability(-1))
+
+    def test_ratings_and_decided_matches(self):
+        tournament, signups = self.create_tournament('singleelim8', 7)
+        ratings = {signup.id: 1500 + 100 * i for i, signup in enumerate(signups)}
+        simulation = pwned.simulation.TournamentSimulation.from_tournament(tournament, ratings)
+        result = simulation.run(20000, seed=1, workers=1)
+
+        # the top seed has a bye, the rest play for their place in round 2
+        self.assertEqual(1.0, result.probability(signups[0].id, 2))
+        self.assertEqual([7.0, 4.0, 2.0], [sum(round_counts) / result.iterations for round_counts in result.counts])
+        self.assertEqual(signups[-1].id, result.table()[0][0].id)
+
+        strongest, weakest = signups[-1], signups[1]
+        match = next(match for match in tournament.get_round(1).stages[0].matches if match.signup and match.signup.id == weakest.id)
+        self.assertEqual(strongest.id, match.signup_opponent.id)
+        self.assertAlmostEqual(pwned.simulation.win_probability(ratings[strongest.id], ratings[weakest.id]), result.probability(strongest.id, 2), delta=0.01)
+
+        # the upset stays fixed
+        match.score, match.score_opponent = 2, 0
+        tournament.update_match(match)
+        simulation.apply_match(match)
+        result = simulation.run(20000, seed=1, workers=1)
+
+        self.assertEqual(1.0, result.probability(weakest.id, 2))
+        self.assertEqual(0.0, result.probability(strongest.id, 2))
+        self.assertEqual(0.0, result.win_probability(strongest.id))
+
+    def test_double_elimination(self):
+        tournament, signups = self.create_tournament('doubleelim8', 8)
+        result = pwned.simulation.TournamentSimulation.from_tournament(tournament).run(20000, seed=1, workers=1)
+
+        self.assertEqual([8.0, 4.0, 2.0, 4.0, 4.0, 2.0, 2.0, 2.0], [sum(round_counts) / result.iterations for round_counts in result.counts])
+
+        for signup in signups:
+            # everyone who loses in the upper bracket plays on in the lower one
+            self.assertEqual(1.0, result.probability(signup.id, 2) + result.probability(signup.id, 4))
+            self.assertAlmostEqual(0.125, result.win_probability(signup.id), delta=0.02)
+
+        ratings = {signup.id: 0 for signup in signups}
+        ratings[signups[3].id] = 5000
+        result = pwned.simulation.TournamentSimulation.from_tournament(tournament, ratings).run(1000, seed=1, workers=1)
+
+        self.assertEqual(1.0, result.win_probability(signups[3].id))
+        self.assertEqual(0.0, result.probability(signups[3].id, 4))
+
+    def test_double_elimination_stages(self):
+        # a doubleelim4 bracket as the API sends it: the upper final and the lower bracket's first round are stages
+        # of the same round. the upper bracket's first round is played, Team 2 won the upper final
+        def signup(id):
+            return {'id': str(id), 'name': 'Team ' + str(id)}
+
+        def match(id, home, away, score=None, score_opponent=None):
+            return {'id': str(id), 'signup': home and signup(home), 'signupOpponent': away and signup(away), 'score': score, 'scoreOpponent': score_opponent, 'isWalkover': False}
+
+        def round(number, name, *stages):
+            return {'roundNumber': number, 'name': name, 'stages': [{'description': description, 'matches': matches} for description, matches in stages]}
+
+        rounds = [pwned.support.Round.from_api_call(el) for el in (
+            round(1, 'Round 1', ('Upper round 1', [match(1, 1, 4, '2', '0'), match(2, 2, 3, '2', '1')])),
+            round(2, 'Round 2', ('Upper final', [match(3, 1, 2, '0', '2')]), ('Lower round 1', [match(4, 4, 3)])),
+            round(3, 'Round 3', ('Lower final', [match(5, None, 1)])),
+            round(4, 'Grand final', ('Grand final', [match(6, 2, None)])),
+        )]
+        simulation = pwned.simulation.TournamentSimulation('doubleelim4', rounds, {'1': 1500, '2': 1500, '3': 1500, '4': 1500})
+        result = simulation.run(20000, seed=1, workers=1)
+
+        self.assertEqual(['1', '4', '2', '3'], [signup.id for signup in result.signups])
+        self.assertEqual(1.0, result.probability('2', 5))
+        self.assertEqual(0.0, result.probability('2', 3))
+        self.assertEqual(1.0, result.probability('1', 4))
+        self.assertAlmostEqual(0.5, result.probability('4', 4), delta=0.02)
+        self.assertAlmostEqual(0.5, result.probability('1', 5), delta=0.02)
+
+        # the lower round is decided without fetching the rounds again
+        rounds[1].stages[1].matches[0].score, rounds[1].stages[1].matches[0].score_opponent = '2', '0'
+        simulation.apply_match(rounds[1].stages[1].matches[0])
+        result = simulation.run(1000, seed=1, workers=1)
+
+        self.assertEqual((1.0, 0.0), (result.probability('4', 4), result.probability('3', 4)))
+
+        # a round per bracket round isn't how doubleelim4 is laid out
+        with self.assertRaises(ValueError):
+            pwned.simulation.TournamentSimulation('doubleelim4', [rounds[0], pwned.support.Round(stages=rounds[1].stages[0:1]), pwned.support.Round(stages=rounds[1].stages[1:])] + rounds[2:])
+
+    def test_ids_as_numbers(self):
+        # the API sends ids as strings; ratings and lookups may use them as numbers
+        tournament, signups = self.create_tournament('singleelim4', 4)
+        strongest = signups[2]
+        result = pwned.simulation.TournamentSimulation.from_tournament(tournament, {int(strongest.id): 5000}).run(1000, seed=1, workers=1)
+
+        self.assertIsInstance(strongest.id, str)
+        self.assertEqual(1.0, result.win_probability(int(strongest.id)))
+        self.assertEqual(1.0, result.win_probability(strongest.id))
+        self.assertEqual(1.0, result.probability(int(strongest.id), 2))
+
+    def test_seeded_runs_are_deterministic(self):
+        tournament, signups = self.create_tournament('singleelim16', 13)
+        simulation = pwned.simulation.TournamentSimulation.from_tournament(tournament, {signup.id: 1400 + 20 * i for i, signup in enumerate(signups)})
+
+        inline = simulation.run(3000, seed=7, workers=1, batch_size=1000)
+        pooled = simulation.run(3000, seed=7, workers=2, batch_size=1000)
+
+        self.assertEqual(inline.probabilities(), pooled.probabilities())
+        self.assertEqual(list(inline.champions), list(pooled.champions))
+        self.assertNotEqual(list(inline.champions), list(simulation.run(3000, seed=8, workers=1, batch_size=1000).champions))
+        self.assertEqual(3000, sum(simulation.run(3000, workers=1).champions))
+
+    def test_rejects_other_layouts(self):
+        tournament, signups = self.create_tournament('singleelim8', 8)
+
+        with self.assertRaises(ValueError):
+            pwned.simulation.TournamentSimulation('doubleelim8', tournament.get_rounds())
+
+        with self.assertRaises(ValueError):
+            pwned.brackets.from_template('roundrobin8')
+
+        with self.assertRaises(ValueError):
+            pwned.simulation.TournamentSimulation.from_tournament(tournament).run(10, backend='fortran')
+
+class StreamingTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer().start()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123')
+
+        self.tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Streaming', template='singleelim8'))
+        self.tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(8)])
+        self.tournament.start()
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+
+    def test_iter_rounds_matches_get_rounds(self):
+        rounds = self.tournament.get_rounds()
+        streamed = list(self.tournament.iter_rounds())
+
+        self.assertEqual([round.get_api_dict() for round in rounds], [round.get_api_dict() for round in streamed])
+
+    def test_iter_matches(self):
+        matches = list(self.tournament.iter_matches())
+
+        self.assertEqual(7, len(matches))
+        self.assertIsInstance(matches[0], pwned.support.Match)
+        self.assertEqual('Team 0', matches[0].signup.name)
+
+    def test_abandoned_stream_does_not_break_connection(self):
+        next(self.tournament.iter_rounds())
+
+        self.assertEqual(3, len(self.tournament.get_rounds()))
+
+    def test_error_response(self):
+        with self.assertRaises(pwned.client.PwnedAPIException):
+            list(self.pwned_client.iter_rounds('tournament', 12345))
+
+    def test_async_iter_matches(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.server.base_url, 'abc', '123') as client:
+                tournament = await client.get_tournament(self.tournament.id)
+
+                return [match async for match in tournament.iter_matches()], [round async for round in client.iter_rounds('tournament', self.tournament.id)]
+
+        matches, rounds = asyncio.run(run())
+
+        self.assertEqual([match.get_api_dict() for match in self.tournament.iter_matches()], [match.get_api_dict() for match in matches])
+        self.assertEqual([round.get_api_dict() for round in self.tournament.get_rounds()], [round.get_api_dict() for round in rounds])
+
+    def test_async_abandoned_stream_does_not_break_connection(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.server.base_url, 'abc', '123') as client:
+                rounds = client.iter_rounds('tournament', self.tournament.id)
+                await rounds.__anext__()
+                await rounds.aclose()
+
+                with self.assertRaises(pwned.client.PwnedAPIException):
+                    [round async for round in client.iter_rounds('tournament', 12345)]
+
+                return await client.get_rounds('tournament', self.tournament.id)
+
+        self.assertEqual(3, len(asyncio.run(run())))
+
+    def test_json_stream_with_tiny_reads(self):
+        document = json.dumps({'result': [{'name': 'ÆØÅ ✓', 'stages': [{'matches': [{'id': 1}, {'id': 22}]}, {'matches': None}]}, {'stages': []}], 'extra': 123456}).encode('utf-8')
+        stream = pwned.streaming.JsonStream(io.BytesIO(document).read, chunk_size=1)
+
+        self.assertEqual([{'id': 1}, {'id': 22}], list(stream.items(('*', 'stages', '*', 'matches', '*'))))
+        self.assertEqual({'extra': 123456}, stream.envelope)
+
+        stream = pwned.streaming.JsonStream(io.BytesIO(document).read, chunk_size=3)
+        self.assertEqual('ÆØÅ ✓', next(stream.items(('*', )))['name'])
+
+    def test_json_stream_fed_from_outside(self):
+        document = json.dumps({'result': [{'id': 1, 'name': 'ÆØÅ'}, {'id': 22}], 'extra': 1.5}).encode('utf-8')
+        stream = pwned.streaming.JsonStream(chunk_size=4)
+        chunks = iter(document[i:i + 3] for i in range(0, len(document), 3))
+        items = []
+
+        for item in stream.parse(('*', )):
+            if item is not pwned.streaming.NEED_DATA:
+                items.append(item)
+                continue
+
+            while stream.needs_data():
+                chunk = next(chunks, b'')
+
+                if chunk:
+                    stream.feed(chunk)
+                else:
+                    stream.feed_eof()
+
+        self.assertEqual([{'id': 1, 'name': 'ÆØÅ'}, {'id': 22}], items)
+        self.assertEqual({'extra': 1.5}, stream.envelope)
+
+    def test_json_stream_rejects_truncated_document(self):
+        stream = pwned.streaming.JsonStream(io.BytesIO(b'{"result": [{"id": 1}, {"id"').read)
+
+        with self.assertRaises(ValueError):
+            list(stream.items(('*', )))
+
+class LocalServerTestCase(unittest.TestCase):
+    def setUp(self):
+        connections = self.connections = []
+        self.responses = {}
+        self.errors = {}
+        self.requests = []
+        self.etags = {}
+        self.drop_connections = False
+        self.hang_up = set()
+        test = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                connections.append(self.client_address)
+
+            def do_GET(self):
+                self.respond()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.respond()
+
+            def do_DELETE(self):
+                self.respond()
+
+            def respond(self):
+                resource = self.path.split('?')[0]
+                test.requests.append((self.command, resource))
+                etag = test.etags.get(resource)
+
+                # the request arrived, but the connection drops before the answer does
+                if resource in test.hang_up:
+                    self.close_connection = True
+                    return
+
+                if resource in test.errors:
+                    body = json.dumps({'error': {'reason': test.errors[resource]}}).encode('utf-8')
+                else:
+                    body = json.dumps({'result': test.responses.get(resource, self.command)}).encode('utf-8')
+
+                if etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+
+                if etag:
+                    self.send_header('ETag', etag)
+
+                self.end_headers()
+
+                # close without announcing it, like a server timing out a kept-alive socket
+                if test.drop_connections:
+                    self.close_connection = True
+
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, args=(0.05, ), daemon=True).start()
+
+        self.base_url = 'http://127.0.0.1:' + str(self.server.server_port) + '/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class ConnectionPoolTests(LocalServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pwned_client = pwned.client.Pwned(self.base_url, 'abc', '123')
+
+    def tearDown(self):
+        self.pwned_client.close()
+        super().tearDown()
+
+    def test_connection_reused_across_verbs(self):
+        self.assertEqual('GET', self.pwned_client._request('games'))
+        self.assertEqual('POST', self.pwned_client._request('leagues/1', 'POST', {'name': 'x'}))
+        self.assertEqual('DELETE', self.pwned_client._request('leagues/scoringmodels/1', 'DELETE'))
+
+        self.assertEqual(1, len(self.connections))
+        self.assertEqual(1, self.pwned_client.pool.idle_count())
+
+    def test_reconnect_on_stale_connection(self):
+        self.drop_connections = True
+        self.pwned_client._request('games')
+        self.drop_connections = False
+
+        self.assertEqual('GET', self.pwned_client._request('games'))
+        self.assertEqual(2, len(self.connections))
+
+    def test_writes_are_not_resent_on_dropped_connection(self):
+        self.pwned_client._request('games')
+        self.hang_up.add('/leagues/1')
+
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.pwned_client._request('leagues/1', 'POST', {'name': 'x'})
+
+        self.assertEqual(1, self.requests.count(('POST', '/leagues/1')))
+
+        self.pwned_client._request('games')
+        self.hang_up.add('/games')
+
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.pwned_client._request('games')
+
+        self.assertEqual(2 + 2, self.requests.count(('GET', '/games')))
+
+    def test_closed_idle_connection_is_not_used_for_writes(self):
+        self.drop_connections = True
+        self.pwned_client._request('games')
+        self.drop_connections = False
+        time.sleep(0.05)
+
+        self.assertEqual('POST', self.pwned_client._request('leagues/1', 'POST', {'name': 'x'}))
+        self.assertEqual(1, self.requests.count(('POST', '/leagues/1')))
+        self.assertEqual(2, len(self.connections))
+
+    def test_idle_connections_evicted(self):
+        self.pwned_client.pool.idle_timeout = 0
+        self.pwned_client._request('games')
+        self.pwned_client._request('games')
+
+        self.assertEqual(2, len(self.connections))
+
+    def test_max_size_limits_idle_connections(self):
+        pool = pwned.pool.ConnectionPool(max_size=0)
+        pwned_client = pwned.client.Pwned(self.pwned_client.base_url, 'abc', '123', pool=pool)
+        pwned_client._request('games')
+
+        self.assertEqual(0, pool.idle_count())
+
+class BatchTests(LocalServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pwned_client = pwned.client.Pwned(self.base_url, 'abc', '123')
+
+        for i in range(1, 11):
+            self.responses['/tournaments/' + str(i)] = {'id': i, 'name': 'Tournament ' + str(i)}
+            self.responses['/tournaments/7/matches/' + str(i)] = {'id': i, 'score': i * 2}
+
+        self.errors['/tournaments/4'] = 'Tournament not found'
+
+    def tearDown(self):
+        self.pwned_client.close()
+        super().tearDown()
+
+    def test_get_many_keeps_order_and_reports_errors(self):
+        result = self.pwned_client.get_many('tournament', range(1, 11), concurrency=4)
+
+        self.assertEqual(10, len(result))
+        self.assertFalse(result.ok)
+        self.assertEqual([4], [item.key for item in result.failed])
+        self.assertIsInstance(result[3].error, pwned.client.PwnedAPIException)
+        self.assertIsNone(result.results[3])
+
+        for i, item in enumerate(result):
+            if item.ok:
+                self.assertEqual(i + 1, item.result.id)
+
+        self.assertLessEqual(len(self.connections), 4)
+
+    def test_competition_get_matches(self):
+        tournament = pwned.competitions.Tournament(id=7, client=self.pwned_client)
+        result = tournament.get_matches([3, 1, 2])
+
+        self.assertTrue(result.ok)
+        self.assertEqual([6, 2, 4], [match.score for match in result.results])
+
+    def test_update_matches_reports_each_match(self):
+        self.errors['/tournaments/7/matches/4'] = 'Match not found'
+        tournament = pwned.competitions.Tournament(id=7, client=self.pwned_client)
+        matches = [pwned.support.Match(id=i, score=1, score_opponent=0) for i in range(1, 7)]
+        result = tournament.update_matches(matches, concurrency=3)
+
+        self.assertEqual(matches, [item.key for item in result])
+        self.assertEqual([matches[3]], [item.key for item in result.failed])
+        self.assertEqual('Match not found', str(result.failed[0].error))
+        self.assertEqual(6, len([request for request in self.requests if request[0] == 'POST']))
+        self.assertLessEqual(len(self.connections), 3)
+
+    def test_update_rounds(self):
+        tournament = pwned.competitions.Tournament(id=7, client=self.pwned_client)
+        result = tournament.update_rounds([pwned.support.Round(round_number=i, time='2026-10-18 20:00:00') for i in (1, 2)])
+
+        self.assertTrue(result.ok)
+        self.assertEqual(['/tournaments/7/rounds/1', '/tournaments/7/rounds/2'], sorted(resource for method, resource in self.requests))
+
+    def test_import_signups_from_generator(self):
+        with pwned.fakeserver.FakeServer() as server:
+            client = pwned.client.Pwned(server.base_url, 'abc', '123')
+            tournament = client.create_tournament(pwned.competitions.Tournament(name='Open qualifier', template='singleelim8'))
+            signups = (pwned.support.Signup(name='Team ' + str(i)) for i in range(1050))
+            result = tournament.import_signups(signups, chunk_size=100, concurrency=4)
+
+            self.assertTrue(result.ok)
+            self.assertEqual(1050, len(result))
+            self.assertEqual(11, server.requests - 1)
+            self.assertEqual(['Team ' + str(i) for i in range(1050)], [item.key.name for item in result])
+            self.assertEqual([item.key.name for item in result], [item.result.name for item in result])
+            self.assertEqual(1050, len(set(item.result.id for item in result)))
+            self.assertEqual(1050, len(tournament.get_signups()))
+            client.close()
+
+    def test_run_chunked_retries_and_bounds_chunks(self):
+        attempts = collections.Counter()
+        lock = threading.Lock()
+        state = {'read': 0, 'running': 0, 'max_running': 0, 'max_ahead': 0}
+
+        def items():
+            for i in range(20):
+                state['read'] += 1
+                yield i
+
+        def send(chunk):
+            with lock:
+                attempts[chunk[0]] += 1
+                state['running'] += 1
+                state['max_running'] = max(state['max_running'], state['running'])
+                state['max_ahead'] = max(state['max_ahead'], state['read'] - chunk[-1] - 1)
+
+            time.sleep(0.01)
+
+            with lock:
+                state['running'] -= 1
+
+            if chunk[0] == 12:
+                raise pwned.client.PwnedAPIException('Always failing')
+
+            if chunk[0] == 4 and attempts[4] < 2:
+                raise ConnectionResetError('Failing once')
+
+            return [i * 10 for i in chunk]
+
+        result = pwned.batch.run_chunked(send, items(), chunk_size=4, concurrency=2, retries=2, retry_delay=0)
+
+        self.assertEqual(list(range(20)), [item.key for item in result])
+        self.assertEqual([12, 13, 14, 15], [item.key for item in result.failed])
+        self.assertEqual('Always failing', str(result[12].error))
+        self.assertEqual([i * 10 for i in range(20) if not 12 <= i < 16], [item.result for item in result.succeeded])
+        self.assertEqual({0: 1, 4: 2, 8: 1, 12: 1, 16: 1}, dict(attempts))
+        self.assertLessEqual(state['max_running'], 2)
+        self.assertLessEqual(state['max_ahead'], 2 * 4)
+
+    def test_run_chunked_fails_chunks_with_missing_results(self):
+        result = pwned.batch.run_chunked(lambda chunk: chunk[1:] if chunk[0] == 3 else chunk, range(6), chunk_size=3, concurrency=1)
+
+        self.assertEqual([0, 1, 2], [item.result for item in result.succeeded])
+        self.assertEqual([3, 4, 5], [item.key for item in result.failed])
+        self.assertIsInstance(result[3].error, ValueError)
+
+    def test_import_signups_without_signups_in_response(self):
+        client = pwned.client.Pwned(self.base_url, 'abc', '123')
+
+        for response in (True, 2, {'added': 2}):
+            self.responses['/tournaments/1/signups'] = response
+            result = client.import_signups('tournament', 1, [pwned.support.Signup(name='A'), pwned.support.Signup(name='B')])
+
+            self.assertTrue(result.ok)
+            self.assertEqual([None, None], [item.result for item in result])
+
+        self.errors['/tournaments/1/signups'] = 'Tournament is full'
+        result = client.import_signups('tournament', 1, [pwned.support.Signup(name='A')])
+        client.close()
+
+        self.assertEqual('Tournament is full', str(result[0].error))
+
+    def test_responses_by_status(self):
+        client = pwned.client.Pwned(self.base_url, 'abc', '123')
+
+        self.assertIsNone(client._handle_response('tournaments/1/signups', 'POST', pwned.pool.PooledResponse(200, {}, b'')))
+
+        with self.assertRaisesRegex(pwned.client.PwnedAPIException, 'HTTP 502'):
+            client._handle_response('tournaments/1/signups', 'POST', pwned.pool.PooledResponse(502, {}, b'<html>Bad gateway</html>'))
+
+        with self.assertRaisesRegex(pwned.client.PwnedAPIException, 'Not found'):
+            client._handle_response('tournaments/1', 'GET', pwned.pool.PooledResponse(404, {}, b'{"error": {"reason": "Not found"}}'))
+
+        client.close()
+
+    def test_import_signups_does_not_resend_after_timeout(self):
+        attempts = []
+
+        def add_signups(type, competition_id, chunk):
+            attempts.append(chunk)
+
+            if len(attempts) == 1:
+                raise ConnectionRefusedError()
+
+            raise TimeoutError()
+
+        client = pwned.client.Pwned(self.base_url, 'abc', '123')
+        client.add_signups = add_signups
+
+        result = client.import_signups('tournament', 1, [pwned.support.Signup(name='A')], retries=3)
+        client.close()
+
+        self.assertEqual(2, len(attempts))
+        self.assertIsInstance(result[0].error, TimeoutError)
+
+    def test_import_signups_async(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(server.base_url, 'abc', '123') as client:
+                tournament = await client.create_tournament(pwned.competitions.Tournament(name='Async qualifier', template='singleelim8'))
+                result = await client.import_signups('tournament', tournament.id, (pwned.support.Signup(name=str(i)) for i in range(25)), chunk_size=10, concurrency=2)
+
+                return result, len(await client.get_signups('tournament', tournament.id))
+
+        with pwned.fakeserver.FakeServer() as server:
+            result, count = asyncio.run(run())
+
+        self.assertTrue(result.ok)
+        self.assertEqual([str(i) for i in range(25)], [item.result.name for item in result])
+        self.assertEqual(25, count)
+
+    def test_get_many_async(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.base_url, 'abc', '123') as client:
+                return await client.get_many('tournament', [2, 4, 1], concurrency=2)
+
+        result = asyncio.run(run())
+
+        self.assertEqual([2, 4, 1], [item.key for item in result])
+        self.assertEqual([2, 1], [item.result.id for item in result.succeeded])
+        self.assertEqual(4, result.failed[0].key)
+
+class PreparedRequestTests(unittest.TestCase):
+    def legacy_url(self, client, resource, method, data):
+        # how requests were signed before prepare() cached the keyed HMAC
+        signature = hmac.new(client.private_key.encode('ascii'), bytes((client.public_key + '|' + method + '|' + resource + '|' + data).encode('utf-8')), hashlib.sha256).hexdigest()
+
+        return client.base_url + resource + '?' + urllib.parse.urlencode({'publicKey': client.public_key, 'signature': signature})
+
+    def test_signatures_unchanged(self):
+        client = pwned.client.Pwned('http://localhost/', 'a b+c', '123', codec='json')
+
+        for method, resource, data in (('GET', 'games', None), ('POST', 'tournaments/1/matches/2', {'score': 2, 'name': 'Æøå'}), ('DELETE', 'leagues/scoringmodels/3', None)):
+            prepared = client.prepare(resource, method, data)
+            body = json.dumps(data) if data else ''
+
+            self.assertEqual(self.legacy_url(client, resource, method, body), prepared.url)
+            self.assertEqual(body.encode('utf-8') or None, prepared.body)
+
+        client.private_key = '456'
+
+        self.assertEqual(self.legacy_url(client, 'games', 'GET', ''), client.prepare('games').url)
+        client.close()
+
+    def test_send_prepared_request(self):
+        with pwned.fakeserver.FakeServer() as server:
+            client = pwned.client.Pwned(server.base_url, 'abc', '123')
+            prepared = client.prepare('games')
+
+            self.assertEqual(client.send(prepared), client.send(prepared))
+            self.assertEqual(2, server.requests)
+            self.assertEqual('application/json', prepared.headers['Content-Type'])
+            client.close()
+
+class MetricsTests(unittest.TestCase):
+    def test_resource_template(self):
+        self.assertEqual('tournaments/{id}/matches/{id}', pwned.metrics.resource_template('tournaments/12/matches/3'))
+        self.assertEqual('leagues/scoringmodels/league', pwned.metrics.resource_template('leagues/scoringmodels/league'))
+        self.assertEqual('games', pwned.metrics.resource_template('games'))
+
+    def test_histogram(self):
+        histogram = pwned.metrics.Histogram()
+
+        for value in [0.003] * 90 + [0.3] * 9 + [20]:
+            histogram.add(value)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(100, snapshot['count'])
+        self.assertEqual((0.003, 20), (snapshot['min'], snapshot['max']))
+        self.assertEqual(0.005, snapshot['p50'])
+        self.assertEqual(0.5, snapshot['p99'])
+        self.assertEqual((None, 1), snapshot['buckets'][-1])
+
+    def test_client_records_requests(self):
+        records = []
+        metrics = pwned.metrics.ClientMetrics(exporters=[records.append])
+
+        with pwned.fakeserver.FakeServer() as server:
+            client = pwned.client.Pwned(server.base_url, 'abc', '123', metrics=metrics)
+            tournament = client.create_tournament(pwned.competitions.Tournament(name='Metrics', template='singleelim4'))
+            client.get_tournament(tournament.id)
+            client.get_tournament(tournament.id)
+            tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(4)])
+            tournament.start()
+            list(tournament.iter_matches())
+
+            with self.assertRaises(pwned.client.PwnedAPIException):
+                client.get_tournament(12345)
+
+            client.close()
+
+        snapshot = metrics.snapshot()
+        tournaments = snapshot['GET tournaments/{id}']
+
+        self.assertEqual(['GET tournaments/{id}', 'GET tournaments/{id}/rounds', 'POST tournaments', 'POST tournaments/{id}', 'POST tournaments/{id}/signups'], list(snapshot))
+        self.assertEqual((3, 1, 0), (tournaments['requests'], tournaments['errors'], tournaments['failures']))
+        self.assertEqual(3, tournaments['latency']['count'])
+        self.assertEqual(0, tournaments['request_bytes'])
+        self.assertGreater(tournaments['response_bytes'], 0)
+        self.assertGreater(snapshot['POST tournaments']['request_bytes'], 0)
+        self.assertGreater(snapshot['GET tournaments/{id}/rounds']['response_bytes'], 0)
+        self.assertEqual(7, len(records))
+        self.assertEqual(('GET', 'tournaments/{id}', 'api'), (records[-1].method, records[-1].template, records[-1].error))
+
+        metrics.reset()
+
+        self.assertEqual({}, metrics.snapshot())
+
+    def test_connection_failures_and_retries(self):
+        metrics = pwned.metrics.ClientMetrics()
+        server = pwned.fakeserver.FakeServer(rate_limit=5).start()
+        client = pwned.client.Pwned(server.base_url, 'abc', '123', metrics=metrics, limiter=pwned.ratelimit.RateLimiter(rate=100))
+
+        for i in range(7):
+            client.get_games()
+
+        server.stop()
+        client.close()
+
+        with self.assertRaises(OSError):
+            client.get_games()
+
+        games = metrics.snapshot()['GET games']
+
+        self.assertEqual((8, 1), (games['requests'], games['failures']))
+        self.assertEqual(server.throttled, games['retries'])
+        self.assertEqual({200: 7}, games['statuses'])
+
+class ProfilingTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = pwned.fakeserver.FakeServer().start()
+        cls.pwned_client = pwned.client.Pwned(cls.server.base_url, 'abc', '123')
+        cls.tournament = cls.pwned_client.create_tournament(pwned.competitions.Tournament(name='Profiled', template='singleelim8'))
+        cls.tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(8)])
+        cls.tournament.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pwned_client.close()
+        cls.server.stop()
+
+    def test_phases_per_call(self):
+        calls = []
+
+        with self.pwned_client.profile(callback=calls.append) as profile:
+            rounds = self.tournament.get_rounds()
+            self.tournament.update_match(rounds[0].stages[0].matches[0])
+
+        get, post = profile.calls
+
+        self.assertEqual(('GET', 'tournaments/' + str(self.tournament.id) + '/rounds'), (get.method, get.resource))
+        self.assertEqual([get, post], calls)
+
+        for name in ('first_byte', 'body', 'decode', 'hydrate'):
+            self.assertGreater(get.phases[name], 0, name)
+
+        self.assertEqual(0, get.phases['encode'])
+        self.assertGreater(post.phases['encode'], 0)
+        self.assertEqual(0, post.phases['hydrate'])
+        self.assertAlmostEqual(get.elapsed + get.phases['encode'] + get.phases['hydrate'], get.total)
+        self.assertIn('total (ms), 2 calls', profile.report())
+        self.assertAlmostEqual(get.total + post.total, profile.summary()['total'])
+
+    def test_streamed_and_batched_calls(self):
+        with self.pwned_client.profile() as profile:
+            matches = list(self.tournament.iter_matches())
+            self.tournament.get_matches([match.id for match in matches[0:3]], concurrency=3)
+
+        stream = profile.calls[0]
+
+        self.assertEqual(4, len(profile.calls))
+        self.assertGreater(stream.phases['hydrate'], 0)
+        self.assertEqual(['GET'] * 4, [call.method for call in profile.calls])
+
+        for call in profile.calls[1:]:
+            self.assertGreater(call.phases['hydrate'], 0)
+
+    def test_async_calls(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.server.base_url, 'abc', '123') as client:
+                with client.profile() as profile:
+                    await client.get_tournament(self.tournament.id)
+                    await client.get_round('tournament', self.tournament.id, 1)
+
+            return profile
+
+        profile = asyncio.run(run())
+
+        self.assertEqual(2, len(profile.calls))
+
+        for call in profile.calls:
+            self.assertGreater(call.phases['connect'] + call.phases['first_byte'], 0)
+            self.assertGreater(call.phases['hydrate'], 0)
+
+    def test_inactive_without_profile(self):
+        self.assertIs(pwned.profiling._no_phase, pwned.profiling.phase('decode'))
+        self.assertIsNone(pwned.profiling.begin('GET', 'games'))
+
+class CodecTests(unittest.TestCase):
+    data = {'name': 'Æøå', 'positionPoints': {1: 25, 2: 18}, 'matches': [{'id': 1, 'score': 2.5, 'isWalkover': False, 'time': None}]}
+
+    def test_codecs_round_trip(self):
+        for name in pwned.codec.available_codecs():
+            codec = pwned.codec.get_codec(name)
+            decoded = codec.decode(codec.encode(self.data))
+
+            self.assertIsInstance(codec.encode(self.data), bytes)
+            self.assertEqual({'1': 25, '2': 18}, decoded['positionPoints'])
+            self.assertEqual(self.data['matches'], decoded['matches'])
+            self.assertEqual('Æøå', codec.decode('{"name": "Æøå"}'.encode('utf-8'))['name'])
+
+            with self.assertRaises(ValueError):
+                codec.decode(b'{"result": ')
+
+    def test_default_and_unknown_codecs(self):
+        self.assertEqual('orjson' if pwned.codec.orjson is not None else 'json', pwned.codec.get_codec().name)
+        self.assertEqual(json.dumps({'name': 'Æøå', 'teamCount': 8}).encode('utf-8'), pwned.client.Pwned('http://localhost/', 'abc', '123', codec='json').prepare('tournaments', 'POST', {'name': 'Æøå', 'teamCount': 8}).body)
+
+        with self.assertRaises(ValueError):
+            pwned.codec.get_codec('yaml')
+
+    def test_default_without_orjson(self):
+        orjson, pwned.codec.orjson = pwned.codec.orjson, None
+
+        try:
+            self.assertEqual('json', pwned.codec.get_codec().name)
+            self.assertEqual(['json'], pwned.codec.available_codecs())
+
+            with self.assertRaises(ImportError):
+                pwned.codec.get_codec('orjson')
+        finally:
+            pwned.codec.orjson = orjson
+
+    def test_clients_with_each_codec(self):
+        with pwned.fakeserver.FakeServer() as server:
+            for name in pwned.codec.available_codecs():
+                client = pwned.client.Pwned(server.base_url, 'abc', '123', codec=name)
+                tournament = client.create_tournament(pwned.competitions.Tournament(name='Ærlig ' + name, template='singleelim4'))
+                prepared = client.prepare('tournaments', 'POST', {'name': 'x'})
+
+                self.assertEqual(name, client.codec.name)
+                self.assertEqual('Ærlig ' + name, client.get_tournament(tournament.id).name)
+                self.assertIn(hmac.new(b'123', b'abc|POST|tournaments|' + prepared.body, hashlib.sha256).hexdigest(), prepared.url)
+
+                with self.assertRaises(pwned.client.PwnedAPIException):
+                    client._decode_response(b'<html>')
+
+                client.close()
+
+class CompressionTests(unittest.TestCase):
+    def setUp(self):
+        self.server = pwned.fakeserver.FakeServer(compression=True, compression_threshold=256).start()
+        self.metrics = pwned.metrics.ClientMetrics()
+        self.pwned_client = pwned.client.Pwned(self.server.base_url, 'abc', '123', metrics=self.metrics)
+
+        self.tournament = self.pwned_client.create_tournament(pwned.competitions.Tournament(name='Compressed', template='singleelim8'))
+        self.tournament.add_signups([pwned.support.Signup(name='Team ' + str(i)) for i in range(8)])
+        self.tournament.start()
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.server.stop()
+
+    def test_compress_and_decompress(self):
+        body = json.dumps({'matches': [{'id': i, 'score': 0} for i in range(100)]}).encode('utf-8')
+        raw_deflate = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+        self.assertEqual(body, pwned.compression.decompress(pwned.compression.compress(body), 'gzip'))
+        self.assertEqual(body, pwned.compression.decompress(zlib.compress(body), 'deflate'))
+        self.assertEqual(body, pwned.compression.decompress(raw_deflate.compress(body) + raw_deflate.flush(), 'Deflate'))
+        self.assertEqual(body, pwned.compression.decompress(body, 'identity'))
+        self.assertEqual(body, pwned.compression.decompress(pwned.compression.compress(body), 'deflate'))
+        self.assertEqual(body, pwned.compression.decompress(zlib.compress(body), 'gzip'))
+        self.assertEqual(pwned.compression.compress(body), pwned.compression.compress(body))
+
+        with self.assertRaises(ValueError):
+            pwned.compression.decompress(body, 'br')
+
+        compressed = io.BytesIO(pwned.compression.compress(body))
+        reader = pwned.compression.DecompressingReader(compressed.read, 'gzip', chunk_size=7)
+        chunks = iter(lambda: reader.read(1024), b'')
+
+        self.assertEqual(body, b''.join(chunks))
+        self.assertEqual(len(compressed.getvalue()), reader.received)
+        self.assertEqual(len(body), reader.decoded)
+
+    def test_streamed_body_is_inflated_as_read(self):
+        body = json.dumps({'result': [{'id': 1, 'score': 0}] * 100000}).encode('utf-8')
+        compressed = pwned.compression.compress(body)
+        reader = pwned.compression.DecompressingReader(io.BytesIO(compressed).read, 'gzip')
+
+        self.assertLess(len(compressed), reader.chunk_size)
+        self.assertEqual(body[:1000], reader.read(1000))
+        self.assertEqual((len(compressed), 1000), (reader.received, reader.decoded))
+        self.assertEqual(body[1000:], b''.join(iter(lambda: reader.read(4096), b'')))
+
+    def test_compressed_responses(self):
+        plain = pwned.client.Pwned(self.server.base_url, 'abc', '123', compression=False)
+        rounds = [round.get_api_dict() for round in self.tournament.get_rounds()]
+        compressed_responses = self.server.compressed_responses
+
+        self.assertTrue(compressed_responses)
+        self.assertEqual(rounds, [round.get_api_dict() for round in plain.get_rounds('tournament', self.tournament.id)])
+        self.assertEqual(compressed_responses, self.server.compressed_responses)
+        self.assertEqual(rounds, [round.get_api_dict() for round in self.tournament.iter_rounds()])
+        self.assertEqual(compressed_responses + 1, self.server.compressed_responses)
+
+        endpoint = self.metrics.snapshot()['GET tournaments/{id}/rounds']
+
+        self.assertLess(endpoint['response_wire_bytes'], endpoint['response_bytes'])
+        self.assertLess(endpoint['response_ratio'], 0.5)
+        plain.close()
+
+    def test_compressed_requests(self):
+        records = []
+        self.metrics.add_exporter(records.append)
+        client = pwned.client.Pwned(self.server.base_url, 'abc', '123', metrics=self.metrics, compress_requests=64)
+
+        prepared = client.prepare('tournaments', 'POST', pwned.competitions.Tournament(name='x' * 100, template='singleelim4').get_api_dict())
+        small = client.prepare('tournaments', 'POST', {'name': 'x'})
+
+        self.assertEqual('gzip', prepared.headers['Content-Encoding'])
+        self.assertLess(len(prepared.body), prepared.size)
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertEqual('x' * 100, client.send(prepared)['name'])
+        self.assertEqual(1, self.server.compressed_requests)
+
+        self.assertEqual(prepared.size, records[-1].request_bytes)
+        self.assertEqual(len(prepared.body), records[-1].request_wire_bytes)
+        self.assertLess(records[-1].request_ratio, 1)
+        client.close()
+
+    def test_async_client(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.server.base_url, 'abc', '123') as client:
+                return await client.get_rounds('tournament', self.tournament.id), [round async for round in client.iter_rounds('tournament', self.tournament.id)]
+
+        compressed_responses = self.server.compressed_responses
+
+        rounds, streamed = asyncio.run(run())
+        rounds = [round.get_api_dict() for round in rounds]
+
+        self.assertEqual([round.get_api_dict() for round in self.tournament.get_rounds()], rounds)
+        self.assertEqual(rounds, [round.get_api_dict() for round in streamed])
+        self.assertEqual(compressed_responses + 3, self.server.compressed_responses)
+
+class RateLimiterTests(unittest.TestCase):
+    def test_token_bucket_spaces_requests(self):
+        limiter = pwned.ratelimit.RateLimiter(rate=50, burst=1, max_rate=50)
+        started = time.monotonic()
+
+        for i in range(6):
+            limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        self.assertEqual(6, limiter.stats()['lanes']['interactive']['acquired'])
+
+    def test_interactive_lane_goes_first(self):
+        limiter = pwned.ratelimit.RateLimiter(rate=20, burst=1)
+        limiter.acquire()
+        order = []
+
+        def acquire(lane):
+            limiter.acquire(lane)
+            order.append(lane)
+
+        bulk = threading.Thread(target=acquire, args=('bulk', ))
+        bulk.start()
+        time.sleep(0.01)
+
+        self.assertEqual(1, limiter.stats()['lanes']['bulk']['waiting'])
+
+        interactive = threading.Thread(target=acquire, args=('interactive', ))
+        interactive.start()
+        bulk.join()
+        interactive.join()
+
+        self.assertEqual(['interactive', 'bulk'], order)
+        self.assertEqual(0, limiter.queue_depth())
+
+    def test_acquire_async(self):
+        limiter = pwned.ratelimit.RateLimiter(rate=50, burst=1, max_rate=50)
+
+        async def run():
+            await asyncio.gather(*(limiter.acquire_async('bulk') for i in range(3)))
+
+        started = time.monotonic()
+        asyncio.run(run())
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.035)
+        self.assertEqual(3, limiter.stats()['lanes']['bulk']['acquired'])
+
+    def test_async_waiters_are_woken_by_threads(self):
+        # the bulk coroutine waits for the interactive thread without a timeout, so only a wake-up lets it through
+        limiter = pwned.ratelimit.RateLimiter(rate=100, burst=1)
+        limiter.update(429, {'Retry-After': '0.1'})
+        take, checks = limiter._take, collections.Counter()
+
+        def counted_take(lane, ticket):
+            checks[lane] += 1
+            return take(lane, ticket)
+
+        limiter._take = counted_take
+
+        async def run():
+            interactive = asyncio.get_running_loop().run_in_executor(None, limiter.acquire, 'interactive')
+
+            while not limiter.queue_depth():
+                await asyncio.sleep(0.001)
+
+            await asyncio.wait_for(limiter.acquire_async('bulk'), 2)
+            await interactive
+
+        asyncio.run(run())
+
+        self.assertEqual((1, 1), (limiter.stats()['lanes']['interactive']['acquired'], limiter.stats()['lanes']['bulk']['acquired']))
+        self.assertEqual(0, limiter.queue_depth())
+        self.assertFalse(limiter._async_waiters)
+
+        # woken when the thread got through and once more after the refill, instead of polling during the pause
+        self.assertLessEqual(checks['bulk'], 4)
+
+    def test_adapts_to_throttling(self):
+        limiter = pwned.ratelimit.RateLimiter(rate=10, increase=1, max_rate=12)
+
+        self.assertFalse(limiter.update(200))
+        self.assertEqual(11, limiter.rate)
+        self.assertTrue(limiter.update(429, {'Retry-After': '0.2'}))
+        self.assertEqual(5.5, limiter.rate)
+        self.assertGreater(limiter.stats()['paused'], 0.1)
+
+        for i in range(5):
+            limiter.update(200)
+
+        self.assertEqual(10.5, limiter.rate)
+        self.assertTrue(limiter.update(503))
+        self.assertEqual(2, limiter.stats()['throttled'])
+
+    def test_client_retries_throttled_requests(self):
+        with pwned.fakeserver.FakeServer(rate_limit=20) as server:
+            limiter = pwned.ratelimit.RateLimiter(rate=100)
+            pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123', limiter=limiter)
+
+            for i in range(30):
+                pwned_client.get_games()
+
+            pwned_client.close()
+
+        stats = limiter.stats()
+
+        self.assertGreater(server.throttled, 0)
+        self.assertEqual(server.throttled, stats['throttled'])
+        self.assertEqual(server.throttled, stats['retries'])
+        self.assertLess(stats['rate'], 100)
+
+    def test_lane_applies_to_batches(self):
+        with pwned.fakeserver.FakeServer() as server:
+            limiter = pwned.ratelimit.RateLimiter(rate=1000)
+            pwned_client = pwned.client.Pwned(server.base_url, 'abc', '123', limiter=limiter)
+            tournament = pwned_client.create_tournament(pwned.competitions.Tournament(name='Lanes', template='singleelim4'))
+
+            with limiter.lane('bulk'):
+                pwned_client.get_many('tournament', [tournament.id] * 4, concurrency=2)
+
+            pwned_client.close()
+
+        lanes = limiter.stats()['lanes']
+
+        self.assertEqual(1, lanes['interactive']['acquired'])
+        self.assertEqual(4, lanes['bulk']['acquired'])
+
+        with self.assertRaises(ValueError):
+            limiter.lane('unknown').__enter__()
+
+class ResponseCacheTests(LocalServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = pwned.cache.ResponseCache()
+        self.pwned_client = pwned.client.Pwned(self.base_url, 'abc', '123', cache=self.cache)
+
+        self.responses['/games'] = [{'id': 3, 'name': 'Counter-Strike'}]
+        self.responses['/leagues/scoringmodels/1'] = {'id': 1, 'name': 'Standard', 'winPoints': 3}
+
+    def tearDown(self):
+        self.pwned_client.close()
+        super().tearDown()
+
+    def test_reference_data_is_cached(self):
+        games = self.pwned_client.get_games()
+        games[0].name = 'Modified locally'
+
+        self.assertEqual('Counter-Strike', self.pwned_client.get_games()[0].name)
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual({'hits': 1, 'misses': 1}, {k: v for k, v in self.cache.stats().items() if k in ('hits', 'misses')})
+
+    def test_other_resources_are_not_cached(self):
+        self.responses['/tournaments/1'] = {'id': 1}
+        self.pwned_client.get_tournament(1)
+        self.pwned_client.get_tournament(1)
+
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual(0, len(self.cache))
+
+    def test_writes_invalidate_scoring_models(self):
+        scoring_model = self.pwned_client.get_league_scoring_model(1)
+        self.pwned_client.get_league_scoring_model(1)
+        self.assertEqual(1, len(self.requests))
+
+        self.pwned_client.update_league_scoring_model(scoring_model)
+        self.pwned_client.get_league_scoring_model(1)
+
+        self.assertEqual(['GET', 'POST', 'GET'], [method for method, resource in self.requests])
+        self.pwned_client.get_games()
+        self.pwned_client.delete_league_scoring_model(1)
+
+        self.assertEqual(1, len(self.cache))
+
+    def test_expired_entries_are_refetched(self):
+        self.cache.ttls['games'] = -1
+        self.pwned_client.get_games()
+        self.pwned_client.get_games()
+
+        self.assertEqual(2, len(self.requests))
+
+    def test_lru_eviction(self):
+        cache = pwned.cache.ResponseCache(max_entries=2, max_size=10)
+        cache.put('games', b'12345')
+        cache.put('countries', b'12345')
+        cache.get('games')
+        cache.put('tournaments/templates', b'1')
+
+        self.assertIsNotNone(cache.get('games'))
+        self.assertIsNone(cache.get('countries'))
+        self.assertEqual(6, cache.size)
+
+        cache.put('leagues/scoringmodels', b'1234567890')
+        self.assertEqual(['leagues/scoringmodels'], list(cache._entries))
+
+class ResponseStoreTests(LocalServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.pwned_client = pwned.client.Pwned(self.base_url, 'abc', '123', store=pwned.store.ResponseStore(self.directory.name))
+
+        self.responses['/tournaments/1/rounds'] = [{'roundNumber': 1, 'stages': [{'matches': [{'id': 5}]}]}]
+        self.etags['/tournaments/1/rounds'] = '"v1"'
+
+    def tearDown(self):
+        self.pwned_client.close()
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_not_modified_served_from_store(self):
+        self.pwned_client.get_rounds('tournament', 1)
+        rounds = self.pwned_client.get_rounds('tournament', 1)
+
+        self.assertEqual(5, rounds[0].stages[0].matches[0].id)
+        self.assertEqual(1, self.pwned_client.store.hits)
+        self.assertEqual(2, len(self.requests))
+
+    def test_changed_response_replaces_stored_copy(self):
+        self.pwned_client.get_rounds('tournament', 1)
+
+        self.responses['/tournaments/1/rounds'] = [{'roundNumber': 2}]
+        self.etags['/tournaments/1/rounds'] = '"v2"'
+
+        self.assertEqual(2, self.pwned_client.get_rounds('tournament', 1)[0].round_number)
+        self.assertEqual('"v2"', self.pwned_client.store.get('abc|' + self.base_url + 'tournaments/1/rounds').etag)
+
+    def test_not_modified_results_are_not_shared(self):
+        first = self.pwned_client._request('tournaments/1/rounds')
+        first[0]['roundNumber'] = 99
+        second = self.pwned_client._request('tournaments/1/rounds')
+        second[0]['stages'].clear()
+
+        self.assertEqual(1, self.pwned_client.store.hits)
+        self.assertEqual(self.responses['/tournaments/1/rounds'], self.pwned_client._request('tournaments/1/rounds'))
+
+    def test_missing_stored_body_is_fetched_again(self):
+        self.responses['/games'] = [{'id': 1, 'name': 'Chess'}]
+        self.etags['/games'] = '"v1"'
+        self.pwned_client.get_games()
+
+        # another process sharing the directory clears it
+        pwned.store.ResponseStore(self.directory.name).clear()
+        games = self.pwned_client.get_games()
+
+        self.assertEqual('Chess', games[0].name)
+        self.assertEqual(0, self.pwned_client.store.hits)
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(1, len(self.pwned_client.store))
+
+    def test_missing_stored_body_is_fetched_again_async(self):
+        self.pwned_client.get_rounds('tournament', 1)
+        pwned.store.ResponseStore(self.directory.name).clear()
+
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.base_url, 'abc', '123', store=self.pwned_client.store) as client:
+                return await client.get_rounds('tournament', 1)
+
+        self.assertEqual(5, asyncio.run(run())[0].stages[0].matches[0].id)
+        self.assertEqual(3, len(self.requests))
+
+    def test_store_is_kept_per_public_key(self):
+        self.pwned_client.get_rounds('tournament', 1)
+
+        pwned_client = pwned.client.Pwned(self.base_url, 'other', '456', store=self.pwned_client.store)
+        pwned_client.get_rounds('tournament', 1)
+        pwned_client.close()
+
+        self.assertEqual(0, self.pwned_client.store.hits)
+        self.assertEqual(2, len(self.pwned_client.store))
+
+    def test_store_survives_restart(self):
+        self.pwned_client.get_rounds('tournament', 1)
+
+        pwned_client = pwned.client.Pwned(self.base_url, 'abc', '123', store=pwned.store.ResponseStore(self.directory.name))
+        rounds = pwned_client.get_rounds('tournament', 1)
+        pwned_client.close()
+
+        self.assertEqual(1, rounds[0].round_number)
+        self.assertEqual(1, pwned_client.store.hits)
+
+    def test_size_bounded_eviction(self):
+        store = pwned.store.ResponseStore(self.directory.name, max_size=400)
+        store.put('a', b'x' * 100, etag='"a"')
+        store.put('b', b'x' * 100, etag='"b"')
+        store.hit(store.get('a'))
+        store.put('c', b'x' * 100, etag='"c"')
+
+        self.assertIsNotNone(store.get('a'))
+        self.assertIsNone(store.get('b'))
+        self.assertLessEqual(store.size, 400)
+
+class AsyncPwnedTests(LocalServerTestCase):
+    def test_requests_share_connections(self):
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.base_url, 'abc', '123') as client:
+                self.assertEqual('GET', await client._request('games'))
+                self.assertEqual('POST', await client._request('leagues/1', 'POST', {'name': 'x'}))
+                self.assertEqual('DELETE', await client._request('leagues/scoringmodels/1', 'DELETE'))
+
+        asyncio.run(run())
+        self.assertEqual(1, len(self.connections))
+
+    def test_concurrent_requests_are_bounded(self):
+        async def run():
+            pool = pwned.pool.AsyncConnectionPool(max_connections=3)
+
+            async with pwned.asyncclient.AsyncPwned(self.base_url, 'abc', '123', pool=pool) as client:
+                return await asyncio.gather(*(client._request('games') for i in range(20)))
+
+        self.assertEqual(['GET'] * 20, asyncio.run(run()))
+        self.assertLessEqual(len(self.connections), 3)
+
+    def test_bound_league_helpers_are_awaitable(self):
+        self.responses['/leagues/5'] = {'id': 5, 'name': 'Async League', 'leagueType': 'league'}
+        self.responses['/leagues/5/table'] = [{'position': 1, 'points': 3, 'signup': {'id': 12, 'name': 'Team'}}]
+
+        async def run():
+            async with pwned.asyncclient.AsyncPwned(self.base_url, 'abc', '123') as client:
+                league = await client.get_league(5)
+                return league, await league.get_table()
+
+        league, table = asyncio.run(run())
+
+        self.assertIsInstance(league, pwned.competitions.League)
+        self.assertEqual('Async League', league.name)
+        self.assertEqual(1, len(table))
+        self.assertEqual(12, table[0].signup.id)
+
+    def test_signature_matches_sync_client(self):
+        client = pwned.asyncclient.AsyncPwned(self.base_url, 'abc', '123')
+        sync_client = pwned.client.Pwned(self.base_url, 'abc', '123')
+
+        self.assertEqual(sync_client.prepare('games', 'POST', {'a': 1}), client.prepare('games', 'POST', {'a': 1}))